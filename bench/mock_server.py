@@ -0,0 +1,295 @@
+"""Local stand-in for the Apollo and n8n endpoints the app talks to.
+
+Run it standalone and point the app at it:
+
+    python -m bench.mock_server --port 8765 --latency-ms 80 --rate-limit 600
+    LEAD_MACHINE_APOLLO_URL=http://127.0.0.1:8765 LEAD_MACHINE_N8N_URL=http://127.0.0.1:8765 streamlit run main.py
+
+or start it in-process with `start_server(MockConfig(...))` (see bench/run.py).
+"""
+import argparse
+import json
+import random
+import threading
+import time
+import zlib
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+SENIORITIES = ["entry", "senior", "manager", "director", "vp", "c_suite", "owner"]
+DEPARTMENTS = ["engineering_technical", "sales", "marketing", "operations", "finance", "master_information_technology"]
+CITIES = [("Austin", "Texas"), ("Denver", "Colorado"), ("Boston", "Massachusetts"), ("Seattle", "Washington")]
+EMAIL_STATUSES = ["verified", "guessed", "unavailable", "extrapolated"]
+MODES = ["Email", "LinkedIn", "Call"]
+LEAD_STATUSES = ["Contacted", "Replied", "Bounced", "Interested", "Not Interested"]
+UNLIMITED_QUOTA = 1_000_000  # per-minute limit advertised when rate_limit is 0
+
+
+@dataclass
+class MockConfig:
+    latency_ms: float = 50.0  # added to every response
+    jitter_ms: float = 20.0  # uniform extra latency on top of latency_ms
+    rate_limit: int = 0  # Apollo requests per minute, 0 = unlimited
+    error_rate: float = 0.0  # share of requests answered with a 503
+    total_entries: int = 10_000  # people matching every search
+    padding_bytes: int = 0  # extra text per person, to scale payload size
+    full_list_rows: int = 20_000  # rows returned by webhook/full-list
+    seed: int = 7
+
+
+# --- Synthetic records ---
+def fake_person(index: int, config: MockConfig) -> dict:
+    """A people/search record shaped like Apollo's, deterministic per index."""
+    rng = random.Random(config.seed * 1_000_003 + index)
+    first, last = f"First{index}", f"Last{index % 997}"
+    org_id = f"org{index % 5000:06d}"
+    domain = f"company{index % 5000}.com"
+    city, state = rng.choice(CITIES)
+    return {
+        "id": f"p{index:09d}",
+        "first_name": first,
+        "last_name": last,
+        "name": f"{first} {last}",
+        "linkedin_url": f"http://www.linkedin.com/in/{first.lower()}-{last.lower()}-{index}",
+        "title": rng.choice(["Head of Growth", "CTO", "Account Executive", "VP Sales", "Engineer"]),
+        "email_status": rng.choice(EMAIL_STATUSES),
+        "photo_url": f"https://static.example.com/photos/{index}.jpg",
+        "twitter_url": None,
+        "github_url": None,
+        "facebook_url": None,
+        "extrapolated_email_confidence": round(rng.random(), 2),
+        "headline": "Building things" + " x" * (config.padding_bytes // 2),
+        "email": f"{first.lower()}.{last.lower()}@{domain}",
+        "organization_id": org_id,
+        "employment_history": [
+            {"id": f"e{index}-{n}", "organization_id": org_id, "organization_name": f"Company {index % 5000}",
+             "title": "Engineer", "start_date": f"{2010 + n}-01-01", "end_date": None, "current": n == 0}
+            for n in range(rng.randint(1, 4))
+        ],
+        "state": state,
+        "city": city,
+        "country": "United States",
+        "departments": rng.sample(DEPARTMENTS, 2),
+        "subdepartments": [],
+        "seniority": rng.choice(SENIORITIES),
+        "functions": rng.sample(DEPARTMENTS, 1),
+        "intent_strength": None,
+        "show_intent": rng.random() < 0.3,
+        "email_domain_catchall": rng.random() < 0.1,
+        "revealed_for_current_team": True,
+        "organization": {
+            "id": org_id,
+            "name": f"Company {index % 5000}",
+            "website_url": f"http://www.{domain}",
+            "blog_url": None,
+            "angellist_url": None,
+            "linkedin_url": f"http://www.linkedin.com/company/{org_id}",
+            "twitter_url": None,
+            "facebook_url": None,
+            "primary_phone": {"number": "+1 512-555-0100", "source": "Account", "sanitized_number": "+15125550100"},
+            "languages": ["English"],
+            "alexa_ranking": rng.randint(1_000, 2_000_000),
+            "phone": "+1 512-555-0100",
+            "linkedin_uid": str(10_000 + index % 5000),
+            "founded_year": rng.randint(1950, 2022),
+            "publicly_traded_symbol": None,
+            "publicly_traded_exchange": None,
+            "logo_url": f"https://static.example.com/logos/{org_id}.png",
+            "crunchbase_url": None,
+            "primary_domain": domain,
+            "sanitized_phone": "+15125550100",
+            "organization_headcount_six_month_growth": round(rng.uniform(-0.1, 0.3), 3),
+            "organization_headcount_twelve_month_growth": round(rng.uniform(-0.1, 0.5), 3),
+            "organization_headcount_twenty_four_month_growth": round(rng.uniform(-0.2, 0.8), 3),
+            "market_cap": None,
+        },
+    }
+
+
+def fake_lead(index: int, config: MockConfig) -> dict:
+    """A webhook/full-list row as the Dashboard reads it."""
+    rng = random.Random(config.seed * 7_919 + index)
+    sent = time.time() - rng.randint(0, 14 * 86400)
+    return {
+        "id": f"p{index:09d}",
+        "email": f"lead{index}@company{index % 5000}.com",
+        "mode": rng.choice(MODES),
+        "status": rng.choice(LEAD_STATUSES),
+        "last email": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(sent)),
+    }
+
+
+def _index_for(detail: dict) -> int:
+    """Stable person index for a match request, so repeated lookups agree."""
+    value = next((detail[k] for k in ("id", "email", "linkedin_url", "name") if detail.get(k)), "")
+    if isinstance(value, list):
+        value = value[0]
+    return zlib.crc32(str(value).encode("utf-8")) % 10_000_000
+
+
+# --- Server ---
+class MockHandler(BaseHTTPRequestHandler):
+    server_version = "LeadMachineMock/1.0"
+    protocol_version = "HTTP/1.1"  # keep-alive, like the real endpoints
+
+    def log_message(self, format, *args):
+        pass
+
+    @property
+    def config(self) -> MockConfig:
+        return self.server.config
+
+    def _read_body(self) -> bytes:
+        """The request body; webhook uploads arrive chunked when streamed."""
+        length = int(self.headers.get("Content-Length") or 0)
+        if length:
+            return self.rfile.read(length)
+        if self.headers.get("Transfer-Encoding", "").lower() != "chunked":
+            return b""
+        parts = []
+        while True:
+            size = int(self.rfile.readline().strip() or b"0", 16)
+            if not size:
+                self.rfile.readline()
+                return b"".join(parts)
+            parts.append(self.rfile.read(size))
+            self.rfile.read(2)
+
+    def _reply(self, status: int, payload, headers: dict = None):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, str(value))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _delay(self):
+        time.sleep((self.config.latency_ms + random.uniform(0, self.config.jitter_ms)) / 1000)
+
+    def _quota(self) -> tuple:
+        """(allowed, headers) for one Apollo request under the per-minute limit.
+
+        Quota headers are sent even when unlimited, so the app's rate limiter
+        opens up instead of staying at its conservative default.
+        """
+        limit = self.config.rate_limit
+        if not limit:
+            return True, {"x-rate-limit-minute": UNLIMITED_QUOTA, "x-minute-requests-left": UNLIMITED_QUOTA}
+        with self.server.lock:
+            window = int(time.time() // 60)
+            if window != self.server.window:
+                self.server.window, self.server.used = window, 0
+            self.server.used += 1
+            left = max(0, limit - self.server.used)
+            allowed = self.server.used <= limit
+        headers = {"x-rate-limit-minute": limit, "x-minute-requests-left": left}
+        if not allowed:
+            headers["Retry-After"] = max(1, int(60 - time.time() % 60))
+        return allowed, headers
+
+    def _count(self, path: str, received: int = 0):
+        with self.server.lock:
+            self.server.requests[path] = self.server.requests.get(path, 0) + 1
+            self.server.bytes_received += received
+
+    def do_POST(self):
+        url = urlparse(self.path)
+        body = self._read_body()
+        self._count(url.path, len(body))
+        self._delay()
+
+        if url.path.startswith("/webhook"):
+            if random.random() < self.config.error_rate:
+                return self._reply(503, {"message": "Mock webhook unavailable"})
+            return self._reply(200, {"message": "Workflow was started", "bytes": len(body)})
+
+        allowed, headers = self._quota()
+        if not allowed:
+            return self._reply(429, {"error": "Rate limit exceeded"}, headers)
+        if random.random() < self.config.error_rate:
+            return self._reply(503, {"error": "Mock Apollo unavailable"}, headers)
+
+        query = parse_qs(url.query)
+        if url.path == "/api/v1/mixed_people/search":
+            page = int((query.get("page") or ["1"])[0])
+            per_page = min(100, int((query.get("per_page") or ["25"])[0]))
+            total = self.config.total_entries
+            start = (page - 1) * per_page
+            people = [fake_person(i, self.config) for i in range(start, min(total, start + per_page))]
+            return self._reply(200, {
+                "people": people,
+                "pagination": {"page": page, "per_page": per_page, "total_entries": total,
+                               "total_pages": -(-total // per_page)},
+            }, headers)
+        if url.path == "/api/v1/people/match":
+            return self._reply(200, {"person": fake_person(_index_for(query), self.config)}, headers)
+        if url.path == "/api/v1/people/bulk_match":
+            details = json.loads(body or b"{}").get("details") or []
+            return self._reply(200, {"matches": [fake_person(_index_for(d), self.config) for d in details]}, headers)
+        return self._reply(404, {"error": f"Unknown path {url.path}"})
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        self._count(url.path)
+        self._delay()
+        if url.path == "/webhook/full-list":
+            return self._reply(200, [fake_lead(i, self.config) for i in range(self.config.full_list_rows)])
+        return self._reply(404, {"error": f"Unknown path {url.path}"})
+
+
+class MockServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address: tuple, config: MockConfig):
+        super().__init__(address, MockHandler)
+        self.config = config
+        self.lock = threading.Lock()
+        self.window, self.used = 0, 0
+        self.requests = {}
+        self.bytes_received = 0
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+
+def start_server(config: MockConfig = None, host: str = "127.0.0.1", port: int = 0) -> MockServer:
+    """Serve in a daemon thread; port 0 picks a free one (see `server.base_url`)."""
+    server = MockServer((host, port), config or MockConfig())
+    threading.Thread(target=server.serve_forever, daemon=True, name="mock-server").start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    defaults = MockConfig()
+    parser.add_argument("--latency-ms", type=float, default=defaults.latency_ms)
+    parser.add_argument("--jitter-ms", type=float, default=defaults.jitter_ms)
+    parser.add_argument("--rate-limit", type=int, default=defaults.rate_limit, help="Apollo requests per minute")
+    parser.add_argument("--error-rate", type=float, default=defaults.error_rate)
+    parser.add_argument("--total-entries", type=int, default=defaults.total_entries)
+    parser.add_argument("--padding-bytes", type=int, default=defaults.padding_bytes)
+    parser.add_argument("--full-list-rows", type=int, default=defaults.full_list_rows)
+    args = parser.parse_args()
+
+    config = MockConfig(
+        latency_ms=args.latency_ms, jitter_ms=args.jitter_ms, rate_limit=args.rate_limit,
+        error_rate=args.error_rate, total_entries=args.total_entries,
+        padding_bytes=args.padding_bytes, full_list_rows=args.full_list_rows,
+    )
+    server = MockServer((args.host, args.port), config)
+    print(f"Mock Apollo/n8n listening on {server.base_url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
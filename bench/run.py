@@ -0,0 +1,218 @@
+"""Benchmark the hot paths against the local mock server.
+
+    python -m bench.run                       # every benchmark, default sizes
+    python -m bench.run fetch push --pages 50 --latency-ms 120
+    python -m bench.run --save bench/baseline.json
+    python -m bench.run --baseline bench/baseline.json   # exit 1 on regressions
+
+Each benchmark reports throughput, p50/p99 per-operation latency and the
+process's peak RSS after it ran. Peak RSS only ever grows, so run a single
+benchmark to measure its own footprint.
+"""
+import argparse
+import json
+import os
+import resource
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from bench.mock_server import MockConfig, fake_lead, fake_person, start_server
+
+REGRESSION_TOLERANCE = 0.2  # 20% slower throughput than the baseline fails
+
+
+def peak_rss_mb() -> float:
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / (1024 * 1024) if sys.platform == "darwin" else rss / 1024
+
+
+def percentile(samples: list, share: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * share))] if ordered else 0.0
+
+
+def summarize(name: str, unit: str, items: int, seconds: float, latencies: list) -> dict:
+    return {
+        "benchmark": name,
+        "items": items,
+        "unit": unit,
+        "seconds": round(seconds, 3),
+        "throughput": round(items / seconds, 1) if seconds else 0.0,
+        "p50_ms": round(percentile(latencies, 0.50) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 2),
+        "peak_rss_mb": round(peak_rss_mb(), 1),
+    }
+
+
+def timed(fn, *args, **kwargs) -> tuple:
+    started = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return result, time.perf_counter() - started
+
+
+# --- Benchmarks ---
+def bench_fetch(args, people_pages: list) -> dict:
+    from lib.apollo import fetch_page
+
+    def one(page: int) -> float:
+        _, seconds = timed(fetch_page, "bench-key", {}, page, args.perpage, False)
+        return seconds
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.workers) as pool:
+        latencies = list(pool.map(one, range(1, args.pages + 1)))
+    return summarize("fetch", "pages/s", args.pages, time.perf_counter() - started, latencies)
+
+
+def bench_normalize(args, people_pages: list) -> dict:
+    from lib.store import normalize_page
+
+    latencies = [timed(normalize_page, people)[1] for people in people_pages]
+    rows = sum(len(people) for people in people_pages)
+    return summarize("normalize", "rows/s", rows, sum(latencies), latencies)
+
+
+def bench_export(args, people_pages: list) -> dict:
+    from lib import exports
+    from lib.store import normalize_page, to_pandas
+
+    import pyarrow as pa
+
+    df = to_pandas(pa.concat_tables([normalize_page(people) for people in people_pages]))
+    latencies = []
+    for _ in range(args.repeat):
+        # a new lead set each time, as after a fetch: fingerprint and serialize, no cache hit
+        exports.clear_exports()
+        _, seconds = timed(exports.get_export, df.copy(), "CSV")
+        latencies.append(seconds)
+    return summarize("csv_export", "rows/s", len(df) * args.repeat, sum(latencies), latencies)
+
+
+def bench_stream(args, people_pages: list) -> dict:
+    from lib.store import normalize_page, to_pandas
+    from lib.webhook import iter_csv
+
+    import pyarrow as pa
+
+    df = to_pandas(pa.concat_tables([normalize_page(people) for people in people_pages]))
+    latencies = [timed(lambda: sum(len(block) for block in iter_csv(df)))[1] for _ in range(args.repeat)]
+    return summarize("csv_stream", "rows/s", len(df) * args.repeat, sum(latencies), latencies)
+
+
+def bench_push(args, people_pages: list) -> dict:
+    from lib.store import normalize_page, to_pandas
+    from lib.webhook import TEST_CSV_URL, send_file_to_webhook
+
+    import pyarrow as pa
+
+    df = to_pandas(pa.concat_tables([normalize_page(people) for people in people_pages]))
+    latencies = []
+    for _ in range(args.repeat):
+        (success, text), seconds = timed(send_file_to_webhook, df, "bench.csv", TEST_CSV_URL, "bench")
+        if not success:
+            raise RuntimeError(f"Webhook push failed: {text}")
+        latencies.append(seconds)
+    return summarize("webhook_push", "rows/s", len(df) * args.repeat, sum(latencies), latencies)
+
+
+def bench_dashboard(args, people_pages: list) -> dict:
+    import pandas as pd
+
+    from lib.aggregates import LeadAggregates
+
+    df = pd.DataFrame([fake_lead(i, MockConfig()) for i in range(args.leads)])
+    latencies = []
+    for _ in range(args.repeat):
+        started = time.perf_counter()
+        agg = LeadAggregates(df)
+        modes, statuses = agg.options("mode"), agg.options("status")
+        agg.counts_by("mode", modes, statuses)
+        agg.counts_by("status", modes, statuses)
+        agg.hourly(modes, statuses)
+        latencies.append(time.perf_counter() - started)
+    return summarize("dashboard_aggregate", "rows/s", len(df) * args.repeat, sum(latencies), latencies)
+
+
+BENCHMARKS = {
+    "fetch": bench_fetch,
+    "normalize": bench_normalize,
+    "export": bench_export,
+    "stream": bench_stream,
+    "push": bench_push,
+    "dashboard": bench_dashboard,
+}
+
+
+# --- Reporting ---
+def print_table(results: list):
+    columns = ["benchmark", "items", "unit", "throughput", "p50_ms", "p99_ms", "peak_rss_mb"]
+    widths = {c: max(len(c), *(len(str(r[c])) for r in results)) for c in columns}
+    print("  ".join(c.ljust(widths[c]) for c in columns))
+    for row in results:
+        print("  ".join(str(row[c]).ljust(widths[c]) for c in columns))
+
+
+def regressions(results: list, baseline_path: str) -> list:
+    with open(baseline_path) as f:
+        baseline = {row["benchmark"]: row for row in json.load(f)}
+    slower = []
+    for row in results:
+        before = baseline.get(row["benchmark"])
+        if before and row["throughput"] < before["throughput"] * (1 - REGRESSION_TOLERANCE):
+            slower.append(f"{row['benchmark']}: {row['throughput']} {row['unit']} "
+                          f"vs baseline {before['throughput']}")
+    return slower
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("benchmarks", nargs="*", help=f"any of {', '.join(BENCHMARKS)} (default: all)")
+    parser.add_argument("--pages", type=int, default=40, help="search pages to fetch and normalize")
+    parser.add_argument("--perpage", type=int, default=100)
+    parser.add_argument("--workers", type=int, default=8, help="concurrent fetches")
+    parser.add_argument("--leads", type=int, default=200_000, help="rows in the dashboard lead list")
+    parser.add_argument("--repeat", type=int, default=5, help="iterations for export, push and dashboard")
+    parser.add_argument("--latency-ms", type=float, default=50.0, help="mock server latency")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="mock server 503 rate")
+    parser.add_argument("--rate-limit", type=int, default=0, help="mock Apollo requests per minute")
+    parser.add_argument("--save", help="write results as JSON")
+    parser.add_argument("--baseline", help="compare throughput against a saved JSON run")
+    args = parser.parse_args()
+    unknown = set(args.benchmarks) - set(BENCHMARKS)
+    if unknown:
+        parser.error(f"unknown benchmarks: {', '.join(sorted(unknown))}")
+
+    config = MockConfig(latency_ms=args.latency_ms, error_rate=args.error_rate, rate_limit=args.rate_limit,
+                        total_entries=args.pages * args.perpage)
+    server = start_server(config)
+    # lib reads these at import time, so set them before the first benchmark imports it
+    os.environ["LEAD_MACHINE_APOLLO_URL"] = server.base_url
+    os.environ["LEAD_MACHINE_N8N_URL"] = server.base_url
+    os.environ.setdefault("LEAD_MACHINE_DATA_DIR", tempfile.mkdtemp(prefix="lead-machine-bench-"))
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+    people_pages = [
+        [fake_person(i, config) for i in range(page * args.perpage, (page + 1) * args.perpage)]
+        for page in range(args.pages)
+    ]
+    results = []
+    for name in args.benchmarks or BENCHMARKS:
+        results.append(BENCHMARKS[name](args, people_pages))
+        print(f"{name}: {results[-1]['throughput']} {results[-1]['unit']}", file=sys.stderr)
+    server.shutdown()
+
+    print_table(results)
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump(results, f, indent=2)
+    if args.baseline:
+        slower = regressions(results, args.baseline)
+        for line in slower:
+            print(f"REGRESSION {line}")
+        sys.exit(1 if slower else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,190 @@
+import copy
+import threading
+import weakref
+
+import numpy as np
+import pandas as pd
+
+NO_HOUR = -1  # bucket for rows without a valid "last email" timestamp
+
+
+class LeadAggregates:
+    """Mode × status × hour count cube over the Dashboard's lead list.
+
+    Built once per lead snapshot: mode and status become categoricals and
+    "last email" is parsed a single time into an int64 hour bucket. Filter
+    changes then slice the (small) cube instead of scanning every lead.
+    """
+
+    def __init__(self, df: pd.DataFrame):
+        self.has_mode = "mode" in df.columns
+        self.has_status = "status" in df.columns
+        self.has_timeline = "last email" in df.columns
+
+        self.df = df.copy()
+        if self.has_mode:
+            self.df["mode"] = self.df["mode"].astype("category")
+        if self.has_status:
+            self.df["status"] = self.df["status"].astype("category")
+
+        self.keys = self._keys(self.df)
+        self.cube = self.keys.groupby(["mode", "status", "hour"], sort=False).size().rename("count").reset_index()
+
+    def _keys(self, frame: pd.DataFrame) -> pd.DataFrame:
+        """Cube coordinates for `frame`, whose mode/status use this instance's categories."""
+        hours = np.full(len(frame), NO_HOUR, dtype="int64")
+        if self.has_timeline:
+            parsed = pd.to_datetime(frame["last email"], utc=True, errors="coerce")
+            valid = parsed.notna().to_numpy()
+            hours[valid] = parsed[valid].dt.tz_convert(None).to_numpy().astype("datetime64[h]").astype("int64")
+        return pd.DataFrame({
+            "mode": self._codes(frame, "mode"),
+            "status": self._codes(frame, "status"),
+            "hour": hours,
+        })
+
+    def _codes(self, frame: pd.DataFrame, column: str) -> np.ndarray:
+        if column not in self.df.columns:
+            return np.zeros(len(frame), dtype="int16")
+        categories = self.df[column].cat.categories
+        values = frame[column]
+        if isinstance(values.dtype, pd.CategoricalDtype) and values.cat.categories.equals(categories):
+            return values.cat.codes.to_numpy().astype("int16")
+        return categories.get_indexer(values).astype("int16")
+
+    # --- Incremental updates ---
+    def apply(self, positions: np.ndarray, rows: pd.DataFrame, columns=None):
+        """Replace the full lead rows at `positions` (-1 appends), adjusting the cube in place.
+
+        Only the changed rows are re-bucketed: their old coordinates are
+        subtracted and the new ones added, so the cube never needs a rescan.
+        For existing rows only `columns` are written, when given.
+        """
+        for column in rows.columns.difference(self.df.columns):
+            self.df[column] = None
+        rows = rows.reindex(columns=self.df.columns)
+        for column in ("mode", "status"):
+            if column in self.df.columns:
+                categories = self.df[column].cat.categories
+                added = pd.Index(rows[column].dropna().unique()).difference(categories)
+                if len(added):
+                    self.df[column] = self.df[column].cat.add_categories(added)
+                rows[column] = rows[column].astype(self.df[column].dtype)
+
+        found = positions >= 0
+        new_keys = self._keys(rows)
+        old_keys = self.keys.iloc[positions[found]]
+
+        set_rows(self.df, positions[found], rows.loc[found, self.df.columns if columns is None else columns])
+        set_rows(self.keys, positions[found], new_keys[found])
+        if (~found).any():
+            self.df = pd.concat([self.df, rows[~found]], ignore_index=True)
+            self.keys = pd.concat([self.keys, new_keys[~found]], ignore_index=True)
+
+        delta = pd.concat([old_keys.assign(count=-1), new_keys.assign(count=1)], ignore_index=True)
+        cube = pd.concat([self.cube, delta], ignore_index=True)
+        cube = cube.groupby(["mode", "status", "hour"], sort=False)["count"].sum().reset_index()
+        self.cube = cube[cube["count"] != 0].reset_index(drop=True)
+
+    def updated(self, positions: np.ndarray, rows: pd.DataFrame, columns) -> "LeadAggregates":
+        """A copy with `rows` applied (see `apply`); this instance, which other sessions
+        may be reading, is left as is. Only the lead columns written are copied."""
+        other = copy.copy(self)
+        other.df = self.df.copy(deep=False)
+        for column in pd.Index(columns).intersection(self.df.columns):
+            other.df[column] = self.df[column].copy()
+        other.keys = self.keys.copy()
+        other.apply(positions, rows, columns)
+        return other
+
+    def options(self, column: str) -> list:
+        if column not in self.df.columns:
+            return []
+        return self.df[column].dropna().unique().tolist()
+
+    def _selected_codes(self, column: str, values: list) -> np.ndarray:
+        categories = self.df[column].cat.categories
+        return np.flatnonzero(categories.isin(values))
+
+    def _mask(self, frame: pd.DataFrame, modes: list, statuses: list) -> np.ndarray:
+        mask = np.ones(len(frame), dtype=bool)
+        if self.has_mode:
+            mask &= np.isin(frame["mode"].to_numpy(), self._selected_codes("mode", modes))
+        if self.has_status:
+            mask &= np.isin(frame["status"].to_numpy(), self._selected_codes("status", statuses))
+        return mask
+
+    # --- Cube slices ---
+    def slice(self, modes: list, statuses: list) -> pd.DataFrame:
+        return self.cube[self._mask(self.cube, modes, statuses)]
+
+    def filtered_count(self, modes: list, statuses: list) -> int:
+        return int(self.slice(modes, statuses)["count"].sum())
+
+    def status_count(self, modes: list, statuses: list, status: str) -> int:
+        if not self.has_status or status not in self.df["status"].cat.categories:
+            return 0
+        cube = self.slice(modes, statuses)
+        code = self.df["status"].cat.categories.get_loc(status)
+        return int(cube.loc[cube["status"] == code, "count"].sum())
+
+    def counts_by(self, column: str, modes: list, statuses: list) -> pd.DataFrame:
+        cube = self.slice(modes, statuses)
+        cube = cube[cube[column] >= 0]
+        totals = cube.groupby(column)["count"].sum().sort_values(ascending=False)
+        labels = self.df[column].cat.categories[totals.index.to_numpy()]
+        return pd.DataFrame({column.title(): labels, "Count": totals.to_numpy()})
+
+    def hourly(self, modes: list, statuses: list) -> pd.DataFrame:
+        cube = self.slice(modes, statuses)
+        cube = cube[cube["hour"] != NO_HOUR]
+        totals = cube.groupby("hour")["count"].sum().sort_index()
+        hours = pd.to_datetime(totals.index.to_numpy().astype("datetime64[h]"))
+        return pd.DataFrame({"Time (Hour)": hours.strftime('%Y-%m-%d %H:00'), "Emails": totals.to_numpy()})
+
+    def rows(self, modes: list, statuses: list) -> pd.DataFrame:
+        return self.df[self._mask(self.keys, modes, statuses)]
+
+
+def set_rows(df: pd.DataFrame, positions: np.ndarray, rows: pd.DataFrame):
+    """Write `rows` over `df` at `positions`, column by column, widening dtypes that cannot hold them."""
+    for column in rows.columns:
+        loc = df.columns.get_loc(column)
+        try:
+            df.iloc[positions, loc] = rows[column].to_numpy()
+        except (TypeError, ValueError):
+            df[column] = df[column].astype(object)
+            df.iloc[positions, loc] = rows[column].to_numpy()
+
+
+_latest = None
+_latest_lock = threading.Lock()
+
+
+def get_aggregates(df: pd.DataFrame) -> LeadAggregates:
+    """Aggregates for `df`, rebuilt only when a new lead snapshot arrives."""
+    global _latest
+    with _latest_lock:
+        if _latest is None or _latest[0]() is not df:
+            _latest = (weakref.ref(df), LeadAggregates(df))
+        return _latest[1]
+
+
+def carry_over(old_df: pd.DataFrame, new_df: pd.DataFrame, positions: np.ndarray, rows: pd.DataFrame,
+               columns):
+    """Apply `rows` to a copy of the aggregates memoized for `old_df` and memoize it for `new_df`.
+
+    `positions` index `old_df` (-1 for appended rows), which the aggregates'
+    own frame shares row for row; `columns` are the ones the update changed.
+    Falls back to a full rebuild on the next `get_aggregates` call when
+    `old_df` has no aggregates yet.
+    """
+    global _latest
+    with _latest_lock:
+        latest = _latest
+    if latest is None or latest[0]() is not old_df:
+        return
+    aggregates = latest[1].updated(positions, rows, columns)
+    with _latest_lock:
+        if _latest is latest:
+            _latest = (weakref.ref(new_df), aggregates)
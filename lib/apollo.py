@@ -0,0 +1,189 @@
+import re
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from urllib.parse import urlparse, parse_qs, urlencode
+
+from lib.cache import get_cache, person_key, search_key
+from lib.config import APOLLO_BASE_URL
+from lib.metrics import stage
+from lib.ratelimit import get_limiter, send
+
+SEARCH_URL = f"{APOLLO_BASE_URL}/api/v1/mixed_people/search"
+MATCH_URL = f"{APOLLO_BASE_URL}/api/v1/people/match"
+BULK_MATCH_URL = f"{APOLLO_BASE_URL}/api/v1/people/bulk_match"
+
+# --- Apollo param mapping ---
+KEY_MAPPING = {
+    "personTitles[]": "person_titles[]",
+    "personLocations[]": "person_locations[]",
+    "personSeniorities[]": "person_seniorities[]",
+    "includeSimilarTitles": "include_similar_titles",
+    "q_keywords": "q_keywords",
+    "organizationLocations[]": "organization_locations[]",
+    "q_organization_domains_list[]": "q_organization_domains_list[]",
+    "contactEmailStatus[]": "contact_email_status[]",
+    "organizationNumEmployeesRanges[]": "organization_num_employees_ranges[]",
+    "revenueRange[min]": "revenue_range[min]",
+    "revenueRange[max]": "revenue_range[max]",
+    "currentlyUsingAllOfTechnologyUids[]": "currently_using_all_of_technology_uids[]",
+    "currentlyUsingAnyOfTechnologyUids[]": "currently_using_any_of_technology_uids[]",
+    "currentlyNotUsingAnyOfTechnologyUids[]": "currently_not_using_any_of_technology_uids[]",
+    "q_organization_job_titles[]": "q_organization_job_titles[]",
+    "organizationJobLocations[]": "organization_job_locations[]",
+    "organizationNumJobsRange[min]": "organization_num_jobs_range[min]",
+    "organizationNumJobsRange[max]": "organization_num_jobs_range[max]",
+    "organizationJobPostedAtRange[min]": "organization_job_posted_at_range[min]",
+    "organizationJobPostedAtRange[max]": "organization_job_posted_at_range[max]",
+    "page": "page",
+    "perPage": "per_page",
+}
+
+
+class ApolloError(Exception):
+    def __init__(self, status_code: int, text: str):
+        super().__init__(f"API Error {status_code}: {text}")
+        self.status_code = status_code
+        self.text = text
+
+
+def rename_apollo_params(params: dict) -> dict:
+    api_params = {}
+    for key, values in params.items():
+        mapped_key = KEY_MAPPING.get(key)
+        final_key = mapped_key if mapped_key else re.sub(r'([A-Z])', lambda m: '_' + m.group(1).lower(), key)
+        api_params[final_key] = values
+    return api_params
+
+
+def parse_search_url(apollo_ui_url: str) -> dict:
+    parsed = urlparse(apollo_ui_url)
+    raw_qs = parse_qs(parsed.fragment.split('/people?')[-1])
+    return rename_apollo_params(raw_qs)
+
+
+def api_headers(api_key: str) -> dict:
+    return {
+        "x-api-key": api_key,
+        "Content-Type": "application/json",
+        "Accept": "application/json"
+    }
+
+
+# --- Single page ---
+def fetch_page(api_key: str, api_qs: dict, page: int, perpage: int, use_cache: bool = True) -> dict:
+    key = search_key(api_qs, page, perpage)
+    if use_cache:
+        cached = get_cache().get(key)
+        if cached is not None:
+            return cached
+
+    page_qs = dict(api_qs)
+    page_qs["page"] = [str(page)]
+    page_qs["per_page"] = [str(perpage)]
+
+    query = urlencode(page_qs, doseq=True)
+    with stage("apollo.search") as span:
+        response = send("POST", f"{SEARCH_URL}?{query}", get_limiter(api_key),
+                        headers=api_headers(api_key), json={})
+        span.bytes = len(response.content)
+        if response.status_code != 200:
+            raise ApolloError(response.status_code, response.text)
+        data = response.json()
+        span.rows = len(data.get("people") or [])
+    get_cache().set(key, data)
+    return data
+
+
+# --- Person enrichment ---
+def match_person(api_key: str, params: dict, use_cache: bool = True) -> dict:
+    key = person_key(params)
+    if use_cache:
+        cached = get_cache().get(key)
+        if cached is not None:
+            return cached
+
+    headers = api_headers(api_key)
+    headers["Cache-Control"] = "no-cache"
+    with stage("apollo.match") as span:
+        response = send("POST", MATCH_URL, get_limiter(api_key), headers=headers, params=params)
+        span.bytes = len(response.content)
+        if response.status_code != 200:
+            raise ApolloError(response.status_code, response.text)
+        data = response.json()
+        # Apollo bills one credit per matched person
+        span.rows = span.credits = 1 if data.get("person") else 0
+    if data.get("person"):
+        get_cache().set(key, data)
+    return data
+
+
+def bulk_match_people(api_key: str, details: list, params: dict) -> list:
+    headers = api_headers(api_key)
+    headers["Cache-Control"] = "no-cache"
+    with stage("apollo.bulk_match") as span:
+        response = send("POST", BULK_MATCH_URL, get_limiter(api_key), headers=headers,
+                        params=params, json={"details": details})
+        span.bytes = len(response.content)
+        if response.status_code != 200:
+            raise ApolloError(response.status_code, response.text)
+        matches = response.json().get("matches") or []
+        span.rows = span.credits = len([m for m in matches if m])
+    return matches
+
+
+# --- Multi-page fetch ---
+def fetch_pages(api_key: str, api_qs: dict, numberpages: int, perpage: int,
+                max_workers: int = 8, on_page=None, use_cache: bool = True, on_result=None,
+                keep: bool = True, done_pages=(), total_pages: int = None, on_total=None) -> list:
+    """Fetch pages 1..numberpages with up to `max_workers` requests in flight.
+
+    Page 1 is fetched first so the reported `total_pages` can trim the range
+    (an empty page 1 ends the fetch); the rest run concurrently. People are returned in page order.
+    `on_page(done, total)` and `on_result(page, people)` are called from the
+    calling thread after each page. With `keep=False` pages are handed to
+    `on_result` only and an empty list is returned.
+
+    Pages in `done_pages` (e.g. from a checkpoint) are skipped; page 1 is
+    only refetched if `total_pages` is not already known.
+    """
+    done_pages = set(done_pages)
+    pages = {}
+
+    def accept(page: int, people: list):
+        pages[page] = people if keep else []
+        if on_result:
+            on_result(page, people)
+
+    if 1 not in done_pages or not total_pages:
+        first = fetch_page(api_key, api_qs, 1, perpage, use_cache)
+        people = first.get("people") or []
+        reported = (first.get("pagination") or {}).get("total_pages")
+        # an empty search reports 0 pages; only a missing count means "unknown"
+        total_pages = 1 if not people else numberpages if reported is None else reported
+        done_pages.discard(1)
+        accept(1, people)
+    if on_total:
+        on_total(total_pages)
+
+    last_page = max(1, min(numberpages, total_pages))
+    skipped = len([page for page in done_pages if page <= last_page])
+    if on_page:
+        on_page(len(pages) + skipped, last_page)
+
+    todo = [page for page in range(2, last_page + 1) if page not in done_pages]
+    if todo:
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            futures = {
+                pool.submit(fetch_page, api_key, api_qs, page, perpage, use_cache): page
+                for page in todo
+            }
+            try:
+                for future in as_completed(futures):
+                    accept(futures[future], future.result().get("people", []))
+                    if on_page:
+                        on_page(len(pages) + skipped, last_page)
+            except Exception:
+                for future in futures:
+                    future.cancel()
+                raise
+
+    return [person for page in sorted(pages) for person in pages[page]]
@@ -0,0 +1,129 @@
+import io
+import json
+import threading
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+import pandas as pd
+
+from lib.apollo import parse_search_url
+from lib.checkpoint import checkpointed_pull
+from lib.dedup import get_index
+from lib.store import load_pull
+from lib.webhook import send_file_to_webhook
+
+DEFAULT_PAGES = 5
+
+
+# --- Segment lists ---
+def _segment(index: int, url: str, pages=None, intention: str = "", name: str = "") -> dict:
+    try:
+        pages = max(1, min(500, int(pages)))
+    except (TypeError, ValueError):
+        pages = DEFAULT_PAGES
+    return {"name": str(name or f"segment-{index + 1}").strip(), "url": str(url).strip(),
+            "pages": pages, "intention": str(intention or "").strip()}
+
+
+def parse_segments(text: str) -> list:
+    """One segment per line: `url | pages | intention | name`; everything after the URL is optional."""
+    segments = []
+    for line in text.splitlines():
+        if not line.strip() or line.lstrip().startswith("#"):
+            continue
+        url, pages, intention, name = ([part.strip() for part in line.split("|")] + [""] * 4)[:4]
+        segments.append(_segment(len(segments), url, pages, intention, name))
+    return segments
+
+
+def load_segments_file(name: str, data: bytes) -> list:
+    """Saved segments as CSV or JSON with `url` and optional `pages`, `intention` and `name`."""
+    if name.lower().endswith(".json"):
+        rows = json.loads(data)
+    else:
+        rows = pd.read_csv(io.BytesIO(data), dtype=str).fillna("").to_dict("records")
+    return [
+        _segment(i, row.get("url", ""), row.get("pages"), row.get("intention", ""), row.get("name", ""))
+        for i, row in enumerate(rows) if isinstance(row, dict) and row.get("url")
+    ]
+
+
+# --- Batch run ---
+def run_segment(api_key: str, segment: dict, perpage: int, push_url: str = None, record: bool = False,
+                suppress: bool = True, max_workers: int = 2, use_cache: bool = True, on_page=None,
+                on_status=None, payload_format: str = "CSV") -> dict:
+    """Fetch one segment into a checkpointed pull and push it; returns its result row."""
+    result = {"name": segment["name"], "pull_id": None, "leads": 0, "sent": 0, "status": "fetching", "message": ""}
+    pull_id = checkpointed_pull(api_key, parse_search_url(segment["url"]), segment["pages"], perpage,
+                                max_workers=max_workers, use_cache=use_cache, on_page=on_page)
+    df = load_pull(pull_id)
+    result.update(pull_id=pull_id, leads=len(df))
+
+    if not push_url:
+        result["status"] = "fetched"
+        return result
+    outgoing = get_index().filter_batch(df)[0] if suppress else df
+    if outgoing.empty:
+        result.update(status="done", message="No new leads to send")
+        return result
+    if on_status:
+        on_status("pushing")
+    success, message = send_file_to_webhook(outgoing, f"{segment['name']}.csv", push_url, segment["intention"],
+                                            payload_format=payload_format)
+    if not success:
+        raise RuntimeError(f"Push failed: {message}")
+    if record:
+        get_index().record(outgoing)
+    result.update(sent=len(outgoing), status="done", message=message[:200])
+    return result
+
+
+def run_batch(api_key: str, segments: list, perpage: int, push_url: str = None, record: bool = False,
+              suppress: bool = True, segment_workers: int = 4, max_workers: int = 2, use_cache: bool = True,
+              on_progress=None, payload_format: str = "CSV") -> list:
+    """Run every segment concurrently; one failing segment does not stop the others.
+
+    All segments share the API key's rate limiter, so the combined request
+    rate stays within one budget however many run at once.
+    `on_progress(states)` is called from the calling thread with one
+    `{"name", "done", "total", "status"}` dict per segment.
+    """
+    states = [{"name": s["name"], "done": 0, "total": s["pages"], "status": "queued"} for s in segments]
+    results = [None] * len(segments)
+    lock = threading.Lock()
+
+    def run(index: int, segment: dict):
+        def on_page(done: int, total: int):
+            with lock:
+                states[index].update(done=done, total=total, status="fetching")
+
+        def on_status(status: str):
+            with lock:
+                states[index]["status"] = status
+
+        with lock:
+            states[index]["status"] = "fetching"
+        try:
+            result = run_segment(api_key, segment, perpage, push_url=push_url, record=record, suppress=suppress,
+                                 max_workers=max_workers, use_cache=use_cache, on_page=on_page,
+                                 on_status=on_status, payload_format=payload_format)
+        except Exception as e:
+            result = {"name": segment["name"], "pull_id": None, "leads": 0, "sent": 0,
+                      "status": "failed", "message": str(e)[:200]}
+        with lock:
+            states[index]["status"] = result["status"]
+        results[index] = result
+
+    with ThreadPoolExecutor(max_workers=segment_workers) as pool:
+        pending = {pool.submit(run, i, segment) for i, segment in enumerate(segments)}
+        try:
+            while pending:
+                _, pending = wait(pending, timeout=0.5, return_when=FIRST_COMPLETED)
+                if on_progress:
+                    with lock:
+                        snapshot = [dict(state) for state in states]
+                    on_progress(snapshot)
+        except Exception:
+            for future in pending:
+                future.cancel()
+            raise
+    return results
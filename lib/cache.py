@@ -0,0 +1,141 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from lib.config import DATA_DIR
+
+CACHE_PATH = os.path.join(DATA_DIR, "apollo_cache.sqlite")
+DEFAULT_TTL = int(os.environ.get("LEAD_MACHINE_CACHE_TTL", 24 * 3600))
+DEFAULT_MAX_BYTES = int(os.environ.get("LEAD_MACHINE_CACHE_MAX_MB", 512)) * 1024 * 1024
+
+
+def normalized_query(api_qs: dict) -> dict:
+    """A `rename_apollo_params` query without paging, with list values in a stable order."""
+    return {k: sorted(v) if isinstance(v, list) else v
+            for k, v in api_qs.items() if k not in ("page", "per_page")}
+
+
+def search_key(api_qs: dict, page: int, perpage: int) -> str:
+    """Cache key for one page of a normalized `rename_apollo_params` query."""
+    raw = json.dumps({"q": normalized_query(api_qs), "page": page, "per_page": perpage}, sort_keys=True)
+    return "search:" + hashlib.sha256(raw.encode()).hexdigest()
+
+
+def person_key(params: dict) -> str:
+    """Cache key for a people/match lookup, by its strongest identifier.
+
+    The reveal options are part of the key: a match made without
+    reveal_phone_number never asked Apollo for the phone, so it cannot stand
+    in for one that does.
+    """
+    reveal = "personal" if str(params.get("reveal_personal_emails")).lower() == "true" else "work"
+    if str(params.get("reveal_phone_number")).lower() == "true":
+        reveal += "+phone"
+    for field in ("id", "linkedin_url", "email", "hashed_email"):
+        value = str(params.get(field) or "").strip().lower().rstrip("/")
+        if value:
+            return f"person:{reveal}:{field}:{value}"
+    fields = {k: str(v).strip().lower() for k, v in params.items()
+              if v and not k.startswith("reveal_") and k != "webhook_url"}
+    raw = json.dumps(fields, sort_keys=True)
+    return f"person:{reveal}:" + hashlib.sha256(raw.encode()).hexdigest()
+
+
+class ResponseCache:
+    """SQLite cache of Apollo responses with a TTL and size-bounded LRU eviction."""
+
+    def __init__(self, path: str = CACHE_PATH, ttl: int = DEFAULT_TTL, max_bytes: int = DEFAULT_MAX_BYTES):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS cache ("
+            " key TEXT PRIMARY KEY, value BLOB, size INTEGER,"
+            " created REAL, accessed REAL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS cache_accessed ON cache (accessed)")
+        self._db.commit()
+        self._size = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM cache").fetchone()[0]
+
+    def get(self, key: str):
+        now = time.time()
+        with self._lock:
+            row = self._db.execute("SELECT value, created FROM cache WHERE key = ?", (key,)).fetchone()
+            if row is None or now - row[1] > self.ttl:
+                if row is not None:
+                    self._db.execute("DELETE FROM cache WHERE key = ?", (key,))
+                    self._db.commit()
+                    self._size -= len(row[0])
+                self.misses += 1
+                return None
+            self._db.execute("UPDATE cache SET accessed = ? WHERE key = ?", (now, key))
+            self._db.commit()
+            self.hits += 1
+        return json.loads(row[0])
+
+    def set(self, key: str, value):
+        blob = json.dumps(value).encode()
+        now = time.time()
+        with self._lock:
+            old = self._db.execute("SELECT size FROM cache WHERE key = ?", (key,)).fetchone()
+            self._size += len(blob) - (old[0] if old else 0)
+            self._db.execute(
+                "INSERT OR REPLACE INTO cache (key, value, size, created, accessed) VALUES (?, ?, ?, ?, ?)",
+                (key, blob, len(blob), now, now),
+            )
+            self._evict()
+            self._db.commit()
+
+    def _evict(self):
+        if self._size <= self.max_bytes:
+            return
+        # expired entries go first, then least recently used
+        self._db.execute("DELETE FROM cache WHERE created < ?", (time.time() - self.ttl,))
+        rows = self._db.execute("SELECT key, size FROM cache ORDER BY accessed").fetchall()
+        self._size = sum(size for _, size in rows)
+        stale = []
+        for key, size in rows:
+            if self._size <= self.max_bytes:
+                break
+            stale.append((key,))
+            self._size -= size
+        self._db.executemany("DELETE FROM cache WHERE key = ?", stale)
+
+    def clear(self):
+        with self._lock:
+            self._db.execute("DELETE FROM cache")
+            self._db.commit()
+            self._size = 0
+            self.hits = self.misses = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            entries = self._db.execute("SELECT COUNT(*) FROM cache").fetchone()[0]
+            return {"hits": self.hits, "misses": self.misses, "entries": entries, "bytes": self._size}
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_cache() -> ResponseCache:
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = ResponseCache()
+        return _cache
+
+
+def format_stats(stats: dict) -> str:
+    lookups = stats["hits"] + stats["misses"]
+    hit_rate = f"{stats['hits'] / lookups:.0%}" if lookups else "–"
+    return (f"{stats['hits']} hits • {stats['misses']} misses • {hit_rate} hit rate • "
+            f"{stats['entries']} entries ({stats['bytes'] / 1024 / 1024:.1f} MB)")
@@ -0,0 +1,122 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from lib.apollo import fetch_pages
+from lib.cache import normalized_query
+from lib.config import DATA_DIR
+from lib.store import PULLS_DIR, PullStore
+
+CHECKPOINTS_PATH = os.path.join(DATA_DIR, "checkpoints.sqlite")
+
+
+def pull_key(api_qs: dict, perpage: int) -> str:
+    """Identifies a search across runs: the normalized query plus page size."""
+    raw = json.dumps({"q": normalized_query(api_qs), "per_page": perpage}, sort_keys=True)
+    return hashlib.sha256(raw.encode()).hexdigest()
+
+
+class CheckpointStore:
+    """Which pull holds each search's pages, and how far it got.
+
+    The pages themselves are the PullStore's Parquet files, each written
+    atomically as it arrives, so a checkpoint is never ahead of the data.
+    """
+
+    def __init__(self, path: str = CHECKPOINTS_PATH):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.row_factory = sqlite3.Row
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS checkpoints ("
+            " key TEXT PRIMARY KEY, pull_id TEXT, per_page INTEGER, target_pages INTEGER,"
+            " total_pages INTEGER, status TEXT, updated REAL)"
+        )
+        self._db.commit()
+
+    def _write(self, sql: str, params: tuple):
+        with self._lock:
+            self._db.execute(sql, params)
+            self._db.commit()
+
+    def find(self, key: str):
+        """The checkpoint for `key` with its completed pages, if its pull still exists."""
+        with self._lock:
+            row = self._db.execute("SELECT * FROM checkpoints WHERE key = ?", (key,)).fetchone()
+        if row is None or not os.path.isdir(os.path.join(PULLS_DIR, row["pull_id"])):
+            return None
+        checkpoint = dict(row)
+        checkpoint["done_pages"] = PullStore(row["pull_id"]).pages()
+        last_page = min(checkpoint["target_pages"], checkpoint["total_pages"] or checkpoint["target_pages"])
+        checkpoint["last_page"] = last_page
+        checkpoint["remaining"] = len([p for p in range(1, last_page + 1) if p not in checkpoint["done_pages"]])
+        return checkpoint
+
+    def start(self, key: str, pull_id: str, per_page: int, target_pages: int, total_pages: int = None):
+        self._write(
+            "INSERT OR REPLACE INTO checkpoints (key, pull_id, per_page, target_pages, total_pages, status, updated)"
+            " VALUES (?, ?, ?, ?, ?, 'running', ?)",
+            (key, pull_id, per_page, target_pages, total_pages, time.time()),
+        )
+
+    def set_total(self, key: str, total_pages: int):
+        self._write("UPDATE checkpoints SET total_pages = ?, updated = ? WHERE key = ?",
+                    (total_pages, time.time(), key))
+
+    def finish(self, key: str, status: str = "complete"):
+        self._write("UPDATE checkpoints SET status = ?, updated = ? WHERE key = ?", (status, time.time(), key))
+
+
+_checkpoints = None
+_checkpoints_lock = threading.Lock()
+
+
+def get_checkpoints() -> CheckpointStore:
+    global _checkpoints
+    with _checkpoints_lock:
+        if _checkpoints is None:
+            _checkpoints = CheckpointStore()
+        return _checkpoints
+
+
+# --- Checkpointed pull ---
+def checkpointed_pull(api_key: str, api_qs: dict, numberpages: int, perpage: int, resume: bool = True,
+                      max_workers: int = 8, use_cache: bool = True, on_page=None, on_start=None) -> str:
+    """Fetch a search into a PullStore, checkpointed per page; returns the pull id.
+
+    With `resume`, pages already saved by an earlier run of the same search
+    that did not complete are kept and only the missing ones are fetched; a
+    completed pull is never reused, so running a search again fetches fresh
+    results. `on_start(pull_id)` is
+    called once the pull being written to is known.
+    """
+    checkpoints = get_checkpoints()
+    key = pull_key(api_qs, perpage)
+    previous = checkpoints.find(key) if resume else None
+    if previous and previous["status"] == "complete":
+        previous = None
+    if previous:
+        store = PullStore(previous["pull_id"])
+        done_pages, total_pages = previous["done_pages"], previous["total_pages"]
+    else:
+        store = PullStore()
+        done_pages, total_pages = (), None
+
+    checkpoints.start(key, store.pull_id, perpage, numberpages, total_pages)
+    if on_start:
+        on_start(store.pull_id)
+
+    try:
+        fetch_pages(api_key, api_qs, numberpages, perpage, max_workers=max_workers, on_page=on_page,
+                    use_cache=use_cache, on_result=store.write_page, keep=False,
+                    done_pages=done_pages, total_pages=total_pages,
+                    on_total=lambda total: checkpoints.set_total(key, total))
+    except BaseException:
+        checkpoints.finish(key, "failed")
+        raise
+    checkpoints.finish(key)
+    return store.pull_id
@@ -0,0 +1,14 @@
+import os
+
+# Service roots; override to point the app at a staging or local stand-in (see bench/)
+APOLLO_BASE_URL = os.environ.get("LEAD_MACHINE_APOLLO_URL", "https://api.apollo.io").rstrip("/")
+N8N_BASE_URL = os.environ.get("LEAD_MACHINE_N8N_URL", "https://bizmaxus.app.n8n.cloud").rstrip("/")
+
+# Local state (cache, persisted lead copies, checkpoints) lives here
+DATA_DIR = os.environ.get("LEAD_MACHINE_DATA_DIR", ".lead_machine")
+
+
+def data_path(*parts: str) -> str:
+    path = os.path.join(DATA_DIR, *parts)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    return path
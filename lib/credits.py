@@ -0,0 +1,226 @@
+import glob
+import os
+import threading
+import time
+from collections import defaultdict
+
+import pandas as pd
+import pyarrow.parquet as pq
+
+from lib.cache import get_cache, person_key
+from lib.dedup import LOCKED_EMAIL, normalize_keys
+from lib.enrich import BULK_BATCH_SIZE, COLUMN_MAPPING, match_details, normalize_matches
+from lib.metrics import get_metrics
+from lib.phones import get_reveals
+from lib.store import PULLS_DIR
+
+# Identifier field -> lib/dedup key kind, strongest first
+KEY_FIELDS = {"id": "id", "linkedin_url": "linkedin", "email": "email"}
+
+
+def identifiers(field: str, values) -> list:
+    """`field:value` keys normalized like the dedup index (so LinkedIn URL variants agree), "" when unusable."""
+    normalized = normalize_keys(KEY_FIELDS[field], pd.Series(list(values), dtype=object))
+    return [f"{field}:{value}" if isinstance(value, str) else "" for value in normalized]
+
+
+def email_known(email, email_status) -> bool:
+    """A real address with a status; search results mask locked emails with a placeholder."""
+    email = str(email or "")
+    return "@" in email and LOCKED_EMAIL not in email and bool(email_status)
+
+
+class KnownPeople:
+    """Index of people whose email and status are already known from saved search pulls.
+
+    Only identifiers and (file, row) positions are held in memory; full rows
+    are read back from the Parquet pages on lookup. New page files are picked
+    up incrementally by `refresh`, and pages of pruned pulls are skipped.
+    """
+
+    def __init__(self, pulls_dir: str = PULLS_DIR):
+        self.pulls_dir = pulls_dir
+        self._lock = threading.Lock()
+        self._indexed = {}
+        self._rows = {}
+
+    def refresh(self):
+        files = glob.glob(os.path.join(self.pulls_dir, "*", "page-*.parquet"))
+        with self._lock:
+            for path in files:
+                try:
+                    mtime = os.path.getmtime(path)
+                    if self._indexed.get(path) == mtime:
+                        continue
+                    table = pq.read_table(path, columns=list(KEY_FIELDS) + ["email_status"])
+                except (OSError, ValueError):
+                    continue
+                self._indexed[path] = mtime
+                columns = table.to_pydict()
+                known = [email_known(email, status) for email, status in zip(columns["email"], columns["email_status"])]
+                for field in KEY_FIELDS:
+                    for row, key in enumerate(identifiers(field, columns[field])):
+                        if key and known[row]:
+                            self._rows[key] = (path, row)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._rows)
+
+    def lookup(self, details: list) -> dict:
+        """Map detail positions to full stored rows (COLUMN_MAPPING names) for people already known."""
+        self.refresh()
+        keys = {field: identifiers(field, (detail.get(field) for detail in details)) for field in KEY_FIELDS}
+        wanted = defaultdict(dict)
+        with self._lock:
+            for i in range(len(details)):
+                for field in KEY_FIELDS:
+                    hit = self._rows.get(keys[field][i]) if keys[field][i] else None
+                    if hit:
+                        wanted[hit[0]][i] = hit[1]
+                        break
+
+        found = {}
+        for path, positions in wanted.items():
+            try:
+                rows = pq.read_table(path).take(list(positions.values())).to_pylist()
+            except (OSError, ValueError):
+                continue
+            found.update(zip(positions.keys(), rows))
+        return found
+
+
+_known = None
+_known_lock = threading.Lock()
+
+
+def get_known_people() -> KnownPeople:
+    global _known
+    with _known_lock:
+        if _known is None:
+            _known = KnownPeople()
+        return _known
+
+
+# --- Enrichment planning ---
+def phone_reveal(flags: dict) -> bool:
+    return str(flags.get("reveal_phone_number")).lower() == "true"
+
+
+def _other_variant(flags: dict) -> dict:
+    personal = str(flags.get("reveal_personal_emails")).lower() == "true"
+    return {**flags, "reveal_personal_emails": "false" if personal else "true"}
+
+
+def plan_enrichment(details: list, flags: dict, use_cache: bool = True, use_pulls: bool = True) -> dict:
+    """Split `details` into rows answered locally and the unique lookups that still need Apollo.
+
+    A person whose email and status are known from an earlier search pull, or
+    from a cached match made with either reveal setting, is not matched again.
+    Phone reveals are delivered by Apollo per request, so with
+    `reveal_phone_number` only exact cache hits are reused. Repeated
+    identifiers in one upload are looked up once.
+    """
+    phone = phone_reveal(flags)
+    plan = {"rows": {}, "people": {}, "pending": [], "duplicates": {}, "from_pulls": 0, "from_cache": 0}
+    if use_pulls and not phone:
+        plan["rows"] = get_known_people().lookup(details)
+        plan["from_pulls"] = len(plan["rows"])
+
+    cache = get_cache()
+    first_lookup = {}
+    # repeats are matched on normalized identifiers, so LinkedIn URL and email variants count as one person
+    keys = {field: identifiers(field, (detail.get(field) for detail in details)) for field in KEY_FIELDS}
+    for i, detail in enumerate(details):
+        if i in plan["rows"]:
+            continue
+        key = person_key({**detail, **flags})
+        cached = cache.get(key) if use_cache else None
+        if not cached and use_cache and not phone:
+            other = cache.get(person_key({**detail, **_other_variant(flags)}))
+            person = (other or {}).get("person") or {}
+            if email_known(person.get("email"), person.get("email_status")):
+                cached = other
+        if cached and cached.get("person"):
+            plan["people"][i] = cached["person"]
+            plan["from_cache"] += 1
+        else:
+            person = next((keys[field][i] for field in KEY_FIELDS if keys[field][i]), key)
+            if person in first_lookup:
+                plan["duplicates"][i] = first_lookup[person]
+            else:
+                first_lookup[person] = i
+                plan["pending"].append(i)
+    return plan
+
+
+def _seconds_per_lookup(max_workers: int):
+    """Average wall-clock seconds per matched person from earlier Apollo calls, if any."""
+    stages = [row for row in get_metrics().snapshot() if row["stage"] in ("apollo.match", "apollo.bulk_match")]
+    rows = sum(row["rows"] for row in stages)
+    return sum(row["total_s"] for row in stages) / rows / max(1, max_workers) if rows else None
+
+
+def enrich_planned(api_key: str, details: list, flags: dict, max_workers: int = 4,
+                   batch_size: int = BULK_BATCH_SIZE, on_progress=None, use_cache: bool = True,
+                   use_pulls: bool = True, stats: dict = None) -> pd.DataFrame:
+    """`enrich_bulk` that only spends credits on people not already known locally.
+
+    Results keep the upload order. When `stats` is given it is filled with
+    where each row came from, the credits skipped and the estimated time saved.
+    """
+    started = time.monotonic()
+    plan = plan_enrichment(details, flags, use_cache=use_cache, use_pulls=use_pulls)
+    pending = plan["pending"]
+    local = len(details) - len(pending)
+
+    def report(done: int, total: int, rows_per_sec: float):
+        if on_progress:
+            on_progress(local + done, len(details), (local + done) / max(time.monotonic() - started, 1e-6))
+
+    report(0, len(pending), 0.0)
+    lookup_started = time.monotonic()
+    matched = match_details(api_key, [details[i] for i in pending], flags, max_workers=max_workers,
+                            batch_size=batch_size, on_progress=report, use_cache=False) if pending else {}
+    lookup_seconds = time.monotonic() - lookup_started
+
+    people = dict(plan["people"])
+    people.update((i, matched.get(n)) for n, i in enumerate(pending))
+    people.update((i, people.get(first)) for i, first in plan["duplicates"].items())
+    people = {i: person for i, person in people.items() if person}
+    if phone_reveal(flags):
+        # Apollo delivers these numbers later to the webhook; track every row of the run, cached ones
+        # included, until they arrive or expire (numbers already received are left as they are)
+        get_reveals().expect(person.get("id") for person in people.values())
+
+    frames = []
+    if people:
+        frames.append(normalize_matches([{"person": people[i]} for i in sorted(people)]).set_axis(sorted(people)))
+    if plan["rows"]:
+        rows = plan["rows"]
+        frames.append(pd.DataFrame([rows[i] for i in sorted(rows)], index=sorted(rows),
+                                   columns=list(COLUMN_MAPPING.values())))
+    if frames:
+        df = pd.concat(frames).sort_index().reset_index(drop=True)
+    else:
+        df = normalize_matches([])
+
+    if stats is not None:
+        saved = plan["from_pulls"] + plan["from_cache"] + len(plan["duplicates"])
+        per_lookup = lookup_seconds / len(pending) if pending else _seconds_per_lookup(max_workers)
+        stats.update(rows=len(details), lookups=len(pending), from_pulls=plan["from_pulls"],
+                     from_cache=plan["from_cache"], duplicates=len(plan["duplicates"]), credits_saved=saved,
+                     seconds=time.monotonic() - started,
+                     seconds_saved=saved * per_lookup if per_lookup is not None else None)
+    return df
+
+
+def format_savings(stats: dict) -> str:
+    """e.g. "40 rows • 12 from earlier pulls • 5 cached • 3 repeated • 20 looked up • 20 credits, ~14 s saved"."""
+    text = (f"{stats['rows']} rows • {stats['from_pulls']} from earlier pulls • {stats['from_cache']} cached • "
+            f"{stats['duplicates']} repeated • {stats['lookups']} looked up • {stats['credits_saved']} credits")
+    if stats.get("seconds_saved") is not None:
+        text += f", ~{stats['seconds_saved']:.1f} s saved"
+    else:
+        text += " saved"
+    return text
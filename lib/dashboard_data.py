@@ -0,0 +1,247 @@
+import json
+import os
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+from lib.aggregates import carry_over, set_rows
+from lib.config import N8N_BASE_URL, data_path
+from lib.http_client import get_client
+from lib.metrics import get_metrics
+
+FULL_LIST_URL = f"{N8N_BASE_URL}/webhook/full-list"
+DEFAULT_REFRESH_SECONDS = int(os.environ.get("LEAD_MACHINE_DASHBOARD_REFRESH", 300))
+SAVE_EVERY = 30  # seconds between snapshot writes while events stream in
+
+SNAPSHOT_PATH = data_path("dashboard", "full_list.pkl")
+META_PATH = data_path("dashboard", "full_list.json")
+
+# Columns tried, in order, to match changed rows to stored ones
+MERGE_KEYS = ["id", "email", "linkedin_url"]
+UPDATED_COLUMNS = ["updated_at", "updatedAt", "last email"]
+
+
+class LeadStore:
+    """Process-wide copy of the full lead list, persisted between restarts.
+
+    The webhook may answer with a plain list (full snapshot) or with
+    `{"leads": [...], "cursor": "..."}`; the latter marks it as supporting
+    `?updated_since=<cursor>` and later refreshes only fetch the delta.
+
+    Status events pushed by n8n (see lib/ingest.py) are applied with
+    `apply_events` between refreshes; `version` changes with every update.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+        self.df = None
+        self.meta = {"cursor": None, "incremental": False, "refreshed_at": 0.0}
+        self.last_transfer = {}
+        self.last_error = ""
+        self._failed_at = 0.0
+        self.version = 0
+        self.events = {"received": 0, "applied": 0, "skipped": 0, "last_at": None}
+        self._dirty = False
+        self._saved_at = 0.0
+        self._positions = {}  # key column -> {key value: row position}, for pushed events
+        self._load()
+
+    def _load(self):
+        if os.path.exists(SNAPSHOT_PATH) and os.path.exists(META_PATH):
+            try:
+                self.df = pd.read_pickle(SNAPSHOT_PATH)
+                with open(META_PATH) as f:
+                    self.meta.update(json.load(f))
+            except Exception:
+                self.df = None
+
+    def _save(self):
+        self.df.to_pickle(SNAPSHOT_PATH)
+        with open(META_PATH, "w") as f:
+            json.dump(self.meta, f)
+        self._dirty = False
+        self._saved_at = time.time()
+
+    def age(self) -> float:
+        return time.time() - self.meta["refreshed_at"]
+
+    def get(self, refresh_interval: int = DEFAULT_REFRESH_SECONDS, force: bool = False) -> pd.DataFrame:
+        """The lead list, refreshed from the webhook once `refresh_interval` has lapsed.
+
+        The request runs outside the store lock, so other sessions and pushed
+        events keep using the current copy meanwhile. After a failed refresh
+        the webhook is not asked again until the interval lapses once more.
+        """
+        with self._lock:
+            due = force or self.df is None or self.age() >= refresh_interval
+            if due and not force and time.time() - self._failed_at < refresh_interval:
+                if self.df is None:
+                    raise RuntimeError(self.last_error)
+                due = False
+            if not due:
+                if self._dirty:
+                    self._save()
+                return self.df
+
+        # one refresh at a time; sessions that already have a copy do not wait for it
+        if not self._refresh_lock.acquire(blocking=force or self.df is None):
+            return self.df
+        try:
+            if force or self.df is None or self.age() >= refresh_interval:
+                self._refresh()
+        finally:
+            self._refresh_lock.release()
+        return self.df
+
+    def _refresh(self):
+        with self._lock:
+            incremental = self.df is not None and self.meta["incremental"] and self.meta["cursor"]
+            params = {"updated_since": self.meta["cursor"]} if incremental else None
+
+        started = time.perf_counter()
+        try:
+            response = get_client().get(FULL_LIST_URL, params=params)
+            response.raise_for_status()
+            payload = response.json()
+        except Exception as e:
+            with self._lock:
+                self._failed_at = time.time()
+                self.last_error = str(e)
+            raise
+
+        if isinstance(payload, dict) and "leads" in payload:
+            changes = pd.DataFrame(payload["leads"])
+            is_delta, cursor = True, payload.get("cursor")
+        else:
+            changes = pd.DataFrame(payload)
+            is_delta, incremental, cursor = False, False, None
+
+        with self._lock:
+            self.meta["incremental"] = is_delta
+            self.df = merge_changes(self.df, changes) if incremental else changes
+            self.meta["cursor"] = (cursor or _max_updated(self.df)) if is_delta else None
+            self.meta["refreshed_at"] = time.time()
+            self._failed_at, self.last_error = 0.0, ""
+            self.last_transfer = {
+                "mode": "delta" if incremental else "full",
+                "rows": len(changes),
+                "bytes": len(response.content),
+                "seconds": time.perf_counter() - started,
+            }
+            get_metrics().record(f"dashboard.refresh.{self.last_transfer['mode']}", self.last_transfer["seconds"],
+                                 rows=len(changes), nbytes=len(response.content))
+            self._positions = {}
+            self.version += 1
+            self._save()
+
+    def _row_positions(self, key: str, values) -> np.ndarray:
+        if key not in self._positions:
+            self._positions[key] = dict(zip(self.df[key].tolist(), range(len(self.df))))
+        lookup = self._positions[key]
+        return np.array([lookup.get(v, -1) for v in values], dtype="int64")
+
+    # --- Pushed events ---
+    def apply_events(self, events: list) -> int:
+        """Apply partial lead updates (e.g. `{"email": ..., "status": "Replied"}`).
+
+        Each event is matched on the first of MERGE_KEYS it carries; events
+        with none of them are counted as skipped. Only the fields present in
+        an event are changed; unknown leads are appended. Aggregates are
+        updated in place rather than rebuilt. Returns the number of events applied.
+        """
+        events = [e for e in events if isinstance(e, dict)]
+        with self._lock:
+            self.events["received"] += len(events)
+            if self.df is None or not events:
+                return 0
+            keys = [k for k in MERGE_KEYS if k in self.df.columns]
+            groups = {}
+            for event in events:
+                key = next((k for k in keys if event.get(k) not in (None, "")), None)
+                groups.setdefault(key, []).append(event)
+            self.events["skipped"] += len(groups.pop(None, []))
+
+            applied = 0
+            started = time.perf_counter()
+            for key in keys:
+                if key in groups:
+                    applied += self._apply_changes(key, pd.DataFrame(groups[key]))
+            if not applied:
+                return 0
+            self.version += 1
+            self.events["applied"] += applied
+            self.events["last_at"] = time.time()
+            get_metrics().record("dashboard.events", time.perf_counter() - started, rows=applied)
+            if time.time() - self._saved_at >= SAVE_EVERY:
+                self._save()
+            else:
+                self._dirty = True
+            return applied
+
+    def _apply_changes(self, key: str, changes: pd.DataFrame) -> int:
+        changes = changes.drop_duplicates(key, keep="last").reset_index(drop=True)
+        # sessions may be rendering self.df, so write to a new frame; only the columns written are copied
+        written = changes.columns.drop(key)
+        df = self.df.copy(deep=False)
+        for column in written:
+            df[column] = df[column].copy() if column in df.columns else None
+        positions = self._row_positions(key, changes[key])
+        found = positions >= 0
+
+        # full rows after the update: stored values, overlaid with the fields each event carries
+        rows = df.iloc[positions[found]].reset_index(drop=True)
+        overlay = changes[found].reset_index(drop=True)
+        for column in changes.columns:
+            given = overlay[column].notna().to_numpy()
+            rows[column] = rows[column].astype(object)
+            rows.loc[given, column] = overlay.loc[given, column]
+        set_rows(df, positions[found], rows[written])
+        added = changes[~found].reindex(columns=df.columns)
+        rows = pd.concat([rows, added], ignore_index=True)
+        if len(added):
+            df = pd.concat([df, added], ignore_index=True)
+
+        carry_over(self.df, df, np.concatenate([positions[found], np.full(len(added), -1)]), rows, written)
+        # other keys' lookups go stale if the events rewrote that column
+        for other in [k for k in self._positions if k != key and k in changes.columns]:
+            del self._positions[other]
+        for column, lookup in self._positions.items():
+            for offset, value in enumerate(added[column]):
+                if pd.notna(value):
+                    lookup[value] = len(self.df) + offset
+        self.df = df
+        return len(changes)
+
+
+def merge_changes(df: pd.DataFrame, changes: pd.DataFrame) -> pd.DataFrame:
+    if changes.empty:
+        return df
+    key = next((k for k in MERGE_KEYS if k in df.columns and k in changes.columns), None)
+    if key is None:
+        return pd.concat([df, changes], ignore_index=True)
+    kept = df[~df[key].isin(changes[key])]
+    return pd.concat([kept, changes], ignore_index=True)
+
+
+def _max_updated(df: pd.DataFrame):
+    for column in UPDATED_COLUMNS:
+        if column in df.columns:
+            latest = pd.to_datetime(df[column], utc=True, errors="coerce").max()
+            if pd.notna(latest):
+                return latest.isoformat()
+    return None
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_store() -> LeadStore:
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = LeadStore()
+        return _store
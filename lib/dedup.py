@@ -0,0 +1,131 @@
+import os
+import sqlite3
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+from lib.config import DATA_DIR
+
+INDEX_PATH = os.path.join(DATA_DIR, "pushed_leads.sqlite")
+
+# key kind -> candidate column names, in order of preference
+KEY_COLUMNS = {
+    "id": ["id", "person.id", "person_id", "apollo_id"],
+    "email": ["email", "person.email", "Email"],
+    "linkedin": ["linkedin_url", "person.linkedin_url", "LinkedIn URL", "linkedin"],
+}
+LOCKED_EMAIL = "email_not_unlocked"
+# A bare `id` is an Apollo person id only in frames fetched from Apollo; uploaded CSVs often number rows with it
+APOLLO_ONLY_COLUMNS = {"id"}
+
+
+# --- Normalization ---
+def normalize_keys(kind: str, values: pd.Series) -> pd.Series:
+    """Canonical form of one key kind for matching; NA where the value cannot identify a lead."""
+    values = values.astype("string").str.strip().str.lower()
+    if kind == "linkedin":
+        values = (values.str.replace(r"^https?://", "", regex=True)
+                        .str.replace(r"^[a-z]{2,3}\.linkedin\.com", "linkedin.com", regex=True)
+                        .str.replace(r"^www\.", "", regex=True)
+                        .str.split("?").str[0]
+                        .str.rstrip("/"))
+    elif kind == "email":
+        # Apollo masks every locked contact as email_not_unlocked@domain; let id and LinkedIn decide for those
+        real = values.str.contains("@", regex=False) & ~values.str.contains(LOCKED_EMAIL, regex=False)
+        values = values.where(real.fillna(False), pd.NA)
+    return values.replace("", pd.NA)
+
+
+def _find_column(df: pd.DataFrame, candidates: list, apollo: bool = True):
+    return next((c for c in candidates if c in df.columns and (apollo or c not in APOLLO_ONLY_COLUMNS)), None)
+
+
+def batch_keys(df: pd.DataFrame, apollo: bool = True) -> list:
+    """(hashes, valid) per key kind present in `df`, hashed to uint64.
+
+    Pass `apollo=False` for frames from elsewhere (e.g. uploaded CSVs), whose
+    `id` column is not an Apollo person id.
+    """
+    keys = []
+    for kind, candidates in KEY_COLUMNS.items():
+        column = _find_column(df, candidates, apollo)
+        if column is None:
+            continue
+        values = normalize_keys(kind, df[column])
+        valid = values.notna().to_numpy()
+        prefixed = (kind + ":" + values.fillna("")).to_numpy(dtype=object)
+        keys.append((pd.util.hash_array(prefixed), valid))
+    return keys
+
+
+class DedupIndex:
+    """Persistent set of hashed Apollo ids, emails and LinkedIn URLs already pushed."""
+
+    def __init__(self, path: str = INDEX_PATH):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("CREATE TABLE IF NOT EXISTS pushed (hash INTEGER PRIMARY KEY, added REAL)")
+        self._db.commit()
+        stored = np.array([row[0] for row in self._db.execute("SELECT hash FROM pushed")], dtype="int64")
+        self._index = pd.Index(stored.view("uint64"))
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def seen_mask(self, df: pd.DataFrame, keys: list = None) -> np.ndarray:
+        """True for rows already pushed or repeating an earlier row of the batch.
+
+        `keys` are the batch's `batch_keys`, when the caller has them already.
+        """
+        seen = np.zeros(len(df), dtype=bool)
+        with self._lock:
+            index = self._index
+        for hashes, valid in batch_keys(df) if keys is None else keys:
+            seen |= valid & (index.get_indexer(hashes) != -1)
+            repeated = np.zeros(len(df), dtype=bool)
+            repeated[valid] = pd.Series(hashes[valid]).duplicated().to_numpy()
+            seen |= repeated
+        return seen
+
+    def filter_batch(self, df: pd.DataFrame) -> tuple:
+        """Return (new rows, number of suppressed rows)."""
+        seen = self.seen_mask(df)
+        return df[~seen], int(seen.sum())
+
+    def record(self, df: pd.DataFrame, apollo: bool = True):
+        hashes = [h[valid] for h, valid in batch_keys(df, apollo)]
+        if not hashes:
+            return
+        new = np.unique(np.concatenate(hashes))
+        now = time.time()
+        with self._lock:
+            new = new[self._index.get_indexer(new) == -1]
+            if not len(new):
+                return
+            self._db.executemany(
+                "INSERT OR IGNORE INTO pushed (hash, added) VALUES (?, ?)",
+                ((int(h), now) for h in new.view("int64")),
+            )
+            self._db.commit()
+            self._index = self._index.append(pd.Index(new))
+
+    def clear(self):
+        with self._lock:
+            self._db.execute("DELETE FROM pushed")
+            self._db.commit()
+            self._index = pd.Index(np.array([], dtype="uint64"))
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_index() -> DedupIndex:
+    global _index
+    with _index_lock:
+        if _index is None:
+            _index = DedupIndex()
+        return _index
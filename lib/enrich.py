@@ -0,0 +1,186 @@
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import pandas as pd
+
+from lib.apollo import ApolloError, bulk_match_people, match_person
+from lib.cache import get_cache, person_key
+from lib.metrics import stage
+
+BULK_BATCH_SIZE = 10  # Apollo's limit per people/bulk_match call
+
+# Upload columns accepted as match details
+IDENTIFIER_COLUMNS = [
+    "linkedin_url", "email", "hashed_email", "id", "first_name", "last_name",
+    "name", "organization_name", "domain",
+]
+
+# --- Column mapping ---
+COLUMN_MAPPING = {
+    "person.id": "id",
+    "person.first_name": "first_name",
+    "person.last_name": "last_name",
+    "person.name": "name",
+    "person.linkedin_url": "linkedin_url",
+    "person.title": "title",
+    "person.email_status": "email_status",
+    "person.photo_url": "photo_url",
+    "person.twitter_url": "twitter_url",
+    "person.github_url": "github_url",
+    "person.facebook_url": "facebook_url",
+    "person.extrapolated_email_confidence": "extrapolated_email_confidence",
+    "person.headline": "headline",
+    "person.email": "email",
+    "person.organization_id": "organization_id",
+    "person.employment_history": "employment_history",
+    "person.state": "state",
+    "person.city": "city",
+    "person.country": "country",
+    "person.departments": "departments",
+    "person.subdepartments": "subdepartments",
+    "person.seniority": "seniority",
+    "person.functions": "functions",
+    "person.intent_strength": "intent_strength",
+    "person.show_intent": "show_intent",
+    "person.email_domain_catchall": "email_domain_catchall",
+    "person.revealed_for_current_team": "revealed_for_current_team",
+    "person.organization.id": "organization.id",
+    "person.organization.name": "organization.name",
+    "person.organization.website_url": "organization.website_url",
+    "person.organization.blog_url": "organization.blog_url",
+    "person.organization.angellist_url": "organization.angellist_url",
+    "person.organization.linkedin_url": "organization.linkedin_url",
+    "person.organization.twitter_url": "organization.twitter_url",
+    "person.organization.facebook_url": "organization.facebook_url",
+    "person.organization.primary_phone.number": "organization.primary_phone.number",
+    "person.organization.primary_phone.source": "organization.primary_phone.source",
+    "person.organization.primary_phone.sanitized_number": "organization.primary_phone.sanitized_number",
+    "person.organization.languages": "organization.languages",
+    "person.organization.alexa_ranking": "organization.alexa_ranking",
+    "person.organization.phone": "organization.phone",
+    "person.organization.linkedin_uid": "organization.linkedin_uid",
+    "person.organization.founded_year": "organization.founded_year",
+    "person.organization.publicly_traded_symbol": "organization.publicly_traded_symbol",
+    "person.organization.publicly_traded_exchange": "organization.publicly_traded_exchange",
+    "person.organization.logo_url": "organization.logo_url",
+    "person.organization.crunchbase_url": "organization.crunchbase_url",
+    "person.organization.primary_domain": "organization.primary_domain",
+    "person.organization.sanitized_phone": "organization.sanitized_phone",
+    "person.organization.organization_headcount_six_month_growth": "organization.organization_headcount_six_month_growth",
+    "person.organization.organization_headcount_twelve_month_growth": "organization.organization_headcount_twelve_month_growth",
+    "person.organization.organization_headcount_twenty_four_month_growth": "organization.organization_headcount_twenty_four_month_growth",
+    "person.organization.market_cap": "organization.market_cap",
+}
+
+
+def normalize_matches(people: list) -> pd.DataFrame:
+    """Flatten people/match payloads into the COLUMN_MAPPING schema."""
+    with stage("normalize", rows=len(people)):
+        df_result = pd.json_normalize(people)
+    df_result.rename(columns=COLUMN_MAPPING, inplace=True)
+
+    # Ensure all expected columns are present
+    for col in COLUMN_MAPPING.values():
+        if col not in df_result.columns:
+            df_result[col] = None
+
+    return df_result[list(COLUMN_MAPPING.values())]
+
+
+# --- Upload parsing ---
+def rows_to_details(upload_df: pd.DataFrame) -> tuple:
+    """Turn an uploaded CSV into match details, returning (details, skipped)."""
+    upload_df = upload_df.rename(columns=lambda c: str(c).strip().lower().replace(" ", "_"))
+    columns = [c for c in IDENTIFIER_COLUMNS if c in upload_df.columns]
+
+    details, skipped = [], 0
+    for row in upload_df[columns].fillna("").astype(str).itertuples(index=False):
+        detail = {k: v.strip() for k, v in zip(columns, row) if v.strip()}
+        has_name = detail.get("name") or (detail.get("first_name") and detail.get("last_name"))
+        has_company = detail.get("domain") or detail.get("organization_name")
+        if detail.get("linkedin_url") or detail.get("email") or detail.get("hashed_email") \
+                or detail.get("id") or (has_name and has_company):
+            details.append(detail)
+        else:
+            skipped += 1
+    return details, skipped
+
+
+# --- Bulk enrichment ---
+def _match_batch(api_key: str, batch: list, flags: dict, use_bulk: bool) -> list:
+    if use_bulk:
+        matches = bulk_match_people(api_key, batch, flags)
+        cache = get_cache()
+        for detail, person in zip(batch, matches):
+            if person:
+                cache.set(person_key({**detail, **flags}), {"person": person})
+        return matches
+    return [match_person(api_key, {**detail, **flags}, use_cache=False).get("person") for detail in batch]
+
+
+def match_details(api_key: str, details: list, flags: dict, max_workers: int = 4,
+                  batch_size: int = BULK_BATCH_SIZE, on_progress=None, use_cache: bool = True) -> dict:
+    """Match `details` in batches through people/bulk_match; returns {position: person or None}.
+
+    Rows already in the local cache are served from it. If the bulk endpoint
+    is unavailable for the key (404/403), falls back to concurrent single
+    people/match calls. `on_progress(done, total, rows_per_sec)` is called
+    from the calling thread.
+    """
+    started = time.monotonic()
+    matched = {}
+    pending = []
+    cache = get_cache()
+    for i, detail in enumerate(details):
+        cached = cache.get(person_key({**detail, **flags})) if use_cache else None
+        if cached:
+            matched[i] = cached.get("person")
+        else:
+            pending.append(i)
+
+    done = len(matched)
+
+    def report(rows: int):
+        nonlocal done
+        done += rows
+        if on_progress:
+            on_progress(done, len(details), done / max(time.monotonic() - started, 1e-6))
+
+    batches = [pending[i:i + batch_size] for i in range(0, len(pending), batch_size)]
+
+    def run(batch: list, use_bulk: bool):
+        matches = _match_batch(api_key, [details[i] for i in batch], flags, use_bulk)
+        return dict(zip(batch, matches))
+
+    use_bulk = len(pending) > 1  # a lone lookup goes straight to people/match
+    if batches:
+        try:
+            matched.update(run(batches[0], use_bulk))
+        except ApolloError as e:
+            if e.status_code not in (403, 404):
+                raise
+            use_bulk = False
+            matched.update(run(batches[0], use_bulk))
+    report(len(batches[0]) if batches else 0)
+
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        futures = {pool.submit(run, batch, use_bulk): batch for batch in batches[1:]}
+        try:
+            for future in as_completed(futures):
+                matched.update(future.result())
+                report(len(futures[future]))
+        except Exception:
+            for future in futures:
+                future.cancel()
+            raise
+
+    return matched
+
+
+def enrich_bulk(api_key: str, details: list, flags: dict, max_workers: int = 4,
+                batch_size: int = BULK_BATCH_SIZE, on_progress=None, use_cache: bool = True) -> pd.DataFrame:
+    """`match_details` flattened into the COLUMN_MAPPING schema, unmatched rows dropped."""
+    matched = match_details(api_key, details, flags, max_workers=max_workers, batch_size=batch_size,
+                            on_progress=on_progress, use_cache=use_cache)
+    people = [{"person": matched[i]} for i in range(len(details)) if matched.get(i)]
+    return normalize_matches(people)
@@ -0,0 +1,125 @@
+import hashlib
+import json
+import threading
+import time
+import weakref
+from collections import OrderedDict
+
+import pandas as pd
+
+from lib.metrics import get_metrics
+
+# format -> (file extension, mime type)
+EXPORT_FORMATS = {
+    "CSV": ("csv", "text/csv"),
+    "JSONL": ("jsonl", "application/x-ndjson"),
+    "Parquet": ("parquet", "application/vnd.apache.parquet"),
+}
+
+MAX_CACHED_EXPORTS = 8
+
+_fingerprints = {}
+_exports = OrderedDict()
+_lock = threading.Lock()
+
+
+def parquet_available() -> bool:
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def available_formats() -> list:
+    return [fmt for fmt in EXPORT_FORMATS if fmt != "Parquet" or parquet_available()]
+
+
+# --- Fingerprint ---
+def _hash_column(col: pd.Series):
+    try:
+        return pd.util.hash_pandas_object(col, index=False)
+    except TypeError:
+        # nested lists/dicts from json_normalize are not hashable
+        return pd.util.hash_pandas_object(col.map(repr), index=False)
+
+
+def fingerprint(df: pd.DataFrame) -> str:
+    """Content hash of `df`, computed once per DataFrame object."""
+    entry = _fingerprints.get(id(df))
+    if entry is not None and entry[0]() is df:
+        return entry[1]
+
+    digest = hashlib.sha256(repr((df.shape, list(df.columns))).encode())
+    for name in df.columns:
+        digest.update(_hash_column(df[name]).values.tobytes())
+    value = digest.hexdigest()
+
+    key = id(df)
+    _fingerprints[key] = (weakref.ref(df, lambda _: _fingerprints.pop(key, None)), value)
+    return value
+
+
+# --- Serializers ---
+def _jsonify_nested(df: pd.DataFrame) -> pd.DataFrame:
+    df = df.copy()
+    for name in df.columns[df.dtypes == object]:
+        if df[name].map(lambda v: isinstance(v, (list, dict))).any():
+            df[name] = df[name].map(lambda v: json.dumps(v) if isinstance(v, (list, dict)) else v)
+    return df
+
+
+def to_parquet(df: pd.DataFrame) -> bytes:
+    """Parquet bytes for `df`, serialized directly; use `get_export` for memoized downloads."""
+    try:
+        return df.to_parquet(index=False)
+    except (TypeError, ValueError):
+        # mixed nested payloads Arrow cannot infer a type for
+        return _jsonify_nested(df).to_parquet(index=False)
+
+
+def _serialize(df: pd.DataFrame, fmt: str) -> bytes:
+    if fmt == "CSV":
+        return df.to_csv(index=False).encode("utf-8")
+    if fmt == "JSONL":
+        return df.to_json(orient="records", lines=True).encode("utf-8")
+    if fmt == "Parquet":
+        return to_parquet(df)
+    raise ValueError(f"Unknown export format: {fmt}")
+
+
+def get_export(df: pd.DataFrame, fmt: str = "CSV") -> tuple:
+    """Return (payload, build_seconds, from_cache) for `df` in `fmt`.
+
+    Payloads are memoized by content fingerprint, so reruns that do not
+    change the leads reuse the previous serialization.
+    """
+    key = (fingerprint(df), fmt)
+    with _lock:
+        if key in _exports:
+            _exports.move_to_end(key)
+            payload, seconds = _exports[key]
+            return payload, seconds, True
+
+    started = time.perf_counter()
+    payload = _serialize(df, fmt)
+    seconds = time.perf_counter() - started
+    get_metrics().record(f"export.{fmt.lower()}", seconds, rows=len(df), nbytes=len(payload))
+
+    with _lock:
+        _exports[key] = (payload, seconds)
+        while len(_exports) > MAX_CACHED_EXPORTS:
+            _exports.popitem(last=False)
+    return payload, seconds, False
+
+
+def clear_exports():
+    with _lock:
+        _exports.clear()
+
+
+def cached_export(df: pd.DataFrame, fmt: str = "CSV"):
+    """The memoized payload for `df` in `fmt`, or None if it has not been built yet."""
+    with _lock:
+        entry = _exports.get((fingerprint(df), fmt))
+    return entry[0] if entry else None
@@ -0,0 +1,79 @@
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+
+from lib.enrich import COLUMN_MAPPING
+
+PAGE_SIZES = [50, 100, 250, 500]
+
+
+def default_columns(columns: list) -> list:
+    """Project to the COLUMN_MAPPING fields when present, otherwise show everything."""
+    mapped = set(COLUMN_MAPPING.values())
+    return [c for c in columns if c in mapped] or list(columns)
+
+
+# --- Arrow tables (pull store) ---
+def _text(column: pa.ChunkedArray) -> pa.ChunkedArray:
+    return column.cast(pa.string()) if pa.types.is_dictionary(column.type) else column
+
+
+def sortable_fields(schema: pa.Schema) -> list:
+    return [f.name for f in schema if not pa.types.is_nested(f.type)]
+
+
+def query_table(table: pa.Table, sort_by: str = None, descending: bool = False, search: str = "",
+                offset: int = 0, limit: int = 100) -> tuple:
+    """Filter, sort and window `table`; returns (window, matching rows).
+
+    `search` is a case-insensitive substring match over the string columns.
+    Only the window's rows are gathered after sorting.
+    """
+    if search:
+        mask = None
+        for field in table.schema:
+            if pa.types.is_string(field.type) or pa.types.is_dictionary(field.type):
+                hit = pc.match_substring(_text(table.column(field.name)), search, ignore_case=True)
+                mask = hit if mask is None else pc.or_kleene(mask, hit)
+        table = table.filter(pc.fill_null(mask, False)) if mask is not None else table.slice(0, 0)
+
+    matched = table.num_rows
+    if sort_by and matched:
+        column = _text(table.column(sort_by)).combine_chunks()
+        order = pc.array_sort_indices(column, order="descending" if descending else "ascending",
+                                      null_placement="at_end")
+        return table.take(order.slice(offset, limit)), matched
+    return table.slice(offset, limit), matched
+
+
+# --- DataFrames (dashboard list, enrichment results) ---
+def sortable_columns(df: pd.DataFrame) -> list:
+    """Columns without list/dict cells, which pandas cannot order."""
+    columns = []
+    for name in df.columns:
+        if df[name].dtype == object:
+            sample = df[name].dropna().head(50)
+            if any(isinstance(v, (list, dict)) for v in sample):
+                continue
+        columns.append(name)
+    return columns
+
+
+def query_frame(df: pd.DataFrame, columns: list = None, sort_by: str = None, descending: bool = False,
+                search: str = "", offset: int = 0, limit: int = 100) -> tuple:
+    """DataFrame counterpart of `query_table`; search covers the projected columns only."""
+    columns = list(columns or df.columns)
+    if search:
+        mask = np.zeros(len(df), dtype=bool)
+        for name in columns:
+            if df[name].dtype == object or isinstance(df[name].dtype, (pd.CategoricalDtype, pd.StringDtype)):
+                mask |= df[name].astype(str).str.contains(search, case=False, regex=False, na=False).to_numpy()
+        df = df[mask]
+
+    matched = len(df)
+    if sort_by and matched:
+        ordered = df[sort_by].reset_index(drop=True).sort_values(
+            ascending=not descending, na_position="last", kind="stable")
+        return df.iloc[ordered.index[offset:offset + limit]][columns], matched
+    return df.iloc[offset:offset + limit][columns], matched
@@ -0,0 +1,162 @@
+import os
+import threading
+import time
+from collections import defaultdict, deque
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+
+from lib.config import APOLLO_BASE_URL, N8N_BASE_URL
+
+POOL_SIZE = int(os.environ.get("LEAD_MACHINE_HTTP_POOL_SIZE", 32))
+USE_HTTP2 = os.environ.get("LEAD_MACHINE_HTTP2", "").lower() in ("1", "true", "yes")
+
+# (connect, read) seconds per host; callers may still pass `timeout=` explicitly
+HOST_TIMEOUTS = {
+    urlparse(APOLLO_BASE_URL).hostname: (5, 30),
+    urlparse(N8N_BASE_URL).hostname: (10, 300),
+}
+DEFAULT_TIMEOUT = (10, 60)
+LATENCY_SAMPLES = 500
+
+
+def http2_available() -> bool:
+    try:
+        import h2  # noqa: F401
+        import httpx  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+class HostStats:
+    def __init__(self):
+        self.requests = 0
+        self.errors = 0
+        self.latencies = deque(maxlen=LATENCY_SAMPLES)
+
+
+class HttpClient:
+    """Process-wide keep-alive client shared by every page and background job.
+
+    Uses a pooled requests.Session, or httpx with HTTP/2 when enabled and
+    installed. Responses are always requests.Response objects, so callers
+    handle errors the same way either way.
+    """
+
+    def __init__(self, pool_size: int = POOL_SIZE, http2: bool = USE_HTTP2):
+        self.pool_size = pool_size
+        self.http2 = http2 and http2_available()
+        self._lock = threading.Lock()
+        self._stats = defaultdict(HostStats)
+
+        if self.http2:
+            import httpx
+            self._httpx = httpx.Client(
+                http2=True,
+                limits=httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size),
+            )
+        else:
+            self._session = requests.Session()
+            self._adapter = HTTPAdapter(pool_connections=8, pool_maxsize=pool_size)
+            self._session.mount("https://", self._adapter)
+            self._session.mount("http://", self._adapter)
+
+    def request(self, method: str, url: str, **kwargs) -> requests.Response:
+        host = urlparse(url).hostname or ""
+        kwargs.setdefault("timeout", HOST_TIMEOUTS.get(host, DEFAULT_TIMEOUT))
+        started = time.perf_counter()
+        try:
+            if self.http2:
+                response = self._httpx_request(method, url, **kwargs)
+            else:
+                response = self._session.request(method, url, **kwargs)
+        except Exception:
+            with self._lock:
+                self._stats[host].requests += 1
+                self._stats[host].errors += 1
+            raise
+        with self._lock:
+            stats = self._stats[host]
+            stats.requests += 1
+            stats.latencies.append(time.perf_counter() - started)
+            if response.status_code >= 500:
+                stats.errors += 1
+        return response
+
+    def get(self, url: str, **kwargs) -> requests.Response:
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url: str, **kwargs) -> requests.Response:
+        return self.request("POST", url, **kwargs)
+
+    # --- HTTP/2 backend ---
+    def _httpx_request(self, method: str, url: str, timeout=None, data=None, **kwargs) -> requests.Response:
+        import httpx
+
+        connect, read = timeout if isinstance(timeout, tuple) else (timeout, timeout)
+        if data is not None and not isinstance(data, (dict, str, bytes)):
+            kwargs["content"] = data  # generator-backed streaming body
+        elif data is not None:
+            kwargs["data" if isinstance(data, dict) else "content"] = data
+        try:
+            reply = self._httpx.request(method, url, timeout=httpx.Timeout(read, connect=connect), **kwargs)
+        except httpx.TimeoutException as e:
+            raise requests.exceptions.Timeout(str(e)) from e
+        except httpx.TransportError as e:
+            raise requests.exceptions.ConnectionError(str(e)) from e
+
+        response = requests.Response()
+        response.status_code = reply.status_code
+        response.headers = CaseInsensitiveDict(reply.headers)
+        response._content = reply.content
+        response.url = str(reply.url)
+        response.reason = reply.reason_phrase
+        response.encoding = reply.encoding
+        return response
+
+    # --- Metrics ---
+    def _connections_opened(self) -> dict:
+        """New TCP+TLS connections per host, from urllib3's pool counters."""
+        if self.http2:
+            return {}
+        opened = defaultdict(int)
+        pools = self._adapter.poolmanager.pools
+        for key in list(pools.keys()):
+            pool = pools.get(key)
+            if pool is not None:
+                opened[pool.host] += pool.num_connections
+        return opened
+
+    def metrics(self) -> list:
+        opened = self._connections_opened()
+        rows = []
+        with self._lock:
+            for host, stats in self._stats.items():
+                latencies = sorted(stats.latencies)
+                connections = opened.get(host)
+                rows.append({
+                    "host": host,
+                    "requests": stats.requests,
+                    "errors": stats.errors,
+                    "p50_ms": round(latencies[len(latencies) // 2] * 1000, 1) if latencies else None,
+                    "p95_ms": round(latencies[int(len(latencies) * 0.95)] * 1000, 1) if latencies else None,
+                    "connections": connections,
+                    "reuse_rate": round(1 - connections / stats.requests, 3)
+                    if connections is not None and stats.requests else None,
+                })
+        return rows
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_client() -> HttpClient:
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = HttpClient()
+        return _client
@@ -0,0 +1,117 @@
+import hmac
+import ipaddress
+import json
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+from lib.dashboard_data import get_store
+from lib.phones import get_reveals
+
+# n8n posts lead status events to /events, e.g. an HTTP Request node after "Replied"/"Bounced";
+# Apollo's asynchronous phone reveals go to /phones, directly or forwarded by n8n
+INGEST_HOST = os.environ.get("LEAD_MACHINE_INGEST_HOST", "127.0.0.1")
+INGEST_PORT = int(os.environ.get("LEAD_MACHINE_INGEST_PORT", 8601))
+INGEST_TOKEN = os.environ.get("LEAD_MACHINE_INGEST_TOKEN", "")
+MAX_BODY_BYTES = 10 * 1024 * 1024
+
+
+def parse_events(payload) -> list:
+    """Accept one event, a list of events, or `{"events": [...]}`."""
+    if isinstance(payload, dict) and isinstance(payload.get("events"), list):
+        return payload["events"]
+    if isinstance(payload, dict):
+        return [payload]
+    if isinstance(payload, list):
+        return payload
+    return []
+
+
+class IngestHandler(BaseHTTPRequestHandler):
+    server_version = "LeadMachineIngest/1.0"
+
+    def log_message(self, format, *args):
+        pass
+
+    def _reply(self, status: int, payload: dict):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path.rstrip("/") != "/health":
+            return self._reply(404, {"error": "not found"})
+        store = get_store()
+        self._reply(200, {"version": store.version, **store.events})
+
+    def _authorized(self) -> bool:
+        """The token may come as an `x-ingest-token` header or, for senders like Apollo
+        that cannot set headers, as `?token=` on the URL."""
+        if not INGEST_TOKEN:
+            return True
+        given = self.headers.get("x-ingest-token") or parse_qs(urlsplit(self.path).query).get("token", [""])[0]
+        return hmac.compare_digest(given.encode(), INGEST_TOKEN.encode())
+
+    def do_POST(self):
+        path = urlsplit(self.path).path.rstrip("/")
+        if path not in ("/events", "/phones"):
+            return self._reply(404, {"error": "not found"})
+        if not self._authorized():
+            return self._reply(401, {"error": "bad token"})
+        length = int(self.headers.get("Content-Length") or 0)
+        if not length or length > MAX_BODY_BYTES:
+            return self._reply(413 if length else 400, {"error": "body required (max 10 MB)"})
+        try:
+            payload = json.loads(self.rfile.read(length))
+        except ValueError as e:
+            return self._reply(400, {"error": f"invalid JSON: {e}"})
+        if path == "/phones":
+            return self._reply(200, {"received": get_reveals().receive(payload)})
+        events = parse_events(payload)
+        store = get_store()
+        skipped = store.events["skipped"]
+        applied = store.apply_events(events)
+        self._reply(200, {"received": len(events), "applied": applied,
+                          "skipped": store.events["skipped"] - skipped})
+
+
+_server = None
+_server_error = None
+_server_lock = threading.Lock()
+
+
+def is_loopback(host: str) -> bool:
+    try:
+        return host == "localhost" or ipaddress.ip_address(host).is_loopback
+    except ValueError:
+        return False
+
+
+def start_ingest(host: str = INGEST_HOST, port: int = INGEST_PORT):
+    """Start the event receiver once per process; returns (server or None, error message).
+
+    Anything reachable beyond this machine must be authenticated, so binding
+    to a non-loopback host requires LEAD_MACHINE_INGEST_TOKEN.
+    """
+    global _server, _server_error
+    with _server_lock:
+        if _server is None and _server_error is None and not INGEST_TOKEN and not is_loopback(host):
+            _server_error = f"Set LEAD_MACHINE_INGEST_TOKEN to accept events on {host}:{port}"
+        if _server is None and _server_error is None:
+            try:
+                _server = ThreadingHTTPServer((host, port), IngestHandler)
+                _server.daemon_threads = True
+                threading.Thread(target=_server.serve_forever, daemon=True, name="lead-ingest").start()
+            except OSError as e:
+                _server_error = f"Could not listen on {host}:{port}: {e}"
+        return _server, _server_error
+
+
+def ingest_url(server, path: str = "/events") -> str:
+    """Where to POST; the token is included as a query parameter when one is configured."""
+    host, port = server.server_address[:2]
+    return f"http://{host}:{port}{path}" + (f"?token={INGEST_TOKEN}" if INGEST_TOKEN else "")
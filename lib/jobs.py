@@ -0,0 +1,186 @@
+import glob
+import logging
+import os
+import pickle
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from lib.config import DATA_DIR, data_path
+
+JOBS_PATH = os.path.join(DATA_DIR, "jobs.sqlite")
+MAX_WORKERS = int(os.environ.get("LEAD_MACHINE_JOB_WORKERS", 4))
+PARTIAL_EVERY = 5.0  # seconds between partial-result snapshots
+JOB_RETENTION_DAYS = int(os.environ.get("LEAD_MACHINE_JOB_RETENTION_DAYS", 7))
+
+ACTIVE = ("queued", "running")
+
+log = logging.getLogger(__name__)
+
+
+class JobCancelled(Exception):
+    pass
+
+
+class JobContext:
+    """Handle passed to a job function for reporting progress and partial results."""
+
+    def __init__(self, manager, job_id: str):
+        self.manager = manager
+        self.job_id = job_id
+        self._last_partial = 0.0
+
+    @property
+    def cancelled(self) -> bool:
+        return self.job_id in self.manager._cancelled
+
+    def check(self):
+        if self.cancelled:
+            raise JobCancelled()
+
+    def progress(self, done: int, total: int, message: str = ""):
+        self.manager._update(self.job_id, done=done, total=total, message=message)
+        self.check()
+
+    def partial(self, build, force: bool = False):
+        """Snapshot `build()` as the job's partial result, at most every PARTIAL_EVERY seconds."""
+        now = time.monotonic()
+        if force or now - self._last_partial >= PARTIAL_EVERY:
+            self._last_partial = now
+            self.manager._store_result(self.job_id, build(), partial=True)
+
+
+class JobManager:
+    """Worker pool plus a SQLite job table, shared by every Streamlit session.
+
+    Jobs outlive the script run (and browser tab) that submitted them; pages
+    poll `get`/`list` and load results with `result`.
+    """
+
+    def __init__(self, path: str = JOBS_PATH, max_workers: int = MAX_WORKERS):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._lock = threading.Lock()
+        self._cancelled = set()
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="lead-job")
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.row_factory = sqlite3.Row
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            " id TEXT PRIMARY KEY, kind TEXT, label TEXT, status TEXT,"
+            " done INTEGER DEFAULT 0, total INTEGER DEFAULT 0, message TEXT DEFAULT '',"
+            " has_result INTEGER DEFAULT 0, created REAL, updated REAL)"
+        )
+        # jobs from a previous process can no longer make progress
+        self._db.execute(
+            "UPDATE jobs SET status = 'interrupted', message = 'Server restarted' WHERE status IN (?, ?)",
+            ACTIVE,
+        )
+        self._db.commit()
+
+    def _update(self, job_id: str, **fields):
+        fields["updated"] = time.time()
+        columns = ", ".join(f"{name} = ?" for name in fields)
+        with self._lock:
+            self._db.execute(f"UPDATE jobs SET {columns} WHERE id = ?", (*fields.values(), job_id))
+            self._db.commit()
+
+    def _result_path(self, job_id: str) -> str:
+        return data_path("jobs", f"{job_id}.pkl")
+
+    def _store_result(self, job_id: str, result, partial: bool = False):
+        path = self._result_path(job_id)
+        with open(path + ".tmp", "wb") as f:
+            pickle.dump(result, f)
+        os.replace(path + ".tmp", path)
+        self._update(job_id, has_result=1 if partial else 2)
+
+    def prune(self, max_age_days: int = JOB_RETENTION_DAYS) -> int:
+        """Forget finished jobs last updated more than `max_age_days` ago and delete their results."""
+        cutoff = time.time() - max_age_days * 86400
+        with self._lock:
+            old = [row["id"] for row in self._db.execute(
+                f"SELECT id FROM jobs WHERE updated < ? AND status NOT IN ({', '.join('?' for _ in ACTIVE)})",
+                (cutoff, *ACTIVE),
+            )]
+            self._db.executemany("DELETE FROM jobs WHERE id = ?", ((job_id,) for job_id in old))
+            self._db.commit()
+        for job_id in old:
+            for path in glob.glob(self._result_path(job_id) + "*"):
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+        return len(old)
+
+    def submit(self, kind: str, label: str, fn, *args, **kwargs) -> str:
+        """Queue `fn(job, *args, **kwargs)`; its return value becomes the job result."""
+        self.prune()
+        job_id = uuid.uuid4().hex[:12]
+        now = time.time()
+        with self._lock:
+            self._db.execute(
+                "INSERT INTO jobs (id, kind, label, status, created, updated) VALUES (?, ?, ?, 'queued', ?, ?)",
+                (job_id, kind, label, now, now),
+            )
+            self._db.commit()
+        self._pool.submit(self._run, job_id, fn, args, kwargs)
+        return job_id
+
+    def _run(self, job_id: str, fn, args, kwargs):
+        job = JobContext(self, job_id)
+        try:
+            job.check()
+            self._update(job_id, status="running")
+            result = fn(job, *args, **kwargs)
+            if result is not None:
+                self._store_result(job_id, result)
+            self._update(job_id, status="done")
+        except JobCancelled:
+            self._update(job_id, status="cancelled", message="Cancelled")
+        except Exception as e:
+            log.exception("Job %s failed", job_id)
+            self._update(job_id, status="failed", message=str(e))
+        finally:
+            self._cancelled.discard(job_id)
+
+    def cancel(self, job_id: str):
+        self._cancelled.add(job_id)
+        with self._lock:
+            self._db.execute("UPDATE jobs SET status = 'cancelled' WHERE id = ? AND status = 'queued'", (job_id,))
+            self._db.commit()
+
+    def get(self, job_id: str):
+        with self._lock:
+            row = self._db.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return dict(row) if row else None
+
+    def list(self, kinds: tuple = (), limit: int = 20) -> list:
+        query, params = "SELECT * FROM jobs", []
+        if kinds:
+            query += f" WHERE kind IN ({', '.join('?' for _ in kinds)})"
+            params = list(kinds)
+        query += " ORDER BY created DESC LIMIT ?"
+        with self._lock:
+            rows = self._db.execute(query, (*params, limit)).fetchall()
+        return [dict(row) for row in rows]
+
+    def result(self, job_id: str):
+        path = self._result_path(job_id)
+        if not os.path.exists(path):
+            return None
+        with open(path, "rb") as f:
+            return pickle.load(f)
+
+
+_manager = None
+_manager_lock = threading.Lock()
+
+
+def get_manager() -> JobManager:
+    global _manager
+    with _manager_lock:
+        if _manager is None:
+            _manager = JobManager()
+        return _manager
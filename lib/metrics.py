@@ -0,0 +1,131 @@
+import json
+import os
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import contextmanager
+
+# Every finished stage is also appended here as a JSON line when set
+METRICS_LOG = os.environ.get("LEAD_MACHINE_METRICS_LOG", "")
+MAX_EVENTS = 5000
+LATENCY_SAMPLES = 500
+
+
+class StageStats:
+    def __init__(self):
+        self.calls = 0
+        self.seconds = 0.0
+        self.rows = 0
+        self.bytes = 0
+        self.credits = 0
+        self.latencies = deque(maxlen=LATENCY_SAMPLES)
+
+
+class Span:
+    """Mutable counters for one running stage; set `rows`/`bytes`/`credits` inside the block."""
+
+    def __init__(self, rows: int = 0, nbytes: int = 0, credits: int = 0):
+        self.rows = rows
+        self.bytes = nbytes
+        self.credits = credits
+
+
+class Metrics:
+    """Process-wide per-stage timings, rows, bytes and Apollo credits."""
+
+    def __init__(self, log_path: str = METRICS_LOG):
+        self._lock = threading.Lock()
+        self._stages = defaultdict(StageStats)
+        self._events = deque(maxlen=MAX_EVENTS)
+        self.log_path = log_path
+        self.started = time.time()
+
+    def record(self, stage: str, seconds: float, rows: int = 0, nbytes: int = 0, credits: int = 0):
+        event = {"ts": round(time.time(), 3), "stage": stage, "seconds": round(seconds, 6),
+                 "rows": rows, "bytes": nbytes, "credits": credits}
+        with self._lock:
+            stats = self._stages[stage]
+            stats.calls += 1
+            stats.seconds += seconds
+            stats.rows += rows
+            stats.bytes += nbytes
+            stats.credits += credits
+            stats.latencies.append(seconds)
+            self._events.append(event)
+            if self.log_path:
+                with open(self.log_path, "a") as f:
+                    f.write(json.dumps(event) + "\n")
+
+    @contextmanager
+    def stage(self, name: str, rows: int = 0, nbytes: int = 0, credits: int = 0):
+        span = Span(rows, nbytes, credits)
+        started = time.perf_counter()
+        try:
+            yield span
+        finally:
+            self.record(name, time.perf_counter() - started, span.rows, span.bytes, span.credits)
+
+    def reset(self):
+        with self._lock:
+            self._stages.clear()
+            self._events.clear()
+            self.started = time.time()
+
+    def snapshot(self) -> list:
+        rows = []
+        with self._lock:
+            for name, stats in sorted(self._stages.items()):
+                latencies = sorted(stats.latencies)
+                rows.append({
+                    "stage": name,
+                    "calls": stats.calls,
+                    "total_s": round(stats.seconds, 3),
+                    "p50_ms": round(latencies[len(latencies) // 2] * 1000, 1) if latencies else None,
+                    "max_ms": round(latencies[-1] * 1000, 1) if latencies else None,
+                    "rows": stats.rows,
+                    "bytes": stats.bytes,
+                    "credits": stats.credits,
+                })
+        return rows
+
+    # --- Export ---
+    def to_prometheus(self) -> str:
+        # (snapshot key, metric suffix, help text); all are counters
+        series = [
+            ("calls", "calls_total", "Completed stage runs"),
+            ("total_s", "seconds_total", "Seconds spent in the stage"),
+            ("rows", "rows_total", "Rows processed by the stage"),
+            ("bytes", "bytes_total", "Bytes transferred or produced by the stage"),
+            ("credits", "credits_total", "Apollo credits consumed by the stage"),
+        ]
+        snapshot = self.snapshot()
+        lines = []
+        for key, suffix, help_text in series:
+            metric = f"lead_machine_stage_{suffix}"
+            lines.append(f"# HELP {metric} {help_text}")
+            lines.append(f"# TYPE {metric} counter")
+            for row in snapshot:
+                lines.append(f'{metric}{{stage="{row["stage"]}"}} {row[key]}')
+        return "\n".join(lines) + "\n"
+
+    def to_jsonl(self) -> str:
+        with self._lock:
+            events = list(self._events)
+        return "".join(json.dumps(event) + "\n" for event in events)
+
+
+_metrics = None
+_metrics_lock = threading.Lock()
+
+
+def get_metrics() -> Metrics:
+    global _metrics
+    with _metrics_lock:
+        if _metrics is None:
+            _metrics = Metrics()
+        return _metrics
+
+
+def stage(name: str, rows: int = 0, nbytes: int = 0, credits: int = 0):
+    """`with stage("webhook.push") as span: ...` times the block into the shared metrics."""
+    return get_metrics().stage(name, rows, nbytes, credits)
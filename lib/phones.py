@@ -0,0 +1,157 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+
+import pandas as pd
+
+from lib.config import DATA_DIR
+
+REVEALS_PATH = os.path.join(DATA_DIR, "phone_reveals.sqlite")
+# Apollo usually delivers within minutes; reveals still pending after this are given up on
+REVEAL_TIMEOUT = int(os.environ.get("LEAD_MACHINE_PHONE_TIMEOUT", 3600))
+QUERY_BATCH = 500  # ids per IN (...) lookup, below SQLite's variable limit
+
+
+def parse_reveals(payload) -> list:
+    """(person id, phone numbers, status) for each person in an Apollo phone webhook payload.
+
+    Accepts Apollo's `{"people": [...]}` delivery, a single `{"person": {...}}`
+    or person, or a list of either, so n8n can forward what it received as is.
+    """
+    if isinstance(payload, list):
+        return [reveal for item in payload for reveal in parse_reveals(item)]
+    if not isinstance(payload, dict):
+        return []
+    if isinstance(payload.get("people"), list):
+        return parse_reveals(payload["people"])
+    if isinstance(payload.get("person"), dict):
+        return parse_reveals(payload["person"])
+    person_id = payload.get("id") or payload.get("person_id")
+    if not person_id:
+        return []
+    phones = [p for p in payload.get("phone_numbers") or [] if isinstance(p, dict)]
+    return [(str(person_id), phones, str(payload.get("status") or "success"))]
+
+
+def _number(phone: dict) -> str:
+    return str(phone.get("sanitized_number") or phone.get("raw_number") or "")
+
+
+class PhoneReveals:
+    """Outstanding and delivered phone reveals, keyed by Apollo person id.
+
+    Every enriched person with a phone reveal requested is registered as
+    pending with a deadline; an index on the deadline lets `expire` flip
+    overdue reveals without scanning delivered ones. Deliveries for ids that
+    were never registered (e.g. from another session) are kept too.
+    """
+
+    def __init__(self, path: str = REVEALS_PATH, timeout: int = REVEAL_TIMEOUT):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.timeout = timeout
+        self.version = 0
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS reveals ("
+            " person_id TEXT PRIMARY KEY, status TEXT, phones TEXT, requested REAL, expires REAL, received REAL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS reveals_pending ON reveals (status, expires)")
+        self._db.commit()
+
+    def expect(self, person_ids) -> int:
+        """Register reveals requested for `person_ids`; already delivered ones are left alone."""
+        now = time.time()
+        rows = [(str(pid), now, now + self.timeout) for pid in person_ids if pid]
+        with self._lock:
+            self._db.executemany(
+                "INSERT INTO reveals (person_id, status, requested, expires) VALUES (?, 'pending', ?, ?)"
+                " ON CONFLICT (person_id) DO UPDATE SET status = 'pending', requested = excluded.requested,"
+                " expires = excluded.expires WHERE status != 'received'",
+                rows,
+            )
+            self._db.commit()
+            self.version += 1
+        return len(rows)
+
+    def receive(self, payload) -> int:
+        """Store the phones in an Apollo webhook payload; returns how many people it covered."""
+        reveals = parse_reveals(payload)
+        now = time.time()
+        rows = [(pid, "received" if phones else "no_phone", json.dumps(phones), now, now)
+                for pid, phones, _ in reveals]
+        with self._lock:
+            self._db.executemany(
+                "INSERT INTO reveals (person_id, status, phones, requested, received) VALUES (?, ?, ?, ?, ?)"
+                " ON CONFLICT (person_id) DO UPDATE SET status = excluded.status, phones = excluded.phones,"
+                " received = excluded.received",
+                rows,
+            )
+            self._db.commit()
+            self.version += 1
+        return len(rows)
+
+    def expire(self) -> int:
+        with self._lock:
+            expired = self._db.execute(
+                "UPDATE reveals SET status = 'expired' WHERE status = 'pending' AND expires < ?", (time.time(),)
+            ).rowcount
+            self._db.commit()
+            if expired:
+                self.version += 1
+        return expired
+
+    def lookup(self, person_ids: list) -> dict:
+        """{person id: (status, phones)} for the ids that have a reveal on record."""
+        self.expire()
+        ids = list(dict.fromkeys(str(pid) for pid in person_ids if pid))
+        found = {}
+        with self._lock:
+            for start in range(0, len(ids), QUERY_BATCH):
+                batch = ids[start:start + QUERY_BATCH]
+                placeholders = ",".join("?" * len(batch))
+                for pid, status, phones in self._db.execute(
+                    f"SELECT person_id, status, phones FROM reveals WHERE person_id IN ({placeholders})", batch
+                ):
+                    found[pid] = (status, json.loads(phones) if phones else [])
+        return found
+
+    def summary(self, person_ids: list) -> dict:
+        counts = {"pending": 0, "received": 0, "no_phone": 0, "expired": 0}
+        for status, _ in self.lookup(person_ids).values():
+            counts[status] = counts.get(status, 0) + 1
+        return counts
+
+
+def merge_phones(df: pd.DataFrame, reveals: PhoneReveals = None) -> pd.DataFrame:
+    """`df` with `phone`, `phone_numbers` and `phone_status` filled from delivered reveals, matched on `id`."""
+    if "id" not in df.columns:
+        return df
+    found = (reveals or get_reveals()).lookup(df["id"].dropna().tolist())
+    statuses, first, numbers = [], [], []
+    for pid in df["id"].astype(str):
+        status, phones = found.get(pid, (None, []))
+        listed = [n for n in map(_number, phones) if n]
+        statuses.append(status)
+        first.append(listed[0] if listed else None)
+        numbers.append("; ".join(listed) or None)
+    return df.assign(phone=first, phone_numbers=numbers, phone_status=statuses)
+
+
+_reveals = None
+_reveals_lock = threading.Lock()
+
+
+def get_reveals() -> PhoneReveals:
+    global _reveals
+    with _reveals_lock:
+        if _reveals is None:
+            _reveals = PhoneReveals()
+        return _reveals
+
+
+def format_reveals(counts: dict) -> str:
+    return (f"{counts['received']} received • {counts['pending']} pending • "
+            f"{counts['no_phone']} without a number • {counts['expired']} expired")
@@ -0,0 +1,141 @@
+import threading
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from lib.apollo import fetch_page, fetch_pages
+from lib.store import PullStore
+
+MAX_PAGES = 500  # Apollo stops paginating a search here
+MAX_RESULTS = 50_000
+PAGES_PER_SHARD = 100_000  # page-number stride per shard inside one PullStore
+
+EMPLOYEE_RANGES = [
+    "1,10", "11,20", "21,50", "51,100", "101,200", "201,500",
+    "501,1000", "1001,2000", "2001,5000", "5001,10000", "10001,",
+]
+REVENUE_MAX = 10 ** 12
+MIN_REVENUE_SPAN = 100_000
+
+
+def result_cap(perpage: int) -> int:
+    return min(MAX_RESULTS, MAX_PAGES * perpage)
+
+
+def probe_total(api_key: str, api_qs: dict, use_cache: bool = True) -> int:
+    data = fetch_page(api_key, api_qs, 1, 1, use_cache)
+    return (data.get("pagination") or {}).get("total_entries") or 0
+
+
+# --- Shard splitting ---
+def split_query(api_qs: dict) -> list:
+    """Disjoint sub-queries of `api_qs`, or [] if it cannot be split further.
+
+    Lossless splits come first: one shard per employee range or location the
+    query already lists, or halving a revenue range it already has. Only then
+    is a new employee-range or revenue filter added, which drops people whose
+    organization has no such data in Apollo; `plan_shards` reports that gap.
+    """
+    employees = api_qs.get("organization_num_employees_ranges[]") or []
+    if len(employees) > 1:
+        return [{**api_qs, "organization_num_employees_ranges[]": [r]} for r in employees]
+
+    locations = api_qs.get("person_locations[]") or []
+    if len(locations) > 1:
+        return [{**api_qs, "person_locations[]": [loc]} for loc in locations]
+
+    has_revenue = "revenue_range[min]" in api_qs or "revenue_range[max]" in api_qs
+    if not employees and not has_revenue:
+        return [{**api_qs, "organization_num_employees_ranges[]": [r]} for r in EMPLOYEE_RANGES]
+
+    low = int((api_qs.get("revenue_range[min]") or ["0"])[0] or 0)
+    high = int((api_qs.get("revenue_range[max]") or [str(REVENUE_MAX)])[0] or REVENUE_MAX)
+    if high - low > MIN_REVENUE_SPAN:
+        mid = (low + high) // 2
+        return [
+            {**api_qs, "revenue_range[min]": [str(low)], "revenue_range[max]": [str(mid)]},
+            {**api_qs, "revenue_range[min]": [str(mid + 1)], "revenue_range[max]": [str(high)]},
+        ]
+    return []
+
+
+def plan_shards(api_key: str, api_qs: dict, perpage: int, max_workers: int = 4,
+                use_cache: bool = True, report: dict = None) -> list:
+    """Split `api_qs` until every shard fits under the result cap.
+
+    Returns [(shard_qs, total_entries)], skipping empty shards. Shards that
+    cannot be split further are kept even if still over the cap. When given,
+    `report` receives the search's own total, how many of those leads the
+    shards can return, and the shards left over the cap.
+    """
+    cap = result_cap(perpage)
+    shards = []
+    search_total = probe_total(api_key, api_qs, use_cache)
+    frontier = [(api_qs, search_total)]
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        while frontier:
+            pending = []
+            for qs, total in frontier:
+                children = split_query(qs) if total > cap else []
+                if children:
+                    pending.extend(children)
+                elif total:
+                    shards.append((qs, total))
+            totals = pool.map(lambda qs: probe_total(api_key, qs, use_cache), pending)
+            frontier = list(zip(pending, totals))
+    if report is not None:
+        over = [shard_total for _, shard_total in shards if shard_total > cap]
+        report.update(total=search_total, covered=sum(min(shard_total, cap) for _, shard_total in shards),
+                      over_cap=len(over), beyond_cap=sum(t - cap for t in over))
+    return shards
+
+
+def format_coverage(report: dict) -> str:
+    """e.g. "Search total 120,000 • shards return 117,450 (2,550 not reachable)"."""
+    gap = max(0, report["total"] - report["covered"])
+    text = f"Search total {report['total']:,} • shards return {report['covered']:,}"
+    return text + (f" ({gap:,} not reachable)" if gap else "")
+
+
+# --- Sharded pull ---
+def sharded_pull(api_key: str, shards: list, perpage: int, shard_workers: int = 4,
+                 max_workers: int = 4, use_cache: bool = True, on_progress=None) -> dict:
+    """Fetch every page of every shard into one PullStore, dropping repeated person ids.
+
+    `on_progress(pages_done, pages_total)` is called from the calling thread.
+    """
+    store = PullStore()
+    seen, lock = set(), threading.Lock()
+    progress = {}
+    duplicates = 0
+    page_counts = [min(MAX_PAGES, -(-total // perpage)) for _, total in shards]
+
+    def run_shard(index: int, qs: dict, pages: int):
+        def on_result(page: int, people: list):
+            nonlocal duplicates
+            with lock:
+                fresh = [p for p in people if not p.get("id") or p["id"] not in seen]
+                seen.update(p["id"] for p in fresh if p.get("id"))
+                duplicates += len(people) - len(fresh)
+            store.write_page(index * PAGES_PER_SHARD + page, fresh)
+
+        def on_page(done: int, total: int):
+            progress[index] = done
+
+        fetch_pages(api_key, qs, pages, perpage, max_workers=max_workers, on_page=on_page,
+                    use_cache=use_cache, on_result=on_result, keep=False)
+
+    with ThreadPoolExecutor(max_workers=shard_workers) as pool:
+        futures = {pool.submit(run_shard, i, qs, pages)
+                   for i, ((qs, _), pages) in enumerate(zip(shards, page_counts))}
+        try:
+            while futures:
+                finished, futures = wait(futures, timeout=0.5, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    future.result()
+                if on_progress:
+                    on_progress(sum(progress.values()), sum(page_counts))
+        except Exception:
+            for future in futures:
+                future.cancel()
+            raise
+
+    return {"pull_id": store.pull_id, "shards": len(shards), "duplicates": duplicates}
@@ -0,0 +1,151 @@
+import hashlib
+import random
+import threading
+import time
+
+import requests
+
+from lib.http_client import get_client
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+# Apollo reports its quota on every response
+QUOTA_HEADERS = {
+    "x-rate-limit-minute": "minute_limit",
+    "x-minute-requests-left": "minute_left",
+    "x-rate-limit-hourly": "hourly_limit",
+    "x-hourly-requests-left": "hourly_left",
+    "x-rate-limit-24-hour": "daily_limit",
+    "x-24-hour-requests-left": "daily_left",
+}
+
+
+class RateLimiter:
+    """Token bucket shared by every thread calling Apollo with the same key.
+
+    The refill rate follows the per-minute limit Apollo reports, is halved on
+    each 429 and creeps back up on successful responses.
+    """
+
+    def __init__(self, per_minute: float = 50, burst: int = 10, min_per_minute: float = 5):
+        self._lock = threading.Lock()
+        self.max_rate = per_minute / 60
+        self.min_rate = min_per_minute / 60
+        self.rate = self.max_rate
+        self.capacity = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+        self.waiting = 0
+        self.retries = 0
+        self.quota = {}
+
+    def _refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def acquire(self):
+        with self._lock:
+            self.waiting += 1
+        try:
+            while True:
+                with self._lock:
+                    now = time.monotonic()
+                    self._refill(now)
+                    if now >= self.paused_until and self.tokens >= 1:
+                        self.tokens -= 1
+                        return
+                    wait = max(self.paused_until - now, (1 - self.tokens) / self.rate)
+                time.sleep(min(wait, 1.0))
+        finally:
+            with self._lock:
+                self.waiting -= 1
+
+    def update_from_headers(self, headers):
+        quota = {}
+        for header, key in QUOTA_HEADERS.items():
+            value = headers.get(header)
+            if value is not None and str(value).isdigit():
+                quota[key] = int(value)
+        if not quota:
+            return
+
+        with self._lock:
+            self.quota.update(quota)
+            if "minute_limit" in quota:
+                self.max_rate = max(self.min_rate, quota["minute_limit"] / 60)
+            # additive increase back towards the advertised limit
+            self.rate = min(self.max_rate, self.rate + self.max_rate / 20)
+            if "minute_left" in quota:
+                self.tokens = min(self.tokens, quota["minute_left"])
+
+    def backoff(self, retry_after: float, throttled: bool = True):
+        with self._lock:
+            if throttled:
+                self.rate = max(self.min_rate, self.rate / 2)
+            self.tokens = min(self.tokens, 0)
+            self.paused_until = max(self.paused_until, time.monotonic() + retry_after)
+            self.retries += 1
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "rate_per_minute": round(self.rate * 60, 1),
+                "queue_depth": self.waiting,
+                "retries": self.retries,
+                **self.quota,
+            }
+
+
+_limiters = {}
+_limiters_lock = threading.Lock()
+
+
+def get_limiter(api_key: str) -> RateLimiter:
+    key = hashlib.sha256(api_key.encode()).hexdigest()
+    with _limiters_lock:
+        if key not in _limiters:
+            _limiters[key] = RateLimiter()
+        return _limiters[key]
+
+
+def _retry_delay(response, attempt: int, base: float, cap: float) -> float:
+    if response is not None:
+        retry_after = response.headers.get("retry-after", "")
+        if retry_after.isdigit():
+            return float(retry_after)
+    return min(cap, base * 2 ** attempt) * random.uniform(0.5, 1.5)
+
+
+# --- Scheduled request ---
+def send(method: str, url: str, limiter: RateLimiter, max_retries: int = 6,
+         base_delay: float = 1.0, max_delay: float = 60.0, **kwargs) -> requests.Response:
+    """Send a request through `limiter`, retrying 429/5xx and connection errors."""
+    for attempt in range(max_retries + 1):
+        limiter.acquire()
+        try:
+            response = get_client().request(method, url, **kwargs)
+        except (requests.exceptions.ConnectionError, requests.exceptions.Timeout):
+            if attempt == max_retries:
+                raise
+            limiter.backoff(_retry_delay(None, attempt, base_delay, max_delay), throttled=False)
+            continue
+
+        limiter.update_from_headers(response.headers)
+        if response.status_code not in RETRY_STATUSES or attempt == max_retries:
+            return response
+        limiter.backoff(_retry_delay(response, attempt, base_delay, max_delay),
+                        throttled=response.status_code == 429)
+
+
+def format_quota(snapshot: dict) -> str:
+    parts = [f"{snapshot['rate_per_minute']}/min", f"queue {snapshot['queue_depth']}"]
+    if "minute_left" in snapshot:
+        parts.append(f"{snapshot['minute_left']} left this minute")
+    if "hourly_left" in snapshot:
+        parts.append(f"{snapshot['hourly_left']} left this hour")
+    if "daily_left" in snapshot:
+        parts.append(f"{snapshot['daily_left']} left today")
+    if snapshot["retries"]:
+        parts.append(f"{snapshot['retries']} retries")
+    return " • ".join(parts)
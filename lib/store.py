@@ -0,0 +1,254 @@
+import glob
+import json
+import os
+import shutil
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from lib.config import DATA_DIR
+from lib.enrich import COLUMN_MAPPING
+from lib.grid import query_table
+from lib.metrics import stage
+
+PULLS_DIR = os.path.join(DATA_DIR, "pulls")
+MAX_LOADED_PULLS = 2
+PULL_RETENTION_DAYS = int(os.environ.get("LEAD_MACHINE_PULL_RETENTION_DAYS", 7))
+
+EMPLOYMENT = pa.struct([
+    ("id", pa.string()),
+    ("organization_id", pa.string()),
+    ("organization_name", pa.string()),
+    ("title", pa.string()),
+    ("start_date", pa.string()),
+    ("end_date", pa.string()),
+    ("current", pa.bool_()),
+])
+
+# Columns that are not plain strings; everything else in COLUMN_MAPPING is
+CATEGORICAL = {"email_status", "seniority", "state", "city", "country", "organization.primary_phone.source"}
+TYPES = {
+    "extrapolated_email_confidence": pa.float64(),
+    "show_intent": pa.bool_(),
+    "email_domain_catchall": pa.bool_(),
+    "revealed_for_current_team": pa.bool_(),
+    "departments": pa.list_(pa.string()),
+    "subdepartments": pa.list_(pa.string()),
+    "functions": pa.list_(pa.string()),
+    "employment_history": pa.list_(EMPLOYMENT),
+    "organization.languages": pa.list_(pa.string()),
+    "organization.alexa_ranking": pa.int64(),
+    "organization.founded_year": pa.int32(),
+    "organization.organization_headcount_six_month_growth": pa.float64(),
+    "organization.organization_headcount_twelve_month_growth": pa.float64(),
+    "organization.organization_headcount_twenty_four_month_growth": pa.float64(),
+}
+# Everything Apollo returned that the typed columns do not cover, as JSON, so nothing is dropped
+EXTRA_COLUMN = "extra"
+COLUMNS = list(COLUMN_MAPPING.values()) + [EXTRA_COLUMN]
+
+SCHEMA = pa.schema([
+    (name, pa.dictionary(pa.int32(), pa.string()) if name in CATEGORICAL else TYPES.get(name, pa.string()))
+    for name in COLUMNS
+])
+
+
+def _covered_fields() -> dict:
+    """The schema's field paths as a nested dict; list-of-struct columns map to their struct's keys."""
+    tree = {}
+    for field in SCHEMA:
+        if field.name == EXTRA_COLUMN:
+            continue
+        *parents, leaf = field.name.split(".")
+        node = tree
+        for part in parents:
+            node = node.setdefault(part, {})
+        value_type = field.type.value_type if pa.types.is_list(field.type) else None
+        node[leaf] = {f.name: None for f in value_type} if value_type and pa.types.is_struct(value_type) else None
+    return tree
+
+
+COVERED = _covered_fields()
+
+
+# --- Per-page normalization ---
+def _uncovered(value, tree: dict):
+    """The parts of `value` not stored in a typed column, or None when there are none."""
+    if tree is None:
+        return None
+    if isinstance(value, list):
+        items = [_uncovered(item, tree) for item in value]
+        return items if any(item is not None for item in items) else None
+    if not isinstance(value, dict):
+        return None
+    extra = {}
+    for key, item in value.items():
+        rest = _uncovered(item, tree[key]) if key in tree else item
+        if rest not in (None, "", [], {}):
+            extra[key] = rest
+    return extra or None
+
+
+def _extra(person: dict):
+    extra = _uncovered(person, COVERED)
+    return json.dumps(extra, separators=(",", ":"), default=str) if extra else None
+
+
+def _lookup(person: dict, path: list):
+    value = person
+    for key in path:
+        if not isinstance(value, dict):
+            return None
+        value = value.get(key)
+    return value
+
+
+def _coerce(value, arrow_type):
+    if value is None or value == "":
+        return None
+    try:
+        if pa.types.is_integer(arrow_type):
+            return int(float(value))
+        if pa.types.is_floating(arrow_type):
+            return float(value)
+    except (TypeError, ValueError):
+        return None
+    if pa.types.is_boolean(arrow_type):
+        return bool(value)
+    if pa.types.is_list(arrow_type):
+        if not isinstance(value, list):
+            return None
+        if pa.types.is_string(arrow_type.value_type):
+            return [str(v) for v in value if v is not None]
+        return [v for v in value if isinstance(v, dict)]
+    return value if isinstance(value, str) else str(value)
+
+
+def normalize_page(people: list) -> pa.Table:
+    """Normalize one page of Apollo people into the fixed SCHEMA."""
+    with stage("normalize", rows=len(people)):
+        arrays = []
+        for field in SCHEMA:
+            if field.name == EXTRA_COLUMN:
+                arrays.append(pa.array([_extra(person) for person in people], type=pa.string()))
+                continue
+            path = field.name.split(".")
+            value_type = pa.string() if field.name in CATEGORICAL else field.type
+            values = [_coerce(_lookup(person, path), value_type) for person in people]
+            array = pa.array(values, type=value_type)
+            arrays.append(array.dictionary_encode() if field.name in CATEGORICAL else array)
+        return pa.Table.from_arrays(arrays, schema=SCHEMA)
+
+
+# --- On-disk dataset ---
+def _page_number(path: str) -> int:
+    return int(os.path.basename(path)[len("page-"):-len(".parquet")])
+
+
+class PullStore:
+    """One Apollo pull as a directory of per-page Parquet files."""
+
+    def __init__(self, pull_id: str = None):
+        self.pull_id = pull_id or uuid.uuid4().hex[:12]
+        self.path = os.path.join(PULLS_DIR, self.pull_id)
+        os.makedirs(self.path, exist_ok=True)
+        self._row_counts = {}
+
+    def write_page(self, page: int, people: list):
+        path = os.path.join(self.path, f"page-{page:05d}.parquet")
+        pq.write_table(normalize_page(people), path + ".tmp")
+        os.replace(path + ".tmp", path)
+
+    def files(self) -> list:
+        return sorted(glob.glob(os.path.join(self.path, "page-*.parquet")), key=_page_number)
+
+    def pages(self) -> list:
+        return [_page_number(f) for f in self.files()]
+
+    def _rows_in(self, path: str) -> int:
+        if path not in self._row_counts:
+            self._row_counts[path] = pq.ParquetFile(path).metadata.num_rows
+        return self._row_counts[path]
+
+    def count(self) -> int:
+        return sum(self._rows_in(f) for f in self.files())
+
+    def read_rows(self, offset: int, limit: int, columns: list = None) -> pa.Table:
+        """Rows [offset, offset + limit) in page order, reading only the files that cover them."""
+        tables, position = [], 0
+        for path in self.files():
+            rows = self._rows_in(path)
+            if position + rows > offset and position < offset + limit:
+                table = pq.read_table(path, columns=columns, schema=SCHEMA)
+                start = max(0, offset - position)
+                tables.append(table.slice(start, offset + limit - position - start))
+            position += rows
+            if position >= offset + limit:
+                break
+        if not tables:
+            return SCHEMA.empty_table() if columns is None else SCHEMA.empty_table().select(columns)
+        return pa.concat_tables(tables)
+
+    def to_table(self, columns: list = None) -> pa.Table:
+        files = self.files()
+        if not files:
+            return SCHEMA.empty_table() if columns is None else SCHEMA.empty_table().select(columns)
+        # pages written before a column was added read it back as nulls
+        return pa.concat_tables([pq.read_table(f, columns=columns, schema=SCHEMA) for f in files])
+
+    def query(self, columns: list, sort_by: str = None, descending: bool = False, search: str = "",
+              offset: int = 0, limit: int = 100) -> tuple:
+        """One window of the pull as (table, matching rows), reading only the projected columns.
+
+        Without a sort or filter only the files covering the window are read.
+        """
+        if not sort_by and not search:
+            return self.read_rows(offset, limit, columns), self.count()
+        needed = columns + [sort_by] if sort_by and sort_by not in columns else columns
+        window, matched = query_table(self.to_table(needed), sort_by, descending, search, offset, limit)
+        return window.select(columns), matched
+
+    def delete(self):
+        shutil.rmtree(self.path, ignore_errors=True)
+
+
+def prune_pulls(max_age_days: int = PULL_RETENTION_DAYS):
+    cutoff = time.time() - max_age_days * 86400
+    for path in glob.glob(os.path.join(PULLS_DIR, "*")):
+        if os.path.getmtime(path) < cutoff:
+            shutil.rmtree(path, ignore_errors=True)
+
+
+def to_pandas(table: pa.Table) -> pd.DataFrame:
+    """Compact DataFrame: categoricals stay categorical, ints stay nullable, lists become Python lists."""
+    df = table.to_pandas(types_mapper={pa.int64(): pd.Int64Dtype(), pa.int32(): pd.Int32Dtype()}.get)
+    for field in table.schema:
+        if pa.types.is_list(field.type):
+            df[field.name] = table.column(field.name).to_pylist()
+    return df
+
+
+_loaded = OrderedDict()
+_loaded_lock = threading.Lock()
+
+
+def load_pull(pull_id: str) -> pd.DataFrame:
+    """The full pull as a DataFrame, shared across sessions for the most recent pulls."""
+    store = PullStore(pull_id)
+    # a pull still being written by a background job grows, so key on its pages too
+    key = (pull_id, len(store.files()))
+    with _loaded_lock:
+        if key in _loaded:
+            _loaded.move_to_end(key)
+            return _loaded[key]
+    df = to_pandas(store.to_table())
+    with _loaded_lock:
+        _loaded[key] = df
+        while len(_loaded) > MAX_LOADED_PULLS:
+            _loaded.popitem(last=False)
+    return df
@@ -0,0 +1,93 @@
+import pandas as pd
+
+from lib.batch import run_batch
+from lib.checkpoint import checkpointed_pull
+from lib.credits import enrich_planned, format_savings
+from lib.dedup import get_index
+from lib.planner import format_coverage, plan_shards, sharded_pull
+from lib.webhook import format_upload, send_file_to_webhook, send_in_chunks
+
+# Background job bodies; each takes the JobContext first (see lib/jobs.py)
+
+
+def fetch_leads_job(job, api_key: str, api_qs: dict, numberpages: int, perpage: int,
+                    max_workers: int = 8, use_cache: bool = True, resume: bool = False) -> str:
+    """Stream pages into a checkpointed PullStore; the result is its pull id."""
+
+    def on_start(pull_id: str):
+        # pages already on disk are readable, so the partial result is the pull id itself
+        job.partial(lambda: pull_id, force=True)
+
+    def on_page(done: int, total: int):
+        job.progress(done, total, f"Fetched page {done} of {total}")
+
+    return checkpointed_pull(api_key, api_qs, numberpages, perpage, resume=resume, max_workers=max_workers,
+                             use_cache=use_cache, on_page=on_page, on_start=on_start)
+
+
+def sharded_fetch_job(job, api_key: str, api_qs: dict, perpage: int, shard_workers: int = 4,
+                      max_workers: int = 4, use_cache: bool = True) -> str:
+    """Split the search under Apollo's result cap and pull every shard; the result is the pull id."""
+    job.progress(0, 0, "Planning shards")
+    coverage = {}
+    shards = plan_shards(api_key, api_qs, perpage, use_cache=use_cache, report=coverage)
+
+    def on_progress(done: int, total: int):
+        job.progress(done, total, f"{len(shards)} shards • {format_coverage(coverage)} • page {done} of {total}")
+
+    result = sharded_pull(api_key, shards, perpage, shard_workers=shard_workers, max_workers=max_workers,
+                          use_cache=use_cache, on_progress=on_progress)
+    return result["pull_id"]
+
+
+def batch_job(job, api_key: str, segments: list, perpage: int, push_url: str = None, record: bool = False,
+              suppress: bool = True, segment_workers: int = 4, use_cache: bool = True,
+              payload_format: str = "CSV") -> list:
+    """Run a list of saved searches; the result is one row per segment."""
+
+    def on_progress(states: list):
+        finished = sum(state["status"] in ("done", "fetched", "failed") for state in states)
+        job.progress(sum(state["done"] for state in states), sum(state["total"] for state in states),
+                     f"{finished} of {len(states)} segments finished")
+
+    return run_batch(api_key, segments, perpage, push_url=push_url, record=record, suppress=suppress,
+                     segment_workers=segment_workers, use_cache=use_cache, on_progress=on_progress,
+                     payload_format=payload_format)
+
+
+def enrich_job(job, api_key: str, details: list, flags: dict,
+               max_workers: int = 4, use_cache: bool = True, use_pulls: bool = True) -> pd.DataFrame:
+    def on_progress(done: int, total: int, rows_per_sec: float):
+        job.progress(done, total, f"{rows_per_sec:.1f} rows/s")
+
+    savings = {}
+    df = enrich_planned(api_key, details, flags, max_workers=max_workers, on_progress=on_progress,
+                        use_cache=use_cache, use_pulls=use_pulls, stats=savings)
+    job.progress(len(details), len(details), format_savings(savings))
+    return df
+
+
+def push_job(job, df: pd.DataFrame, filename: str, url: str, intention: str,
+             chunk_rows: int = 0, record: bool = False, payload_format: str = "CSV"):
+    upload = {}
+    if not chunk_rows:
+        job.progress(0, 1, "Uploading")
+        success, result = send_file_to_webhook(df, filename, url, intention,
+                                               payload_format=payload_format, stats=upload)
+        if not success:
+            raise RuntimeError(result)
+        if record:
+            get_index().record(df)
+        job.progress(1, 1, f"Sent • {format_upload(upload)} • {result[:120]}")
+        return None
+
+    def on_chunk(done: int, total: int):
+        if record:
+            get_index().record(df.iloc[(done - 1) * chunk_rows:done * chunk_rows])
+        job.progress(done, total, f"Sent chunk {done} of {total}")
+
+    success, next_chunk, result = send_in_chunks(df, filename, url, intention, chunk_rows, on_chunk=on_chunk,
+                                                 payload_format=payload_format, stats=upload)
+    if not success:
+        raise RuntimeError(f"Chunk {next_chunk + 1} failed: {result}")
+    job.progress(next_chunk, next_chunk, f"Sent {next_chunk} chunks • {format_upload(upload)} • {result[:120]}")
@@ -0,0 +1,121 @@
+import streamlit as st
+
+from lib.grid import PAGE_SIZES, default_columns
+from lib.http_client import get_client
+from lib.jobs import ACTIVE, get_manager
+from lib.metrics import get_metrics, stage
+
+STATUS_ICONS = {
+    "queued": "⏳",
+    "running": "🔄",
+    "done": "✅",
+    "failed": "❌",
+    "cancelled": "🚫",
+    "interrupted": "⚠",
+}
+
+
+# --- Background jobs panel ---
+@st.fragment(run_every=2)
+def jobs_panel(kinds: tuple, on_load=None):
+    """Poll the shared job table; `on_load(result, job)` is called when a result is loaded."""
+    manager = get_manager()
+    jobs = manager.list(kinds)
+    if not jobs:
+        st.caption("No background jobs yet.")
+        return
+
+    for job in jobs:
+        info, status, cancel, load = st.columns([4, 4, 1, 1])
+        info.markdown(f"{STATUS_ICONS.get(job['status'], '')} **{job['label']}**  \n"
+                      f"`{job['id']}` • {job['kind']} • {job['status']}")
+        if job["total"]:
+            status.progress(min(1.0, job["done"] / job["total"]), text=job["message"] or None)
+        else:
+            status.caption(job["message"] or job["status"])
+
+        if job["status"] in ACTIVE and cancel.button("Cancel", key=f"cancel-{job['id']}"):
+            manager.cancel(job["id"])
+        if on_load and job["has_result"]:
+            label = "Load" if job["status"] == "done" else "Partial"
+            if load.button(label, key=f"load-{job['id']}"):
+                on_load(manager.result(job["id"]), job)
+                st.rerun(scope="app")
+
+
+# --- Timed rendering ---
+def dataframe(data, **kwargs):
+    """st.dataframe, with serialization time recorded as the "render.dataframe" stage."""
+    with stage("render.dataframe", rows=len(data)):
+        st.dataframe(data, **kwargs)
+
+
+# --- Paginated grid ---
+def lead_grid(key: str, columns: list, sortable: list, query, defaults: list = None, label: str = "rows"):
+    """Show one window of a large result set instead of sending every row to the browser.
+
+    `query(columns, sort_by, descending, search, offset, limit)` returns
+    (window, matching rows); sorting and filtering happen server-side.
+    """
+    with st.expander("🧱 Columns, sort and filter", expanded=False):
+        shown = st.multiselect("Columns", columns, default=defaults or default_columns(columns),
+                               key=f"{key}-columns")
+        search = st.text_input("Only rows containing", key=f"{key}-search")
+        sort_col, order_col, size_col = st.columns([3, 1, 1])
+        sort_by = sort_col.selectbox("Sort by", ["(none)"] + sortable, key=f"{key}-sort")
+        descending = order_col.toggle("Descending", key=f"{key}-desc")
+        page_rows = size_col.selectbox("Rows per page", PAGE_SIZES, index=1, key=f"{key}-size")
+    shown = shown or defaults or default_columns(columns)
+    sort_by = None if sort_by == "(none)" else sort_by
+
+    # a new filter or sort starts again from the first page
+    view = (search, sort_by, descending, page_rows)
+    if st.session_state.get(f"{key}-view") != view:
+        st.session_state[f"{key}-view"] = view
+        st.session_state[f"{key}-page"] = 1
+
+    page = st.session_state.get(f"{key}-page", 1)
+    window, matched = query(shown, sort_by, descending, search, (page - 1) * page_rows, page_rows)
+    pages = max(1, -(-matched // page_rows))
+    if page > pages:
+        page = st.session_state[f"{key}-page"] = pages
+        window, matched = query(shown, sort_by, descending, search, (page - 1) * page_rows, page_rows)
+
+    dataframe(window, use_container_width=True)
+    page_col, info_col = st.columns([1, 3])
+    page_col.number_input(f"Page (1–{pages})", min_value=1, max_value=pages, key=f"{key}-page")
+    first = (page - 1) * page_rows + 1 if matched else 0
+    info_col.caption(f"{label.capitalize()} {first}–{min(matched, page * page_rows)} of {matched} {label}"
+                     + (f" matching “{search}”" if search else ""))
+
+
+# --- HTTP client metrics ---
+def http_metrics_panel():
+    client = get_client()
+    with st.sidebar.expander("🌐 HTTP connections", expanded=False):
+        rows = client.metrics()
+        if rows:
+            st.dataframe(rows, hide_index=True, use_container_width=True)
+        else:
+            st.caption("No requests yet.")
+        st.caption(f"{'HTTP/2' if client.http2 else 'HTTP/1.1 keep-alive'} • pool size {client.pool_size}")
+
+
+# --- Stage timings ---
+def performance_panel():
+    metrics = get_metrics()
+    with st.sidebar.expander("⏱ Performance", expanded=False):
+        rows = metrics.snapshot()
+        if rows:
+            st.dataframe(rows, hide_index=True, use_container_width=True)
+        else:
+            st.caption("No stages timed yet.")
+        prometheus, jsonl = st.columns(2)
+        prometheus.download_button("Prometheus", metrics.to_prometheus(), file_name="lead_machine.prom",
+                                   mime="text/plain", use_container_width=True)
+        jsonl.download_button("JSON lines", metrics.to_jsonl(), file_name="lead_machine_metrics.jsonl",
+                              mime="application/x-ndjson", use_container_width=True)
+        if st.button("Reset timings", use_container_width=True):
+            metrics.reset()
+        if metrics.log_path:
+            st.caption(f"Appending events to `{metrics.log_path}`")
@@ -0,0 +1,178 @@
+import codecs
+import time
+
+import numpy as np
+import pandas as pd
+
+from lib.dedup import KEY_COLUMNS, batch_keys, get_index
+from lib.webhook import send_file_to_webhook
+
+CHUNK_ROWS = 50_000
+ENCODING_BLOCK = 1024 * 1024
+# Each row must be identifiable by one of these key kinds (see lib/dedup.py for the accepted headers)
+REQUIRED_KINDS = ("email", "linkedin")
+MAX_ISSUES = 5
+
+
+# --- Streamed reads ---
+def check_encoding(fileobj, block_size: int = ENCODING_BLOCK):
+    """Byte offset of the first invalid UTF-8 sequence, or None; reads `fileobj` a block at a time."""
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    fileobj.seek(0)
+    position = 0
+    for block in iter(lambda: fileobj.read(block_size), b""):
+        pending = len(decoder.getstate()[0])  # bytes of a sequence split across blocks
+        try:
+            decoder.decode(block)
+        except UnicodeDecodeError as e:
+            return position - pending + e.start
+        position += len(block)
+    try:
+        decoder.decode(b"", final=True)
+    except UnicodeDecodeError:
+        return position - len(decoder.getstate()[0])  # where the truncated sequence starts
+    return None
+
+
+def read_chunks(fileobj, chunk_rows: int = CHUNK_ROWS):
+    """The CSV as DataFrames of `chunk_rows` rows; only one chunk is held at a time."""
+    fileobj.seek(0)
+    return pd.read_csv(fileobj, dtype=str, chunksize=chunk_rows, encoding="utf-8-sig")
+
+
+class SeenKeys:
+    """Hashed identifiers seen so far in one file, as sorted uint64 arrays (8 bytes per key)."""
+
+    def __init__(self):
+        self._seen = {}
+
+    def repeated(self, df: pd.DataFrame, keys: list = None) -> np.ndarray:
+        """True for rows repeating an identifier from this or an earlier chunk; records the rest."""
+        mask = np.zeros(len(df), dtype=bool)
+        for kind, (hashes, valid) in enumerate(batch_keys(df) if keys is None else keys):
+            seen = self._seen.get(kind, np.array([], dtype="uint64"))
+            if len(seen):
+                found = seen[np.minimum(np.searchsorted(seen, hashes), len(seen) - 1)] == hashes
+                mask |= valid & found
+            within = np.zeros(len(df), dtype=bool)
+            within[valid] = pd.Series(hashes[valid]).duplicated().to_numpy()
+            mask |= within
+            # a sorted merge; repeats stay in the array but never change a lookup
+            self._seen[kind] = np.sort(np.concatenate([seen, hashes[valid]]), kind="stable")
+        return mask
+
+
+# --- Validation ---
+def _column(df: pd.DataFrame, kind: str):
+    return next((c for c in KEY_COLUMNS[kind] if c in df.columns), None)
+
+
+def _identifier_columns(df: pd.DataFrame) -> list:
+    return [c for c in (_column(df, kind) for kind in REQUIRED_KINDS) if c]
+
+
+def validate_csv(fileobj, chunk_rows: int = CHUNK_ROWS, suppress: bool = False, on_chunk=None) -> dict:
+    """Check a CSV upload chunk by chunk before anything is sent.
+
+    Errors (bad encoding, malformed rows, no email/LinkedIn column) block the
+    upload; rows without an identifier, invalid emails, repeats and, with
+    `suppress`, leads already pushed are counted as warnings.
+    `on_chunk(rows, bytes_read)` is called after each chunk.
+    """
+    started = time.perf_counter()
+    report = {"rows": 0, "chunks": 0, "bytes": 0, "seconds": 0.0, "columns": [], "errors": [],
+              "missing_identifier": 0, "bad_email": 0, "repeated": 0, "already_pushed": 0}
+    fileobj.seek(0, 2)
+    report["bytes"] = fileobj.tell()
+
+    bad_byte = check_encoding(fileobj)
+    if bad_byte is not None:
+        report["errors"].append(f"Not valid UTF-8 near byte {bad_byte:,}; re-save the file as UTF-8.")
+    else:
+        seen = SeenKeys()
+        index = get_index() if suppress else None
+        try:
+            # closing the reader early would otherwise close the caller's file
+            with read_chunks(fileobj, chunk_rows) as reader:
+                for chunk in reader:
+                    if not report["chunks"]:
+                        report["columns"] = list(chunk.columns)
+                        if not _identifier_columns(chunk):
+                            report["errors"].append("No email or linkedin_url column found.")
+                            break
+                    identifiers = chunk[_identifier_columns(chunk)].fillna("").apply(lambda s: s.str.strip())
+                    report["missing_identifier"] += int((identifiers == "").all(axis=1).sum())
+                    email = _column(chunk, "email")
+                    if email:
+                        values = chunk[email].fillna("").str.strip()
+                        report["bad_email"] += int(((values != "") & ~values.str.contains("@", regex=False)).sum())
+                    keys = batch_keys(chunk, apollo=False)
+                    repeated = seen.repeated(chunk, keys)
+                    report["repeated"] += int(repeated.sum())
+                    if index is not None:
+                        report["already_pushed"] += int((index.seen_mask(chunk, keys) & ~repeated).sum())
+                    report["rows"] += len(chunk)
+                    report["chunks"] += 1
+                    if on_chunk:
+                        on_chunk(report["rows"], fileobj.tell())
+        except (pd.errors.ParserError, pd.errors.EmptyDataError) as e:
+            report["errors"].append(f"Malformed CSV after row {report['rows']:,}: {e}")
+    report["seconds"] = time.perf_counter() - started
+    return report
+
+
+def format_validation(report: dict) -> str:
+    """e.g. "1,200,000 rows in 24 chunks • 310.4 MB validated in 6.2 s (50.1 MB/s, 193,548 rows/s)"."""
+    seconds = max(report["seconds"], 1e-6)
+    return (f"{report['rows']:,} rows in {report['chunks']} chunks • {report['bytes'] / 1e6:.1f} MB validated "
+            f"in {report['seconds']:.1f} s ({report['bytes'] / 1e6 / seconds:.1f} MB/s, "
+            f"{report['rows'] / seconds:,.0f} rows/s)")
+
+
+def validation_warnings(report: dict) -> list:
+    labels = [
+        ("missing_identifier", "rows have neither an email nor a LinkedIn URL"),
+        ("bad_email", "emails have no @"),
+        ("repeated", "rows repeat an email or LinkedIn URL from earlier in the file"),
+        ("already_pushed", "rows were already pushed to a campaign and will be skipped"),
+    ]
+    return [f"{report[key]:,} {text}" for key, text in labels if report[key]][:MAX_ISSUES]
+
+
+# --- Chunked forwarding ---
+def forward_csv(fileobj, filename: str, url: str, intention: str, chunk_rows: int = CHUNK_ROWS,
+                suppress: bool = False, start_chunk: int = 0, total_chunks: int = None, on_chunk=None) -> tuple:
+    """Re-read the CSV and send each chunk as its own streamed webhook call.
+
+    Each call is retried by `send_file_to_webhook`; on failure returns
+    (False, failed chunk, message) so the caller can resume from there.
+    With `suppress`, repeats and leads already pushed are dropped and each
+    accepted chunk is recorded. Returns (success, next chunk, message).
+    """
+    stem, dot, ext = filename.rpartition(".")
+    if not dot:
+        stem, ext = filename, "csv"
+    seen = SeenKeys()
+    index = get_index()
+    message, sent = "", start_chunk
+    with read_chunks(fileobj, chunk_rows) as reader:
+        for number, chunk in enumerate(reader):
+            if suppress:
+                # earlier chunks still feed the repeat check when resuming past them
+                keys = batch_keys(chunk, apollo=False)
+                chunk = chunk[~(seen.repeated(chunk, keys) | index.seen_mask(chunk, keys))]
+            if number < start_chunk:
+                continue
+            if not chunk.empty:
+                success, message = send_file_to_webhook(
+                    chunk, f"{stem}.part{number + 1:04d}.{ext}", url, intention,
+                    extra_fields={"chunk_index": number + 1, "chunk_count": total_chunks or ""},
+                )
+                if not success:
+                    return False, number, message
+                if suppress:
+                    index.record(chunk, apollo=False)
+            sent = number + 1
+            if on_chunk:
+                on_chunk(sent, len(chunk))
+    return True, sent, message
@@ -0,0 +1,224 @@
+import time
+import uuid
+import zlib
+
+import requests
+
+from lib.config import N8N_BASE_URL
+from lib.exports import to_parquet
+from lib.http_client import get_client
+from lib.metrics import stage
+
+LIVE_CSV_URL = f"{N8N_BASE_URL}/webhook/csv"
+TEST_CSV_URL = f"{N8N_BASE_URL}/webhook-test/csv"
+SALESNAV_URL = f"{N8N_BASE_URL}/webhook/salesnav"
+
+ROWS_PER_BLOCK = 5000
+BYTES_PER_BLOCK = 1024 * 1024
+
+# payload format -> (file extension, content type, content encoding); sent as form fields for n8n to branch on
+PAYLOAD_FORMATS = {
+    "CSV": ("csv", "text/csv", "identity"),
+    "CSV (gzip)": ("csv.gz", "text/csv", "gzip"),
+    "CSV (zstd)": ("csv.zst", "text/csv", "zstd"),
+    "NDJSON": ("ndjson", "application/x-ndjson", "identity"),
+    "Parquet": ("parquet", "application/vnd.apache.parquet", "identity"),
+}
+
+
+def zstd_available() -> bool:
+    try:
+        import zstandard  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def available_payload_formats() -> list:
+    return [fmt for fmt in PAYLOAD_FORMATS if fmt != "CSV (zstd)" or zstd_available()]
+
+
+# --- Body generators ---
+def iter_csv(df, rows_per_block: int = ROWS_PER_BLOCK):
+    """Yield a DataFrame as CSV bytes, a block of rows at a time."""
+    if df.empty:
+        yield df.to_csv(index=False).encode("utf-8")
+        return
+    for start in range(0, len(df), rows_per_block):
+        block = df.iloc[start:start + rows_per_block]
+        yield block.to_csv(index=False, header=start == 0).encode("utf-8")
+
+
+def iter_ndjson(df, rows_per_block: int = ROWS_PER_BLOCK):
+    for start in range(0, len(df), rows_per_block):
+        yield df.iloc[start:start + rows_per_block].to_json(orient="records", lines=True).encode("utf-8")
+
+
+def iter_file(fileobj, block_size: int = BYTES_PER_BLOCK):
+    fileobj.seek(0)
+    return iter(lambda: fileobj.read(block_size), b"")
+
+
+def _body_chunks(source):
+    if isinstance(source, (bytes, bytearray)):
+        return [bytes(source)]
+    if hasattr(source, "read"):
+        return iter_file(source)
+    return iter_csv(source)
+
+
+def _compressed(chunks, encoding: str):
+    """Stream-compress `chunks` with gzip or zstd, block by block."""
+    if encoding == "gzip":
+        compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+    else:
+        import zstandard
+        compressor = zstandard.ZstdCompressor(level=3).compressobj()
+    for chunk in chunks:
+        out = compressor.compress(chunk)
+        if out:
+            yield out
+    yield compressor.flush()
+
+
+def _payload_chunks(source, payload_format: str, raw: dict):
+    """Body chunks for `source` in `payload_format`; `raw["bytes"]` counts the uncompressed CSV bytes.
+
+    Files and bytes are already serialized, so only the CSV compressions apply to them.
+    """
+    _, _, encoding = PAYLOAD_FORMATS[payload_format]
+    is_frame = hasattr(source, "columns")
+    if payload_format == "NDJSON" and is_frame:
+        return iter_ndjson(source)
+    if payload_format == "Parquet" and is_frame:
+        return [to_parquet(source)]
+
+    def counted():
+        for chunk in _body_chunks(source):
+            raw["bytes"] += len(chunk)
+            yield chunk
+
+    return counted() if encoding == "identity" else _compressed(counted(), encoding)
+
+
+def with_extension(filename: str, payload_format: str) -> str:
+    stem, dot, _ = filename.rpartition(".")
+    return f"{stem if dot else filename}.{PAYLOAD_FORMATS[payload_format][0]}"
+
+
+def format_upload(stats: dict) -> str:
+    """e.g. "CSV (gzip) • 1.2 MB (84% smaller than CSV) • 2.1 s, ~9.8 s saved".
+
+    The saving is only claimed when the plain CSV size was measured, i.e. for the CSV formats.
+    """
+    sent, raw, seconds = stats["bytes"], stats.get("raw_bytes"), stats["seconds"]
+    text = f"{stats['format']} • {sent / 1e6:.2f} MB"
+    if raw and raw > sent:
+        saved = (raw - sent) / (sent / seconds) if sent and seconds else 0.0
+        text += f" ({1 - sent / raw:.0%} smaller than CSV) • {seconds:.1f} s, ~{saved:.1f} s saved"
+    else:
+        text += f" • {seconds:.1f} s"
+    return text
+
+
+def _counted(chunks, span):
+    for chunk in chunks:
+        span.bytes += len(chunk)
+        yield chunk
+
+
+def multipart_stream(fields: dict, filename: str, chunks, boundary: str,
+                     content_type: str = "application/octet-stream"):
+    """Generator-backed multipart/form-data body with the file sent as `data`."""
+    for name, value in fields.items():
+        yield (f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"\r\n\r\n'
+               f'{value}\r\n').encode("utf-8")
+    yield (f'--{boundary}\r\nContent-Disposition: form-data; name="data"; filename="{filename}"\r\n'
+           f'Content-Type: {content_type}\r\n\r\n').encode("utf-8")
+    yield from chunks
+    yield f'\r\n--{boundary}--\r\n'.encode("utf-8")
+
+
+# --- Upload ---
+def send_file_to_webhook(source, filename: str, url: str, intention: str,
+                         extra_fields: dict = None, retries: int = 2, payload_format: str = "CSV",
+                         stats: dict = None):
+    """Stream `source` (DataFrame, bytes or file object) to an n8n webhook.
+
+    Returns (success, response text or error message) like the old per-page helpers.
+    Campaign webhooks are not idempotent, so only attempts whose body never
+    left this process (e.g. connection refused) are retried, and every attempt
+    carries the same `push_id` field for n8n to drop replays by.
+    Non-CSV `payload_format`s rename the file and add `format`, `content_type`
+    and `content_encoding` fields. If given, `stats` receives the sent bytes,
+    the raw CSV bytes (CSV formats only; NDJSON and Parquet never build a CSV)
+    and the upload time of the last attempt.
+    """
+    extension, content_type, encoding = PAYLOAD_FORMATS[payload_format]
+    fields = {"intention": intention, "push_id": uuid.uuid4().hex, **(extra_fields or {})}
+    if payload_format != "CSV":
+        filename = with_extension(filename, payload_format)
+        fields.update(format=payload_format, content_type=content_type, content_encoding=encoding)
+    rows = len(source) if hasattr(source, "columns") else 0
+    with stage(f"webhook.push.{extension}", rows=rows) as span:
+        for attempt in range(retries + 1):
+            boundary = uuid.uuid4().hex
+            raw = {"bytes": 0}
+            sent_before, started = span.bytes, time.perf_counter()
+            body = multipart_stream(fields, filename, _counted(_payload_chunks(source, payload_format, raw), span),
+                                    boundary)
+            try:
+                resp = get_client().post(
+                    url, data=body,
+                    headers={"Content-Type": f"multipart/form-data; boundary={boundary}"},
+                )
+                if stats is not None:
+                    stats.update(format=payload_format, bytes=span.bytes - sent_before,
+                                 seconds=time.perf_counter() - started,
+                                 raw_bytes=raw["bytes"] or None)
+                resp.raise_for_status()
+                return True, resp.text
+            except requests.exceptions.RequestException as e:
+                never_sent = isinstance(e, requests.exceptions.ConnectionError) and span.bytes == sent_before
+                if not never_sent or attempt == retries:
+                    return False, str(e)
+            time.sleep(2 ** attempt)
+
+
+def chunk_count(df, chunk_rows: int) -> int:
+    return max(1, -(-len(df) // chunk_rows))
+
+
+def send_in_chunks(df, filename: str, url: str, intention: str, chunk_rows: int,
+                   start_chunk: int = 0, on_chunk=None, payload_format: str = "CSV", stats: dict = None):
+    """Send `df` as separate webhook calls of `chunk_rows` rows each.
+
+    Stops at the first failed chunk and returns (success, next_chunk, message)
+    so the caller can resume from `next_chunk` later.
+    `on_chunk(done, total)` is called after each chunk is accepted.
+    """
+    total = chunk_count(df, chunk_rows)
+    push_id = uuid.uuid4().hex
+    stem, dot, ext = filename.rpartition(".")
+    if not dot:
+        stem, ext = filename, "csv"
+
+    message = ""
+    for index in range(start_chunk, total):
+        part_stats = {}
+        part = df.iloc[index * chunk_rows:(index + 1) * chunk_rows]
+        success, message = send_file_to_webhook(
+            part, f"{stem}.part{index + 1:04d}.{ext}", url, intention,
+            extra_fields={"push_id": f"{push_id}-{index + 1}", "chunk_index": index + 1, "chunk_count": total},
+            payload_format=payload_format, stats=part_stats,
+        )
+        if stats is not None and part_stats:
+            for name in ("bytes", "seconds"):
+                stats[name] = stats.get(name, 0) + part_stats[name]
+            stats["raw_bytes"] = (stats.get("raw_bytes") or 0) + (part_stats["raw_bytes"] or 0) or None
+            stats["format"] = payload_format
+        if not success:
+            return False, index, message
+        if on_chunk:
+            on_chunk(index + 1, total)
+    return True, total, message
@@ -1,9 +1,20 @@
-from io import BytesIO
 import streamlit as st
-import pandas as pd
-import requests
-from urllib.parse import urlparse, parse_qs, urlencode
-import re
+
+from lib.apollo import ApolloError, parse_search_url
+from lib.batch import load_segments_file, parse_segments, run_batch
+from lib.cache import format_stats, get_cache
+from lib.checkpoint import checkpointed_pull, get_checkpoints, pull_key
+from lib.dedup import get_index
+from lib.exports import EXPORT_FORMATS, available_formats, get_export
+from lib.grid import sortable_fields
+from lib.jobs import get_manager
+from lib.planner import format_coverage, plan_shards, result_cap, sharded_pull
+from lib.ratelimit import format_quota, get_limiter
+from lib.store import COLUMNS, SCHEMA, PullStore, load_pull, prune_pulls
+from lib.tasks import batch_job, fetch_leads_job, push_job, sharded_fetch_job
+from lib.ui import http_metrics_panel, jobs_panel, lead_grid, performance_panel
+from lib.webhook import (LIVE_CSV_URL, TEST_CSV_URL, available_payload_formats, chunk_count, format_upload,
+                         send_file_to_webhook, send_in_chunks)
 
 # --- Page Config ---
 st.set_page_config(
@@ -20,99 +31,176 @@ api_key = st.text_input("🔑 Enter your Apollo API Key", type="password")
 apollo_ui_url = st.text_area("🌐 Paste Apollo People Search URL", height=100)
 numberpages = st.number_input("📄 Number of pages to fetch", min_value=1, max_value=500, value=1)
 perpage = st.number_input("👥 Results per page", min_value=1, max_value=100, value=100)
+concurrency = st.number_input("⚡ Concurrent requests", min_value=1, max_value=16, value=8)
+shard_searches = st.checkbox(
+    "🧩 Split searches larger than Apollo's result cap",
+    help="Probes the total, splits the search by employee range, location or revenue until each shard "
+         "fits under the cap, and fetches every shard in parallel. Ignores the page count above."
+)
+run_in_background = st.checkbox(
+    "🕒 Run in background",
+    help="Fetches and pushes run on the server's job pool and keep going if this tab is closed."
+)
+
+# --- Local cache ---
+cache = get_cache()
+st.sidebar.subheader("🗄 Apollo Cache")
+use_cache = st.sidebar.checkbox("Serve repeat requests from cache", value=True)
+# Shared by every session and background job, so the TTL is process config rather than a widget
+st.sidebar.caption(f"Entries expire after {cache.ttl / 3600:g} h (set LEAD_MACHINE_CACHE_TTL in seconds).")
+if st.sidebar.button("🧹 Clear cache"):
+    cache.clear()
+
+# --- Checkpoint ---
+# A previous run of the same search that stopped early can pick up where it left off
+resume_pull = False
+if apollo_ui_url:
+    checkpoint = get_checkpoints().find(pull_key(parse_search_url(apollo_ui_url), perpage))
+    if checkpoint and checkpoint["status"] != "complete" and checkpoint["remaining"]:
+        saved = checkpoint["last_page"] - checkpoint["remaining"]
+        resume_pull = st.checkbox(
+            f"↩ Resume previous pull of this search ({saved} of {checkpoint['last_page']} pages saved)",
+            value=True
+        )
 
 # Store intention in session state so it persists
 if "intention" not in st.session_state:
     st.session_state.intention = ""
 
-# --- Apollo param mapping ---
-KEY_MAPPING = {
-    "personTitles[]": "person_titles[]",
-    "personLocations[]": "person_locations[]",
-    "personSeniorities[]": "person_seniorities[]",
-    "includeSimilarTitles": "include_similar_titles",
-    "q_keywords": "q_keywords",
-    "organizationLocations[]": "organization_locations[]",
-    "q_organization_domains_list[]": "q_organization_domains_list[]",
-    "contactEmailStatus[]": "contact_email_status[]",
-    "organizationNumEmployeesRanges[]": "organization_num_employees_ranges[]",
-    "revenueRange[min]": "revenue_range[min]",
-    "revenueRange[max]": "revenue_range[max]",
-    "currentlyUsingAllOfTechnologyUids[]": "currently_using_all_of_technology_uids[]",
-    "currentlyUsingAnyOfTechnologyUids[]": "currently_using_any_of_technology_uids[]",
-    "currentlyNotUsingAnyOfTechnologyUids[]": "currently_not_using_any_of_technology_uids[]",
-    "q_organization_job_titles[]": "q_organization_job_titles[]",
-    "organizationJobLocations[]": "organization_job_locations[]",
-    "organizationNumJobsRange[min]": "organization_num_jobs_range[min]",
-    "organizationNumJobsRange[max]": "organization_num_jobs_range[max]",
-    "organizationJobPostedAtRange[min]": "organization_job_posted_at_range[min]",
-    "organizationJobPostedAtRange[max]": "organization_job_posted_at_range[max]",
-    "page": "page",
-    "perPage": "per_page",
-}
-
-def rename_apollo_params(params: dict) -> dict:
-    api_params = {}
-    for key, values in params.items():
-        mapped_key = KEY_MAPPING.get(key)
-        final_key = mapped_key if mapped_key else re.sub(r'([A-Z])', lambda m: '_' + m.group(1).lower(), key)
-        api_params[final_key] = values
-    return api_params
-
-def send_file_to_webhook(file_bytes: bytes, filename: str, url: str, intention: str):
-    files = {"data": (filename, BytesIO(file_bytes), "application/octet-stream")}
-    data = {"intention": intention}
-    try:
-        resp = requests.post(url, files=files, data=data, timeout=15)
-        resp.raise_for_status()
-        return True, resp.text
-    except Exception as e:
-        return False, str(e)
-
 # --- Fetch Leads ---
 if st.button("🔍 Fetch Leads"):
     if not api_key or not apollo_ui_url:
         st.error("Please provide both API key and Apollo search URL.")
+    elif run_in_background and shard_searches:
+        job_id = get_manager().submit(
+            "fetch", "Apollo search • sharded", sharded_fetch_job,
+            api_key, parse_search_url(apollo_ui_url), perpage,
+            shard_workers=max(1, concurrency // 2), max_workers=2, use_cache=use_cache
+        )
+        st.success(f"🕒 Queued sharded fetch job `{job_id}`. Track it under Background jobs below.")
+    elif run_in_background:
+        job_id = get_manager().submit(
+            "fetch", f"Apollo search • {numberpages} pages × {perpage}", fetch_leads_job,
+            api_key, parse_search_url(apollo_ui_url), numberpages, perpage,
+            max_workers=concurrency, use_cache=use_cache, resume=resume_pull
+        )
+        st.success(f"🕒 Queued fetch job `{job_id}`. Track it under Background jobs below.")
     else:
         try:
-            parsed = urlparse(apollo_ui_url)
-            raw_qs = parse_qs(parsed.fragment.split('/people?')[-1])
-            api_qs = rename_apollo_params(raw_qs)
-            api_qs["page"] = [str(numberpages)]
-            api_qs["per_page"] = [str(perpage)]
+            api_qs = parse_search_url(apollo_ui_url)
 
-            query = urlencode(api_qs, doseq=True)
-            api_url = f"https://api.apollo.io/api/v1/mixed_people/search?{query}"
+            st.info("Fetching results from Apollo.io...")
+            progress = st.progress(0.0)
+            quota_status = st.empty()
+            limiter = get_limiter(api_key)
 
-            headers = {
-                "x-api-key": api_key,
-                "Content-Type": "application/json",
-                "Accept": "application/json"
-            }
+            def on_page(done: int, total: int):
+                progress.progress(done / total, text=f"Fetched page {done} of {total}")
+                quota_status.caption(f"⏱ Apollo quota: {format_quota(limiter.snapshot())}")
 
-            st.info("Fetching results from Apollo.io...")
-            response = requests.post(api_url, headers=headers, json={})
-
-            if response.status_code == 200:
-                data = response.json()
-                people = data.get("people", [])
-                if people:
-                    df = pd.json_normalize(people)
-                    st.session_state["leads_df"] = df
-                    st.success(f"✅ Fetched {len(df)} leads successfully!")
-                    st.dataframe(df, use_container_width=True)
-                else:
-                    st.warning("No people found for this query.")
+            # Pages are normalized and checkpointed to disk as they arrive
+            prune_pulls()
+            if shard_searches:
+                coverage = {}
+                shards = plan_shards(api_key, api_qs, perpage, use_cache=use_cache, report=coverage)
+                st.info(f"🧩 Split into {len(shards)} shards (cap {result_cap(perpage)} per search) • "
+                        f"{format_coverage(coverage)}.")
+                if coverage["total"] > coverage["covered"]:
+                    st.warning("⚠ Some leads cannot be reached: shards that add an employee-count or revenue "
+                               "filter leave out organizations without that data in Apollo"
+                               + (f", and {coverage['over_cap']} shards could not be split under the cap "
+                                  f"({coverage['beyond_cap']:,} leads past it)." if coverage["over_cap"] else "."))
+                result = sharded_pull(api_key, shards, perpage, shard_workers=max(1, concurrency // 2),
+                                      max_workers=2, use_cache=use_cache, on_progress=on_page)
+                pull = PullStore(result["pull_id"])
+                if result["duplicates"]:
+                    st.caption(f"Dropped {result['duplicates']} people returned by more than one shard.")
+            else:
+                pull = PullStore(checkpointed_pull(api_key, api_qs, numberpages, perpage, resume=resume_pull,
+                                                   max_workers=concurrency, use_cache=use_cache, on_page=on_page))
+
+            fetched = pull.count()
+            if fetched:
+                st.session_state["leads_pull"] = pull.pull_id
+                st.session_state["push_progress"] = {}
+                st.success(f"✅ Fetched {fetched} leads successfully!")
             else:
-                st.error(f"API Error {response.status_code}: {response.text}")
+                pull.delete()
+                st.warning("No people found for this query.")
 
+        except ApolloError as e:
+            st.error(f"{e} — pages fetched so far are saved; fetch again to resume.")
         except Exception as e:
             st.error(f"Something went wrong: {e}")
 
+# --- Batch Mode ---
+# Many saved searches in one run; every segment shares the API key's rate limiter
+with st.expander("🗂 Batch mode: run many saved searches", expanded=False):
+    segments_text = st.text_area(
+        "One search per line: `URL | pages | intention | name` (pages, intention and name are optional)",
+        height=120
+    )
+    segments_file = st.file_uploader("…or a saved segments file (CSV or JSON with url, pages, intention, name)",
+                                     type=["csv", "json"])
+    push_target = st.radio("Push each segment to", ["Test", "Live", "Don't push"], horizontal=True)
+    segment_workers = st.number_input("Segments at once", min_value=1, max_value=8, value=3)
+    batch_format = st.selectbox("Payload format", available_payload_formats(), key="batch_payload_format")
+
+    segments = parse_segments(segments_text)
+    if segments_file is not None:
+        segments += load_segments_file(segments_file.name, segments_file.getvalue())
+    if segments:
+        st.caption(f"{len(segments)} segments • {sum(s['pages'] for s in segments)} pages at {perpage} per page")
+
+    if st.button("🚀 Run batch"):
+        push_url = {"Test": TEST_CSV_URL, "Live": LIVE_CSV_URL}.get(push_target)
+        missing = [s["name"] for s in segments if push_url and not s["intention"]]
+        if not api_key or not segments:
+            st.error("Please provide an API key and at least one search URL.")
+        elif missing:
+            st.error(f"⚠ Add an intention for: {', '.join(missing)}")
+        elif run_in_background:
+            job_id = get_manager().submit(
+                "batch", f"Batch • {len(segments)} segments → {push_target}", batch_job,
+                api_key, segments, perpage, push_url=push_url, record=push_target == "Live",
+                segment_workers=segment_workers, use_cache=use_cache, payload_format=batch_format
+            )
+            st.success(f"🕒 Queued batch job `{job_id}`. Track it under Background jobs below.")
+        else:
+            bars = [st.progress(0.0, text=f"{s['name']} • queued") for s in segments]
+
+            def on_batch_progress(states: list):
+                for bar, state in zip(bars, states):
+                    share = state["done"] / state["total"] if state["total"] else 0.0
+                    bar.progress(min(1.0, share), text=f"{state['name']} • {state['status']} "
+                                                                       f"• page {state['done']} of {state['total']}")
+
+            prune_pulls()
+            results = run_batch(api_key, segments, perpage, push_url=push_url, record=push_target == "Live",
+                                segment_workers=segment_workers, use_cache=use_cache,
+                                on_progress=on_batch_progress, payload_format=batch_format)
+            st.session_state["batch_results"] = results
+
+    if st.session_state.get("batch_results"):
+        st.dataframe(st.session_state["batch_results"], hide_index=True, use_container_width=True)
+
+# --- Apollo quota ---
+st.sidebar.caption(f"🗄 Cache: {format_stats(cache.stats())}")
+if api_key:
+    st.sidebar.caption(f"⏱ Apollo quota: {format_quota(get_limiter(api_key).snapshot())}")
+http_metrics_panel()
+performance_panel()
+
+# --- Leads View ---
+# Only the visible window (and projected columns) is read from the pull's Parquet pages
+if "leads_pull" in st.session_state:
+    pull = PullStore(st.session_state["leads_pull"])
+    lead_grid("leads", COLUMNS, sortable_fields(SCHEMA), pull.query, label="leads")
+
 # --- Send Options ---
-if "leads_df" in st.session_state:
-    df = st.session_state["leads_df"]
-    csv_data = df.to_csv(index=False).encode("utf-8")
+# The full frame is only loaded when leads are pushed or exported, never to page through the grid
+if "leads_pull" in st.session_state:
+    pull_id = st.session_state["leads_pull"]
 
     # Intention text box
     st.session_state.intention = st.text_input(
@@ -121,31 +209,127 @@ if "leads_df" in st.session_state:
         placeholder="Enter the intention for this lead upload..."
     )
 
+    chunk_rows = st.number_input("📦 Rows per webhook call (0 = send all at once)",
+                                 min_value=0, value=0, step=1000)
+    suppress_pushed = st.checkbox("🧹 Skip leads already pushed to Live", value=True)
+    payload_format = st.selectbox(
+        "📦 Payload format", available_payload_formats(),
+        help="Compressed and binary formats add `format`, `content_type` and `content_encoding` fields "
+             "so the n8n workflow can decode them."
+    )
+
+    def outgoing_leads():
+        df = load_pull(pull_id)
+        if not suppress_pushed:
+            return df
+        outgoing, suppressed = get_index().filter_batch(df)
+        if suppressed:
+            st.info(f"🧹 Suppressed {suppressed} of {len(df)} leads already pushed or duplicated in this batch.")
+        return outgoing
+
+    def push_leads(url: str, label: str, record: bool):
+        if not st.session_state.intention.strip():
+            st.error("⚠ Please enter an intention before sending.")
+            return
+
+        if run_in_background:
+            outgoing = outgoing_leads()
+            if outgoing.empty:
+                st.warning("No new leads to send.")
+                return
+            job_id = get_manager().submit(
+                "push", f"Push {len(outgoing)} leads to {label}", push_job,
+                outgoing, "apollo_full_leads.csv", url, st.session_state.intention,
+                chunk_rows=chunk_rows, record=record, payload_format=payload_format
+            )
+            st.success(f"🕒 Queued push job `{job_id}`.")
+            return
+
+        if not chunk_rows:
+            outgoing = outgoing_leads()
+            if outgoing.empty:
+                st.warning("No new leads to send.")
+                return
+            upload = {}
+            with st.spinner(f"Sending to {label}..."):
+                success, result = send_file_to_webhook(
+                    outgoing, "apollo_full_leads.csv", url, st.session_state.intention,
+                    payload_format=payload_format, stats=upload
+                )
+            if success and record:
+                get_index().record(outgoing)
+            st.success(f"✅ Sent to {label}!") if success else st.error(f"❌ {result}")
+            if upload:
+                st.caption(f"📦 {format_upload(upload)}")
+            return
+
+        # Remember the batch and next chunk so a failed push resumes where it stopped
+        push_progress = st.session_state.setdefault("push_progress", {})
+        key = (url, chunk_rows)
+        if key in push_progress:
+            start, outgoing = push_progress[key]
+        else:
+            start, outgoing = 0, outgoing_leads()
+        if outgoing.empty:
+            st.warning("No new leads to send.")
+            return
+        total = chunk_count(outgoing, chunk_rows)
+        if start:
+            st.info(f"Resuming from chunk {start + 1} of {total}.")
+        bar = st.progress(start / total)
+
+        def on_chunk(done: int, total: int):
+            bar.progress(done / total, text=f"Sent chunk {done} of {total}")
+            if record:
+                get_index().record(outgoing.iloc[(done - 1) * chunk_rows:done * chunk_rows])
+
+        upload = {}
+        success, next_chunk, result = send_in_chunks(
+            outgoing, "apollo_full_leads.csv", url, st.session_state.intention,
+            chunk_rows, start_chunk=start, on_chunk=on_chunk, payload_format=payload_format, stats=upload
+        )
+        if upload:
+            st.caption(f"📦 {format_upload(upload)}")
+        if success:
+            push_progress.pop(key, None)
+            st.success(f"✅ Sent {total} chunks to {label}!")
+        else:
+            push_progress[key] = (next_chunk, outgoing)
+            st.error(f"❌ Chunk {next_chunk + 1} of {total} failed: {result}. Send again to resume.")
+
     col1, col2, col3 = st.columns([1, 1, 2])
 
     with col1:
         if st.button("📤 Send to Live"):
-            if not st.session_state.intention.strip():
-                st.error("⚠ Please enter an intention before sending.")
-            else:
-                success, result = send_file_to_webhook(
-                    csv_data, "apollo_full_leads.csv",
-                    "https://bizmaxus.app.n8n.cloud/webhook/csv",
-                    st.session_state.intention
-                )
-                st.success("✅ Sent to Live!") if success else st.error(f"❌ {result}")
+            push_leads(LIVE_CSV_URL, "Live", record=True)
 
     with col2:
         if st.button("🧪 Send to Test"):
-            if not st.session_state.intention.strip():
-                st.error("⚠ Please enter an intention before sending.")
-            else:
-                success, result = send_file_to_webhook(
-                    csv_data, "apollo_full_leads.csv",
-                    "https://bizmaxus.app.n8n.cloud/webhook-test/csv",
-                    st.session_state.intention
-                )
-                st.success("✅ Sent to Test!") if success else st.error(f"❌ {result}")
+            push_leads(TEST_CSV_URL, "Test", record=False)
 
     with col3:
-        st.download_button("💾 Download CSV", csv_data, "apollo_leads_full.csv", "text/csv")
+        # Serialized only on request and memoized per lead set, not on every rerun
+        export_format = st.selectbox("Export format", available_formats(), label_visibility="collapsed")
+        if st.button(f"📦 Prepare {export_format} download"):
+            data, build_seconds, from_cache = get_export(load_pull(pull_id), export_format)
+            st.session_state["leads_export"] = {"pull_id": pull_id, "format": export_format, "data": data,
+                                                "seconds": build_seconds, "from_cache": from_cache}
+        exported = st.session_state.get("leads_export")
+        if exported and exported["pull_id"] == pull_id and exported["format"] == export_format:
+            extension, mime = EXPORT_FORMATS[export_format]
+            st.download_button(f"💾 Download {export_format}", exported["data"],
+                               f"apollo_leads_full.{extension}", mime)
+            st.caption(f"{'Cached' if exported['from_cache'] else 'Built'} export • "
+                       f"{len(exported['data']) / 1024:.0f} KB • built in {exported['seconds']:.2f} s")
+
+# --- Background Jobs ---
+def load_job_result(result, job):
+    if job["kind"] == "fetch" and result is not None:
+        st.session_state["leads_pull"] = result
+        st.session_state["push_progress"] = {}
+    elif job["kind"] == "batch" and result is not None:
+        st.session_state["batch_results"] = result
+
+
+with st.expander("🗂 Background jobs", expanded=False):
+    jobs_panel(("fetch", "push", "batch"), on_load=load_job_result)
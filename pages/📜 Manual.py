@@ -1,6 +1,8 @@
 import streamlit as st
-import requests
-from io import BytesIO
+
+from lib.ui import http_metrics_panel, performance_panel
+from lib.uploads import CHUNK_ROWS, format_validation, forward_csv, validate_csv, validation_warnings
+from lib.webhook import LIVE_CSV_URL, send_file_to_webhook
 
 # -----------------------------
 # Page Setup
@@ -42,20 +44,75 @@ intention = st.text_input(
 )
 
 # -----------------------------
-# Upload Trigger
+# Duplicate Suppression
 # -----------------------------
-def send_file_to_webhook(file_bytes: bytes, filename: str, intention_text: str):
-    url = "https://bizmaxus.app.n8n.cloud/webhook/csv"
-    files = {
-        "data": (filename, BytesIO(file_bytes), "application/octet-stream")
-    }
-    data = {"intention": intention_text}  # extra field in body
-    try:
-        response = requests.post(url, files=files, data=data, timeout=15)
-        response.raise_for_status()
-        return True, response.text
-    except requests.exceptions.RequestException as e:
-        return False, str(e)
+is_csv = bool(uploaded_file) and uploaded_file.name.lower().endswith(".csv")
+suppress_pushed = st.checkbox(
+    "Skip leads already pushed",
+    value=True,
+    disabled=not is_csv,
+    help="CSV uploads are checked against every lead previously sent to a campaign."
+)
+chunk_rows = st.number_input(
+    "Rows per webhook call",
+    min_value=1000,
+    value=CHUNK_ROWS,
+    step=10000,
+    disabled=not is_csv,
+    help="CSVs are validated and forwarded this many rows at a time, so memory use stays flat for large files."
+)
+
+# -----------------------------
+# CSV Validation & Chunked Send
+# -----------------------------
+def send_csv():
+    """Validate the CSV chunk by chunk, then forward it in chunks; a failed send resumes at its chunk."""
+    # Validation and the next chunk to send are remembered per file and settings
+    key = (uploaded_file.name, uploaded_file.size, chunk_rows, suppress_pushed)
+    progress = st.session_state.setdefault("manual_progress", {})
+    if key not in progress:
+        bar = st.progress(0.0, text="Validating…")
+
+        def on_validated(rows: int, bytes_read: int):
+            bar.progress(min(1.0, bytes_read / max(uploaded_file.size, 1)),
+                         text=f"Validated {rows:,} rows")
+
+        report = validate_csv(uploaded_file, chunk_rows, suppress=suppress_pushed, on_chunk=on_validated)
+        bar.empty()
+        progress[key] = (0, report)
+    start, report = progress[key]
+
+    st.caption(f"🔎 {format_validation(report)}")
+    for warning in validation_warnings(report):
+        st.warning(f"⚠ {warning}")
+    if report["errors"]:
+        progress.pop(key, None)
+        for error in report["errors"]:
+            st.error(f"❌ {error}")
+        return
+
+    total = report["chunks"]
+    if start:
+        st.info(f"Resuming from chunk {start + 1} of {total}.")
+    bar = st.progress(start / max(total, 1))
+
+    def on_chunk(done: int, rows: int):
+        bar.progress(done / max(total, 1), text=f"Sent chunk {done} of {total} ({rows:,} rows)")
+
+    success, next_chunk, result = forward_csv(
+        uploaded_file, uploaded_file.name, LIVE_CSV_URL, intention, chunk_rows,
+        suppress=suppress_pushed, start_chunk=start, total_chunks=total, on_chunk=on_chunk
+    )
+    if success:
+        progress.pop(key, None)
+        st.success(f"✅ File sent successfully in {total} chunks!")
+        if result:
+            st.code(result, language='json')
+    else:
+        progress[key] = (next_chunk, report)
+        st.error(f"❌ Chunk {next_chunk + 1} of {total} failed. Send again to resume.")
+        st.text(result)
+
 
 # -----------------------------
 # Trigger Button
@@ -66,17 +123,24 @@ if uploaded_file:
         if not intention.strip():
             st.error("⚠ Please enter an intention before sending.")
         else:
-            with st.spinner("Sending file to webhook..."):
-                success, result = send_file_to_webhook(uploaded_file.read(), uploaded_file.name, intention)
-            if success:
-                st.success("✅ File sent successfully!")
-                st.code(result, language='json')
+            if is_csv:
+                send_csv()
             else:
-                st.error("❌ Upload failed!")
-                st.text(result)
+                with st.spinner("Sending file to webhook..."):
+                    # Streamed from the upload buffer instead of read() into one blob
+                    success, result = send_file_to_webhook(uploaded_file, uploaded_file.name, LIVE_CSV_URL, intention)
+                if success:
+                    st.success("✅ File sent successfully!")
+                    st.code(result, language='json')
+                else:
+                    st.error("❌ Upload failed!")
+                    st.text(result)
 else:
     st.warning("👈 Please select a file to continue.")
 
+http_metrics_panel()
+performance_panel()
+
 # -----------------------------
 # Footer
 # -----------------------------
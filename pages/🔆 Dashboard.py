@@ -1,8 +1,14 @@
+import time
+
 import streamlit as st
-import pandas as pd
-import requests
 import plotly.express as px
 
+from lib.aggregates import get_aggregates
+from lib.dashboard_data import DEFAULT_REFRESH_SECONDS, get_store
+from lib.grid import query_frame, sortable_columns
+from lib.ingest import ingest_url, start_ingest
+from lib.ui import http_metrics_panel, lead_grid, performance_panel
+
 # --- Page Config ---
 st.set_page_config(page_title="Lead Dashboard", layout="wide", page_icon="📊")
 
@@ -32,35 +38,66 @@ st.markdown("""
 """, unsafe_allow_html=True)
 
 # --- Sidebar ---
-
-
+st.sidebar.header("🔄 Data")
+refresh_minutes = st.sidebar.number_input(
+    "Refresh interval (minutes)", min_value=1, max_value=1440, value=max(1, DEFAULT_REFRESH_SECONDS // 60)
+)
+force_refresh = st.sidebar.button("🔄 Refresh now")
+live_updates = st.sidebar.toggle("📡 Live status updates", value=True,
+                                 help="Apply lead status events pushed by n8n between full refreshes.")
 
 # --- Fetch Data ---
-FULL_LIST_URL = "https://bizmaxus.app.n8n.cloud/webhook/full-list"
+# Served from the local copy; the webhook is only hit when the interval lapses
+store = get_store()
 try:
-    response = requests.get(FULL_LIST_URL)
-    response.raise_for_status()
-    data = response.json()
-    df = pd.DataFrame(data)
+    df = store.get(refresh_interval=refresh_minutes * 60, force=force_refresh)
 except Exception as e:
-    st.error(f"Failed to fetch data: {e}")
-    st.stop()
+    if store.df is None:
+        st.error(f"Failed to fetch data: {e}")
+        st.stop()
+    df = store.df
+if store.last_error:
+    st.sidebar.warning(f"Refresh failed, showing cached data until the next interval: {store.last_error}")
+
+transfer = store.last_transfer
+st.sidebar.caption(f"Last refresh {store.age() / 60:.0f} min ago"
+                   + (f" • {transfer['mode']} • {transfer['rows']} rows • {transfer['bytes'] / 1024:.0f} KB "
+                      f"in {transfer['seconds']:.1f} s" if transfer else ""))
+
+# --- Live Updates ---
+# n8n pushes status changes to the local ingest endpoint; the page reruns when the store changes
+@st.fragment(run_every=3)
+def watch_store(seen_version: int):
+    if get_store().version != seen_version:
+        st.rerun(scope="app")
+
+
+if live_updates:
+    server, error = start_ingest()
+    if server:
+        events = store.events
+        st.sidebar.caption(f"📡 POST events to `{ingest_url(server)}` • {events['applied']} applied"
+                           + (f", {events['skipped']} skipped without an id, email or LinkedIn URL"
+                              if events["skipped"] else "")
+                           + (f", last {time.time() - events['last_at']:.0f} s ago" if events["last_at"] else ""))
+        watch_store(store.version)
+    else:
+        st.sidebar.warning(error)
+
+http_metrics_panel()
+performance_panel()
 
 # --- Sidebar Filters ---
+# Counts come from a precomputed mode × status × hour cube, rebuilt per snapshot
+agg = get_aggregates(df)
+
 st.sidebar.header("🔍 Filters")
-mode_options = df["mode"].dropna().unique().tolist() if "mode" in df.columns else []
-status_options = df["status"].dropna().unique().tolist() if "status" in df.columns else []
+mode_options = agg.options("mode")
+status_options = agg.options("status")
 
 selected_modes = st.sidebar.multiselect("Mode", mode_options, default=mode_options)
 selected_statuses = st.sidebar.multiselect("Status", status_options, default=status_options)
 
-# --- Apply Filters ---
-filtered_df = df.copy()
-if "mode" in filtered_df.columns:
-    filtered_df = filtered_df[filtered_df["mode"].isin(selected_modes)]
-if "status" in filtered_df.columns:
-    filtered_df = filtered_df[filtered_df["status"].isin(selected_statuses)]
-
 # --- Top Metrics Row ---
 col1, col2, col3 = st.columns(3)
 with col1:
@@ -73,12 +110,12 @@ with col1:
 with col2:
     st.markdown(f"""
         <div class="metric-card">
-            <div class="metric-value">{len(filtered_df)}</div>
+            <div class="metric-value">{agg.filtered_count(selected_modes, selected_statuses)}</div>
             <div class="metric-label">Filtered Leads</div>
         </div>
     """, unsafe_allow_html=True)
 with col3:
-    replied_count = filtered_df[filtered_df["status"] == "Replied"].shape[0] if "status" in filtered_df.columns else 0
+    replied_count = agg.status_count(selected_modes, selected_statuses, "Replied")
     st.markdown(f"""
         <div class="metric-card">
             <div class="metric-value">{replied_count}</div>
@@ -91,35 +128,33 @@ tab1, tab2, tab3 = st.tabs(["📄 Data Table", "📊 Charts", "⏰ Timeline"])
 
 # --- Tab 1: Data Table ---
 with tab1:
-    st.dataframe(filtered_df, use_container_width=True)
+    visible = agg.rows(selected_modes, selected_statuses)
+    lead_grid("dashboard", list(visible.columns), sortable_columns(visible),
+              lambda *view: query_frame(visible, *view), label="leads")
 
 # --- Tab 2: Charts ---
 with tab2:
     col1, col2 = st.columns(2)
 
-    if "mode" in filtered_df.columns:
-        mode_counts = filtered_df["mode"].value_counts().reset_index()
-        mode_counts.columns = ["Mode", "Count"]
+    if agg.has_mode:
+        mode_counts = agg.counts_by("mode", selected_modes, selected_statuses)
         fig_mode = px.bar(mode_counts, x="Mode", y="Count", title="Lead Count by Mode", text_auto=True)
         fig_mode.update_layout(template="plotly_white")
         col1.plotly_chart(fig_mode, use_container_width=True)
 
-    if "status" in filtered_df.columns:
-        status_counts = filtered_df["status"].value_counts().reset_index()
-        status_counts.columns = ["Status", "Count"]
+    if agg.has_status:
+        status_counts = agg.counts_by("status", selected_modes, selected_statuses)
         fig_status = px.pie(status_counts, names="Status", values="Count", title="Lead Distribution by Status")
         fig_status.update_traces(textinfo='percent+label')
         col2.plotly_chart(fig_status, use_container_width=True)
 
 # --- Tab 3: Timeline ---
 with tab3:
-    if "last email" in filtered_df.columns:
-        try:
-            filtered_df["last email"] = pd.to_datetime(filtered_df["last email"], utc=True, errors='coerce')
-            time_df = filtered_df.dropna(subset=["last email"])
-            time_df["Time (Hour)"] = time_df["last email"].dt.strftime('%Y-%m-%d %H:00')
-            hourly_counts = time_df.groupby("Time (Hour)").size().reset_index(name="Emails")
-
+    if agg.has_timeline:
+        hourly_counts = agg.hourly(selected_modes, selected_statuses)
+        if hourly_counts.empty:
+            st.info("No valid `last email` timestamps found.")
+        else:
             fig_time = px.bar(
                 hourly_counts,
                 x="Time (Hour)",
@@ -130,7 +165,5 @@ with tab3:
             fig_time.update_xaxes(tickangle=45)
             fig_time.update_layout(template="plotly_white")
             st.plotly_chart(fig_time, use_container_width=True)
-        except Exception:
-            st.info("No valid `last email` timestamps found.")
     else:
         st.info("No `last email` column found in dataset.")
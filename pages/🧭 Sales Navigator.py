@@ -1,19 +1,21 @@
-from io import BytesIO
 import requests
 import pandas as pd
 import streamlit as st
 
-# --- Function to send file + intention to webhook ---
-def send_file_to_webhook(file_bytes: bytes, filename: str, intention: str):
-    url = "https://bizmaxus.app.n8n.cloud/webhook/salesnav"
-    files = {"data": (filename, BytesIO(file_bytes), "application/octet-stream")}
-    data = {"intention": intention}  # extra field in the body
-    try:
-        response = requests.post(url, files=files, data=data, timeout=15)
-        response.raise_for_status()
-        return True, response.text
-    except requests.exceptions.RequestException as e:
-        return False, str(e)
+from lib.apollo import ApolloError
+from lib.cache import format_stats, get_cache
+from lib.credits import enrich_planned, format_savings
+from lib.dedup import get_index
+from lib.enrich import rows_to_details
+from lib.exports import get_export
+from lib.grid import query_frame, sortable_columns
+from lib.ingest import ingest_url, start_ingest
+from lib.jobs import get_manager
+from lib.phones import format_reveals, get_reveals, merge_phones
+from lib.ratelimit import format_quota, get_limiter
+from lib.tasks import enrich_job
+from lib.ui import http_metrics_panel, jobs_panel, lead_grid, performance_panel
+from lib.webhook import SALESNAV_URL, send_file_to_webhook
 
 # --- Initialize session state ---
 if "df_result" not in st.session_state:
@@ -23,63 +25,6 @@ if "csv_bytes" not in st.session_state:
 if "intention" not in st.session_state:
     st.session_state.intention = ""
 
-# --- Column mapping ---
-COLUMN_MAPPING = {
-    "person.id": "id",
-    "person.first_name": "first_name",
-    "person.last_name": "last_name",
-    "person.name": "name",
-    "person.linkedin_url": "linkedin_url",
-    "person.title": "title",
-    "person.email_status": "email_status",
-    "person.photo_url": "photo_url",
-    "person.twitter_url": "twitter_url",
-    "person.github_url": "github_url",
-    "person.facebook_url": "facebook_url",
-    "person.extrapolated_email_confidence": "extrapolated_email_confidence",
-    "person.headline": "headline",
-    "person.email": "email",
-    "person.organization_id": "organization_id",
-    "person.employment_history": "employment_history",
-    "person.state": "state",
-    "person.city": "city",
-    "person.country": "country",
-    "person.departments": "departments",
-    "person.subdepartments": "subdepartments",
-    "person.seniority": "seniority",
-    "person.functions": "functions",
-    "person.intent_strength": "intent_strength",
-    "person.show_intent": "show_intent",
-    "person.email_domain_catchall": "email_domain_catchall",
-    "person.revealed_for_current_team": "revealed_for_current_team",
-    "person.organization.id": "organization.id",
-    "person.organization.name": "organization.name",
-    "person.organization.website_url": "organization.website_url",
-    "person.organization.blog_url": "organization.blog_url",
-    "person.organization.angellist_url": "organization.angellist_url",
-    "person.organization.linkedin_url": "organization.linkedin_url",
-    "person.organization.twitter_url": "organization.twitter_url",
-    "person.organization.facebook_url": "organization.facebook_url",
-    "person.organization.primary_phone.number": "organization.primary_phone.number",
-    "person.organization.primary_phone.source": "organization.primary_phone.source",
-    "person.organization.primary_phone.sanitized_number": "organization.primary_phone.sanitized_number",
-    "person.organization.languages": "organization.languages",
-    "person.organization.alexa_ranking": "organization.alexa_ranking",
-    "person.organization.phone": "organization.phone",
-    "person.organization.linkedin_uid": "organization.linkedin_uid",
-    "person.organization.founded_year": "organization.founded_year",
-    "person.organization.publicly_traded_symbol": "organization.publicly_traded_symbol",
-    "person.organization.publicly_traded_exchange": "organization.publicly_traded_exchange",
-    "person.organization.logo_url": "organization.logo_url",
-    "person.organization.crunchbase_url": "organization.crunchbase_url",
-    "person.organization.primary_domain": "organization.primary_domain",
-    "person.organization.sanitized_phone": "organization.sanitized_phone",
-    "person.organization.organization_headcount_six_month_growth": "organization.organization_headcount_six_month_growth",
-    "person.organization.organization_headcount_twelve_month_growth": "organization.organization_headcount_twelve_month_growth",
-    "person.organization.organization_headcount_twenty_four_month_growth": "organization.organization_headcount_twenty_four_month_growth",
-    "person.organization.market_cap": "organization.market_cap",
-}
-
 # --- Streamlit UI ---
 st.title("Apollo.io Lead Enrichment Tool")
 
@@ -104,13 +49,33 @@ with st.expander("Optional Search search fields", expanded=False):
 
 reveal_personal_emails = st.checkbox("Reveal Personal Emails", value=True)
 reveal_phone_number = st.checkbox("Reveal Phone Number", value=False)
+use_cache = st.checkbox("Use cached enrichments", value=True,
+                        help="Serve people enriched within the cache TTL locally instead of calling Apollo again.")
+use_pulls = st.checkbox("Skip people already known from earlier searches", value=True,
+                        help="People whose email and status came back in a saved search pull are not matched "
+                             "again. Ignored when revealing phone numbers.")
 
 webhook_url = ""
 if reveal_phone_number:
     webhook_url = st.text_input(
         "Webhook URL (Required if revealing phone numbers)",
-        value="https://bizmaxus.app.n8n.cloud/webhook/salesnav"
+        value=SALESNAV_URL
     )
+    server, error = start_ingest()
+    if server:
+        st.caption(f"📥 Revealed phones are matched back to the results when Apollo's delivery is POSTed to "
+                   f"`{ingest_url(server, '/phones')}` (point the webhook URL there through a tunnel, "
+                   f"or forward it from the n8n workflow).")
+    else:
+        st.warning(f"Phones cannot be collected locally: {error}")
+
+# Reveal options shared by single and bulk enrichment
+reveal_flags = {"reveal_personal_emails": str(reveal_personal_emails).lower()}
+if reveal_phone_number:
+    reveal_flags["reveal_phone_number"] = "true"
+    reveal_flags["webhook_url"] = webhook_url
+else:
+    reveal_flags["reveal_phone_number"] = "false"
 
 # --- Enrich Lead Button ---
 if st.button("🔍 Enrich Lead"):
@@ -129,61 +94,131 @@ if st.button("🔍 Enrich Lead"):
             "domain": domain,
             "id": person_id,
             "linkedin_url": linkedin_url,
-            "reveal_personal_emails": str(reveal_personal_emails).lower()
         }
-
-        if reveal_phone_number:
-            params["reveal_phone_number"] = "true"
-            params["webhook_url"] = webhook_url
-        else:
-            params["reveal_phone_number"] = "false"
-
         params = {k: v for k, v in params.items() if v}
 
-        url = "https://api.apollo.io/api/v1/people/match"
-        headers = {
-            "accept": "application/json",
-            "Cache-Control": "no-cache",
-            "Content-Type": "application/json",
-            "x-api-key": api_key
-        }
-
         try:
+            savings = {}
             with st.spinner("Enriching lead..."):
-                response = requests.post(url, headers=headers, params=params)
+                df_result = enrich_planned(api_key, [params], reveal_flags, use_cache=use_cache,
+                                           use_pulls=use_pulls, stats=savings)
 
-            if response.status_code == 200:
-                data = response.json()
-                if data:
-                    # Normalize and rename columns
-                    df_result = pd.json_normalize(data)
-                    df_result.rename(columns=COLUMN_MAPPING, inplace=True)
+            if not df_result.empty:
+                st.session_state.df_result = df_result
+                st.session_state.csv_bytes = get_export(df_result, "CSV")[0]
+                st.success("Lead enrichment request sent successfully!")
+                st.caption(f"💳 {format_savings(savings)}")
 
-                    # Ensure all expected columns are present
-                    for col in COLUMN_MAPPING.values():
-                        if col not in df_result.columns:
-                            df_result[col] = None
+                if reveal_phone_number:
+                    st.info("📞 Phone numbers will be sent asynchronously to your webhook URL and "
+                            "merged into the results as they arrive.")
+            else:
+                st.warning("No data returned from Apollo.")
+        except ApolloError as e:
+            st.error(f"Error: {e.status_code} - {e.text}")
+        except requests.exceptions.RequestException as e:
+            st.error(f"Request failed: {str(e)}")
 
-                    # Reorder columns
-                    df_result = df_result[list(COLUMN_MAPPING.values())]
+# --- Bulk Enrichment ---
+with st.expander("📂 Bulk enrichment from CSV", expanded=False):
+    st.caption(
+        "Upload a CSV with a `linkedin_url` or `email` column, or `name`/`first_name` + `last_name` "
+        "with `domain`/`organization_name`. Rows are matched in batches of 10."
+    )
+    bulk_file = st.file_uploader("Leads to enrich", type=["csv"])
+    bulk_workers = st.number_input("⚡ Concurrent requests", min_value=1, max_value=16, value=4)
+    bulk_background = st.checkbox("🕒 Run in background", help="Keeps enriching if this tab is closed.")
 
-                    st.session_state.df_result = df_result
-                    st.session_state.csv_bytes = df_result.to_csv(index=False).encode('utf-8')
-                    st.success("Lead enrichment request sent successfully!")
+    if st.button("🚀 Enrich Uploaded Leads"):
+        if not api_key:
+            st.error("Please enter your Apollo API Key.")
+        elif reveal_phone_number and not webhook_url:
+            st.error("Webhook URL is required when Reveal Phone Number is enabled.")
+        elif bulk_file is None:
+            st.error("Please upload a CSV of leads to enrich.")
+        else:
+            details, skipped = rows_to_details(pd.read_csv(bulk_file, dtype=str))
+            if skipped:
+                st.warning(f"⚠ Skipped {skipped} rows without a usable identifier.")
 
-                    if reveal_phone_number:
-                        st.info("📞 Phone numbers will be sent asynchronously to your webhook URL.")
-                else:
-                    st.warning("No data returned from Apollo.")
+            if bulk_background and details:
+                job_id = get_manager().submit(
+                    "enrich", f"Enrich {len(details)} leads from {bulk_file.name}", enrich_job,
+                    api_key, details, reveal_flags, max_workers=bulk_workers, use_cache=use_cache,
+                    use_pulls=use_pulls
+                )
+                st.success(f"🕒 Queued enrichment job `{job_id}`.")
             else:
-                st.error(f"Error: {response.status_code} - {response.text}")
-        except requests.exceptions.RequestException as e:
-            st.error(f"Request failed: {str(e)}")
+                progress = st.progress(0.0)
+
+                def on_progress(done: int, total: int, rows_per_sec: float):
+                    progress.progress(done / total, text=f"Enriched {done} of {total} rows • {rows_per_sec:.1f} rows/s")
+
+                try:
+                    if details:
+                        savings = {}
+                        df_result = enrich_planned(api_key, details, reveal_flags, max_workers=bulk_workers,
+                                                   on_progress=on_progress, use_cache=use_cache,
+                                                   use_pulls=use_pulls, stats=savings)
+                        st.session_state.df_result = df_result
+                        st.session_state.csv_bytes = get_export(df_result, "CSV")[0]
+                        st.success(f"✅ Enriched {len(df_result)} of {len(details)} leads.")
+                        st.caption(f"💳 {format_savings(savings)}")
+                        if reveal_phone_number:
+                            st.info("📞 Phone numbers will be sent asynchronously to your webhook URL and "
+                                    "merged into the results as they arrive.")
+                    else:
+                        st.warning("No rows to enrich.")
+                except ApolloError as e:
+                    st.error(f"Error: {e.status_code} - {e.text}")
+                except requests.exceptions.RequestException as e:
+                    st.error(f"Request failed: {str(e)}")
+
+# --- Background Jobs ---
+def load_job_result(result, job):
+    if result is not None:
+        st.session_state.df_result = result
+        st.session_state.csv_bytes = get_export(result, "CSV")[0]
+
+
+with st.expander("🗂 Background jobs", expanded=False):
+    jobs_panel(("enrich",), on_load=load_job_result)
+
+# --- Apollo quota ---
+st.sidebar.caption(f"🗄 Cache: {format_stats(get_cache().stats())}")
+if api_key:
+    st.sidebar.caption(f"⏱ Apollo quota: {format_quota(get_limiter(api_key).snapshot())}")
+http_metrics_panel()
+performance_panel()
+
+# --- Phone reveals ---
+# Apollo delivers revealed numbers later; rerun the page when new ones arrive so they are merged in
+@st.fragment(run_every=5)
+def watch_reveals(seen_version: int):
+    reveals = get_reveals()
+    reveals.expire()
+    if reveals.version != seen_version:
+        st.rerun(scope="app")
+
 
 # --- Show results if available ---
 if st.session_state.df_result is not None:
     st.subheader("📊 Enriched Lead Data")
-    st.dataframe(st.session_state.df_result)
+    results = st.session_state.df_result
+    if "id" in results.columns:
+        reveals = get_reveals()
+        counts = reveals.summary(results["id"].dropna().tolist())
+        if any(counts.values()):
+            merged = merge_phones(results, reveals)
+            phone_columns = ["phone", "phone_numbers", "phone_status"]
+            if not merged[phone_columns].equals(results.reindex(columns=phone_columns)):
+                results = st.session_state.df_result = merged
+                st.session_state.csv_bytes = get_export(results, "CSV")[0]
+            st.caption(f"📞 Phone reveals: {format_reveals(counts)}")
+            if counts["pending"]:
+                watch_reveals(reveals.version)
+    lead_grid("enriched", list(results.columns), sortable_columns(results),
+              lambda *view: query_frame(results, *view), label="leads")
 
     st.download_button(
         "📥 Download CSV",
@@ -202,15 +237,23 @@ if st.session_state.df_result is not None:
     if st.button("📤 Add Lead to Campaign"):
         if not st.session_state.intention.strip():
             st.error("⚠ Please enter an intention before sending.")
-        elif st.session_state.csv_bytes:
-            success, msg = send_file_to_webhook(
-                st.session_state.csv_bytes,
-                "enriched_lead.csv",
-                st.session_state.intention
-            )
-            if success:
-                st.success(f"✅ Lead sent to campaign successfully! Response: {msg}")
+        elif not st.session_state.df_result.empty:
+            outgoing, suppressed = get_index().filter_batch(st.session_state.df_result)
+            if suppressed:
+                st.info(f"🧹 Suppressed {suppressed} leads already pushed to a campaign.")
+            if outgoing.empty:
+                st.warning("No new leads to send.")
             else:
-                st.error(f"❌ Failed to send lead: {msg}")
+                success, msg = send_file_to_webhook(
+                    outgoing,
+                    "enriched_lead.csv",
+                    SALESNAV_URL,
+                    st.session_state.intention
+                )
+                if success:
+                    get_index().record(outgoing)
+                    st.success(f"✅ Lead sent to campaign successfully! Response: {msg}")
+                else:
+                    st.error(f"❌ Failed to send lead: {msg}")
         else:
             st.error("❌ No CSV data available to send.")
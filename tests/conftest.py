@@ -0,0 +1,27 @@
+"""Shared setup: every test talks to bench.mock_server and keeps its state in a temporary directory.
+
+    python -m pytest -q
+"""
+import os
+import tempfile
+
+import pytest
+
+from bench.mock_server import MockConfig, start_server
+
+MOCK_CONFIG = MockConfig(latency_ms=0, jitter_ms=0, total_entries=1_000, full_list_rows=200)
+
+# lib reads these at import time, so they are set before any test module imports it
+_server = start_server(MOCK_CONFIG)
+os.environ["LEAD_MACHINE_APOLLO_URL"] = _server.base_url
+os.environ["LEAD_MACHINE_N8N_URL"] = _server.base_url
+os.environ["LEAD_MACHINE_DATA_DIR"] = tempfile.mkdtemp(prefix="lead-machine-tests-")
+
+
+@pytest.fixture(scope="session")
+def mock_server():
+    yield _server
+
+
+def pytest_unconfigure(config):
+    _server.shutdown()
@@ -0,0 +1,41 @@
+import pytest
+
+from lib.apollo import fetch_pages
+
+SEARCH_PATH = "/api/v1/mixed_people/search"
+
+
+@pytest.fixture
+def searches(mock_server, monkeypatch):
+    """Set the mock's search size; returns a function counting the searches made since."""
+    def count(total_entries: int):
+        monkeypatch.setattr(mock_server.config, "total_entries", total_entries)
+        before = mock_server.requests.get(SEARCH_PATH, 0)
+        return lambda: mock_server.requests.get(SEARCH_PATH, 0) - before
+    return count
+
+
+def test_pages_come_back_in_order_and_trimmed(searches):
+    made = searches(35)
+    people = fetch_pages("test-fetch-order", {}, 8, 10, max_workers=4, use_cache=False)
+    assert [p["id"] for p in people] == [f"p{i:09d}" for i in range(35)]
+    assert made() == 4
+
+
+def test_empty_search_stops_after_page_one(searches):
+    made = searches(0)
+    seen = []
+    people = fetch_pages("test-fetch-empty", {}, 30, 10, use_cache=False,
+                         on_page=lambda done, total: seen.append((done, total)))
+    assert people == []
+    assert made() == 1
+    assert seen[-1] == (1, 1)
+
+
+def test_done_pages_are_not_refetched(searches):
+    made = searches(50)
+    results = {}
+    fetch_pages("test-fetch-resume", {}, 5, 10, use_cache=False, keep=False, done_pages=(1, 2, 4),
+                total_pages=5, on_result=lambda page, people: results.setdefault(page, len(people)))
+    assert sorted(results) == [3, 5]
+    assert made() == 2
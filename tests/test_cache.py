@@ -0,0 +1,49 @@
+import time
+
+from lib.cache import ResponseCache, person_key, search_key
+
+
+def test_entries_expire_after_the_ttl(tmp_path, monkeypatch):
+    cache = ResponseCache(str(tmp_path / "cache.sqlite"), ttl=60)
+    cache.set("a", {"people": [1]})
+    assert cache.get("a") == {"people": [1]}
+
+    later = time.time() + 61
+    monkeypatch.setattr(time, "time", lambda: later)
+    assert cache.get("a") is None
+    assert cache.stats() == {"hits": 1, "misses": 1, "entries": 0, "bytes": 0}
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path, monkeypatch):
+    clock = iter(range(1_000_000, 2_000_000))
+    monkeypatch.setattr(time, "time", lambda: next(clock))
+    value = {"blob": "x" * 90}  # 103 bytes as JSON
+    cache = ResponseCache(str(tmp_path / "cache.sqlite"), ttl=3600, max_bytes=350)
+    for key in "abc":
+        cache.set(key, value)
+    cache.get("a")
+    cache.set("d", value)
+
+    assert cache.get("b") is None
+    assert all(cache.get(key) == value for key in "acd")
+    assert cache.stats()["bytes"] <= 350
+
+
+def test_size_survives_a_restart(tmp_path):
+    path = str(tmp_path / "cache.sqlite")
+    ResponseCache(path).set("a", [1, 2, 3])
+    assert ResponseCache(path).stats()["bytes"] == len("[1, 2, 3]")
+
+
+def test_search_key_ignores_paging_and_list_order():
+    qs = {"person_titles[]": ["cto", "ceo"], "page": ["3"]}
+    assert search_key(qs, 1, 100) == search_key({"person_titles[]": ["ceo", "cto"]}, 1, 100)
+    assert search_key(qs, 1, 100) != search_key(qs, 2, 100)
+
+
+def test_person_key_depends_on_phone_reveal():
+    params = {"id": "p1", "reveal_personal_emails": "true"}
+    with_phone = person_key({**params, "reveal_phone_number": "true"})
+    assert with_phone != person_key(params)
+    assert person_key({**params, "reveal_phone_number": "false"}) == person_key(params)
+    assert with_phone == "person:personal+phone:id:p1"
@@ -0,0 +1,51 @@
+from bench.mock_server import fake_person
+
+from lib.cache import get_cache, person_key
+from lib.credits import enrich_planned, plan_enrichment
+from lib.phones import get_reveals
+from lib.store import PullStore
+from tests.conftest import MOCK_CONFIG
+
+WORK = {"reveal_personal_emails": "false"}
+PHONE = {"reveal_personal_emails": "false", "reveal_phone_number": "true"}
+
+
+def test_repeated_identifiers_are_looked_up_once():
+    details = [{"linkedin_url": "linkedin.com/in/repeat-a"}, {"linkedin_url": "https://www.linkedin.com/in/repeat-a/"},
+               {"linkedin_url": "linkedin.com/in/repeat-b"}]
+    plan = plan_enrichment(details, WORK, use_pulls=False)
+    assert plan["pending"] == [0, 2]
+    assert plan["duplicates"] == {1: 0}
+
+
+def test_cached_match_of_the_other_email_variant_is_reused():
+    person = {"id": "cached-1", "email": "ann@example.com", "email_status": "verified"}
+    get_cache().set(person_key({"id": "cached-1", "reveal_personal_emails": "true"}), {"person": person})
+
+    plan = plan_enrichment([{"id": "cached-1"}], WORK, use_pulls=False)
+    assert plan["people"] == {0: person}
+    assert plan["from_cache"] == 1
+    assert plan_enrichment([{"id": "cached-1"}], PHONE, use_pulls=False)["pending"] == [0]
+
+
+def test_people_known_from_earlier_pulls_are_not_matched():
+    person = fake_person(777_777, MOCK_CONFIG)
+    store = PullStore()
+    store.write_page(1, [person])
+    detail = {"linkedin_url": person["linkedin_url"].replace("http://www.", "https://") + "/"}
+
+    plan = plan_enrichment([detail], WORK)
+    assert plan["from_pulls"] == 1
+    assert plan["rows"][0]["id"] == person["id"]
+    assert plan_enrichment([detail], PHONE, use_cache=False)["pending"] == [0]
+    store.delete()
+
+
+def test_enrich_planned_keeps_upload_order_and_tracks_phone_reveals(mock_server):
+    details = [{"email": "order-a@example.com"}, {"email": "order-b@example.com"}, {"email": "ORDER-A@example.com"}]
+    stats = {}
+    df = enrich_planned("test-credits", details, PHONE, use_cache=False, use_pulls=False, stats=stats)
+    assert len(df) == 3
+    assert df["id"].iloc[0] == df["id"].iloc[2] != df["id"].iloc[1]
+    assert (stats["lookups"], stats["duplicates"], stats["credits_saved"]) == (2, 1, 1)
+    assert {status for status, _ in get_reveals().lookup(df["id"].tolist()).values()} == {"pending"}
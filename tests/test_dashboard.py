@@ -0,0 +1,105 @@
+from types import SimpleNamespace
+
+import pytest
+import requests
+
+import lib.dashboard_data as dashboard_data
+from lib.aggregates import LeadAggregates, get_aggregates
+from lib.dashboard_data import LeadStore
+
+
+@pytest.fixture
+def store(mock_server):
+    store = LeadStore()
+    store.get(force=True)
+    return store
+
+
+def summary(aggregates: LeadAggregates) -> tuple:
+    modes, statuses = aggregates.options("mode"), aggregates.options("status")
+    return (aggregates.filtered_count(modes, statuses),
+            aggregates.counts_by("status", modes, statuses).sort_values("Status").to_dict("list"),
+            aggregates.hourly(modes, statuses).to_dict("list"))
+
+
+def test_each_event_matches_on_its_own_key(store):
+    first, second = store.df.iloc[0], store.df.iloc[1]
+    applied = store.apply_events([
+        {"id": first["id"], "status": "Replied"},
+        {"email": second["email"], "status": "Bounced"},
+        {"id": "p-new", "email": "new@example.com", "status": "Interested"},
+        {"status": "Replied"},
+        {"id": "", "email": None, "status": "Replied"},
+    ])
+    assert applied == 3
+    assert store.events["skipped"] == 2
+    assert store.df.loc[store.df["id"] == first["id"], "status"].tolist() == ["Replied"]
+    assert store.df.loc[store.df["email"] == second["email"], "status"].tolist() == ["Bounced"]
+    assert store.df["id"].tolist().count("p-new") == 1
+
+
+def test_later_events_find_appended_rows(store):
+    store.apply_events([{"id": "p-new", "email": "new@example.com", "status": "Interested"}])
+    store.apply_events([{"email": "new@example.com", "status": "Replied"}])
+    rows = store.df[store.df["id"] == "p-new"]
+    assert len(rows) == 1
+    assert rows["status"].tolist() == ["Replied"]
+
+
+def test_incremental_aggregates_match_a_rebuild(store):
+    get_aggregates(store.df)
+    lead = store.df.iloc[5]
+    store.apply_events([
+        {"id": lead["id"], "status": "Replied", "last email": "2026-01-02T03:04:05Z"},
+        {"email": "new@example.com", "mode": "Email", "status": "Interested"},
+    ])
+    assert summary(get_aggregates(store.df)) == summary(LeadAggregates(store.df))
+
+
+def test_failed_refresh_backs_off_until_the_next_interval(store, mock_server, monkeypatch):
+    monkeypatch.setattr(dashboard_data, "FULL_LIST_URL", f"{mock_server.base_url}/webhook/missing")
+    calls = lambda: mock_server.requests.get("/webhook/missing", 0)
+    before, df = calls(), store.df
+    store.meta["refreshed_at"] = 0.0
+
+    with pytest.raises(requests.HTTPError):
+        store.get(refresh_interval=60)
+    assert store.get(refresh_interval=60) is df
+    assert store.get(refresh_interval=60) is df
+    assert calls() - before == 1
+    assert store.last_error
+
+    monkeypatch.setattr(store, "_failed_at", 0.0)
+    with pytest.raises(requests.HTTPError):
+        store.get(refresh_interval=60)
+    assert calls() - before == 2
+
+
+def test_refresh_does_not_hold_the_store_lock(store, monkeypatch):
+    lead = store.df.iloc[0]
+    store.meta["refreshed_at"] = 0.0
+    applied = []
+
+    def slow_get(url, params=None):
+        if store._lock.acquire(timeout=1):
+            store._lock.release()
+            applied.append(store.apply_events([{"id": lead["id"], "status": "Replied"}]))
+        raise requests.ConnectionError("n8n is down")
+
+    monkeypatch.setattr(dashboard_data, "get_client", lambda: SimpleNamespace(get=slow_get))
+    with pytest.raises(requests.ConnectionError):
+        store.get(refresh_interval=60)
+    assert applied == [1]
+
+
+def test_events_leave_the_frame_and_aggregates_being_read_untouched(store):
+    frame, aggregates = store.df, get_aggregates(store.df)
+    statuses, counts = frame["status"].copy(), summary(aggregates)
+    lead = frame.iloc[3]
+    store.apply_events([{"id": lead["id"], "status": "Replied" if lead["status"] != "Replied" else "Bounced"},
+                        {"id": "p-new", "status": "Interested"}])
+
+    assert frame["status"].equals(statuses) and len(frame) == len(statuses)
+    assert summary(aggregates) == counts
+    assert get_aggregates(store.df) is not aggregates
+    assert summary(get_aggregates(store.df)) == summary(LeadAggregates(store.df))
@@ -0,0 +1,56 @@
+import pandas as pd
+
+from lib.credits import identifiers
+from lib.dedup import DedupIndex, batch_keys, normalize_keys
+
+
+def test_locked_emails_are_not_keys(tmp_path):
+    index = DedupIndex(str(tmp_path / "pushed.sqlite"))
+    df = pd.DataFrame({
+        "id": ["p1", "p2", "p3"],
+        "email": ["email_not_unlocked@domain.com"] * 3,
+    })
+    outgoing, suppressed = index.filter_batch(df)
+    assert suppressed == 0
+    assert list(outgoing["id"]) == ["p1", "p2", "p3"]
+
+
+def test_repeats_match_after_normalization(tmp_path):
+    index = DedupIndex(str(tmp_path / "pushed.sqlite"))
+    df = pd.DataFrame({
+        "email": ["Ann@Example.com", " ann@example.com", "bob@example.com", "not-an-email"],
+        "linkedin_url": ["", "", "http://www.linkedin.com/in/bob/", "https://uk.linkedin.com/in/bob?trk=x"],
+    })
+    outgoing, suppressed = index.filter_batch(df)
+    assert suppressed == 2
+    assert list(outgoing["email"]) == ["Ann@Example.com", "bob@example.com"]
+
+
+def test_recorded_leads_are_suppressed_later(tmp_path):
+    path = str(tmp_path / "pushed.sqlite")
+    DedupIndex(path).record(pd.DataFrame({"id": ["p1"], "email": ["ann@example.com"]}))
+
+    later = pd.DataFrame({"id": ["p9", "p2"], "email": ["ANN@example.com", "cat@example.com"]})
+    outgoing, suppressed = DedupIndex(path).filter_batch(later)
+    assert suppressed == 1
+    assert list(outgoing["id"]) == ["p2"]
+
+
+def test_linkedin_variants_share_one_key():
+    urls = ["http://www.linkedin.com/in/ann/", "https://linkedin.com/in/ann?utm=1", "de.linkedin.com/in/ann"]
+    assert normalize_keys("linkedin", pd.Series(urls)).nunique() == 1
+    assert len(set(identifiers("linkedin_url", urls))) == 1
+
+
+def test_unusable_identifiers_are_blank():
+    assert identifiers("email", ["email_not_unlocked@domain.com", None, "", "x@y.com"]) == ["", "", "", "email:x@y.com"]
+
+
+def test_uploaded_row_numbers_are_not_apollo_ids(tmp_path):
+    index = DedupIndex(str(tmp_path / "pushed.sqlite"))
+    index.record(pd.DataFrame({"id": ["1", "2"], "email": ["ann@example.com", "bob@example.com"]}), apollo=False)
+
+    other_upload = pd.DataFrame({"id": ["1", "2"], "email": ["cat@example.com", "ann@example.com"]})
+    assert index.seen_mask(other_upload, batch_keys(other_upload, apollo=False)).tolist() == [False, True]
+    assert len(batch_keys(other_upload, apollo=False)) == 1
+    assert len(batch_keys(other_upload)) == 2
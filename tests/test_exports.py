@@ -0,0 +1,35 @@
+import pandas as pd
+
+from lib.exports import MAX_CACHED_EXPORTS, cached_export, clear_exports, fingerprint, get_export
+
+
+def leads(rows: int, status: str = "new") -> pd.DataFrame:
+    return pd.DataFrame({"id": [f"p{i}" for i in range(rows)], "status": [status] * rows,
+                         "departments": [["sales", "marketing"]] * rows})
+
+
+def test_same_content_is_serialized_once():
+    clear_exports()
+    payload, _, from_cache = get_export(leads(10), "CSV")
+    assert not from_cache
+    again, _, from_cache = get_export(leads(10), "CSV")
+    assert from_cache and again is payload
+    assert cached_export(leads(10), "CSV") is payload
+    assert cached_export(leads(10), "JSONL") is None
+
+
+def test_changed_content_is_rebuilt():
+    clear_exports()
+    get_export(leads(10), "CSV")
+    _, _, from_cache = get_export(leads(10, status="replied"), "CSV")
+    assert not from_cache
+    assert fingerprint(leads(10)) != fingerprint(leads(11))
+
+
+def test_least_recent_exports_are_dropped():
+    clear_exports()
+    frames = [leads(i + 1) for i in range(MAX_CACHED_EXPORTS + 1)]
+    for df in frames:
+        get_export(df, "CSV")
+    assert cached_export(frames[0], "CSV") is None
+    assert cached_export(frames[-1], "CSV") is not None
@@ -0,0 +1,43 @@
+import json
+import threading
+from http.server import ThreadingHTTPServer
+
+import pytest
+import requests
+
+import lib.ingest as ingest
+from lib.ingest import IngestHandler, ingest_url, is_loopback, start_ingest
+from lib.phones import get_reveals
+
+
+@pytest.fixture
+def server(monkeypatch):
+    monkeypatch.setattr(ingest, "INGEST_TOKEN", "s3cret")
+    server = ThreadingHTTPServer(("127.0.0.1", 0), IngestHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield server
+    server.shutdown()
+
+
+def test_token_is_accepted_as_header_or_query(server):
+    url = ingest_url(server, "/phones")
+    assert url.endswith("/phones?token=s3cret")
+    payload = {"people": [{"id": "p-phone", "phone_numbers": [{"sanitized_number": "+15125550100"}]}]}
+
+    plain = url.split("?")[0]
+    assert requests.post(plain, json=payload).status_code == 401
+    assert requests.post(plain + "?token=wrong", json=payload).status_code == 401
+    assert requests.post(plain, json=payload, headers={"x-ingest-token": "s3cret"}).json() == {"received": 1}
+    assert requests.post(url, data=json.dumps(payload)).json() == {"received": 1}
+    assert get_reveals().lookup(["p-phone"])["p-phone"][0] == "received"
+
+
+def test_public_host_requires_a_token(monkeypatch):
+    monkeypatch.setattr(ingest, "INGEST_TOKEN", "")
+    monkeypatch.setattr(ingest, "_server", None)
+    monkeypatch.setattr(ingest, "_server_error", None)
+    server, error = start_ingest("0.0.0.0", 0)
+    assert server is None
+    assert "LEAD_MACHINE_INGEST_TOKEN" in error
+    assert is_loopback("127.0.0.1") and is_loopback("localhost") and is_loopback("::1")
+    assert not is_loopback("0.0.0.0")
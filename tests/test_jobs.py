@@ -0,0 +1,53 @@
+import logging
+import os
+import time
+
+import pandas as pd
+import pytest
+
+from lib.jobs import JobManager
+
+
+@pytest.fixture
+def manager(tmp_path):
+    return JobManager(str(tmp_path / "jobs.sqlite"), max_workers=2)
+
+
+def wait(manager: JobManager, job_id: str) -> dict:
+    deadline = time.time() + 10
+    while manager.get(job_id)["status"] in ("queued", "running") and time.time() < deadline:
+        time.sleep(0.01)
+    return manager.get(job_id)
+
+
+def test_result_and_progress(manager):
+    def job(ctx, rows):
+        ctx.progress(1, 2, "half way")
+        return pd.DataFrame({"id": range(rows)})
+
+    job_id = manager.submit("fetch", "test", job, 3)
+    assert wait(manager, job_id)["status"] == "done"
+    assert manager.result(job_id)["id"].tolist() == [0, 1, 2]
+
+
+def test_failures_are_logged(manager, caplog):
+    def job(ctx):
+        raise ValueError("boom")
+
+    with caplog.at_level(logging.ERROR, logger="lib.jobs"):
+        job_id = manager.submit("fetch", "test", job)
+        state = wait(manager, job_id)
+    assert (state["status"], state["message"]) == ("failed", "boom")
+    assert f"Job {job_id} failed" in caplog.text
+
+
+def test_old_finished_jobs_and_results_are_pruned(manager):
+    old = manager.submit("fetch", "old", lambda ctx: [1])
+    recent = manager.submit("fetch", "recent", lambda ctx: [2])
+    wait(manager, old), wait(manager, recent)
+    manager._db.execute("UPDATE jobs SET updated = ? WHERE id = ?", (time.time() - 8 * 86400, old))
+
+    assert manager.prune(max_age_days=7) == 1
+    assert manager.get(old) is None
+    assert not os.path.exists(manager._result_path(old))
+    assert manager.result(recent) == [2]
@@ -0,0 +1,51 @@
+import time
+
+import pandas as pd
+
+from lib.phones import PhoneReveals, merge_phones, parse_reveals
+
+PHONE = {"sanitized_number": "+15550100", "raw_number": "(555) 0100"}
+
+
+def test_payload_shapes_are_all_parsed():
+    person = {"id": "p1", "phone_numbers": [PHONE, "not-a-dict"]}
+    expected = [("p1", [PHONE], "success")]
+    assert parse_reveals({"people": [person]}) == expected
+    assert parse_reveals({"person": person}) == expected
+    assert parse_reveals([person, {"person_id": "p2", "status": "failed"}]) == expected + [("p2", [], "failed")]
+    assert parse_reveals({"phone_numbers": [PHONE]}) == []
+    assert parse_reveals("text") == []
+
+
+def test_overdue_reveals_expire(tmp_path, monkeypatch):
+    reveals = PhoneReveals(str(tmp_path / "reveals.sqlite"), timeout=60)
+    reveals.expect(["p1", "p2", None])
+    reveals.receive({"id": "p2", "phone_numbers": [PHONE]})
+    assert reveals.expire() == 0
+
+    later = time.time() + 61
+    monkeypatch.setattr(time, "time", lambda: later)
+    assert reveals.expire() == 1
+    assert reveals.summary(["p1", "p2", "p3"]) == {"pending": 0, "received": 1, "no_phone": 0, "expired": 1}
+
+
+def test_delivered_reveals_are_not_reset_by_a_new_request(tmp_path):
+    reveals = PhoneReveals(str(tmp_path / "reveals.sqlite"))
+    reveals.receive({"id": "p1", "phone_numbers": [PHONE]})
+    reveals.receive({"id": "p2", "phone_numbers": []})
+    reveals.expect(["p1", "p2"])
+    assert reveals.lookup(["p1", "p2"]) == {"p1": ("received", [PHONE]), "p2": ("pending", [])}
+
+
+def test_merge_fills_phones_by_id(tmp_path):
+    reveals = PhoneReveals(str(tmp_path / "reveals.sqlite"))
+    second = {"raw_number": "555 0101"}
+    reveals.receive([{"id": "p1", "phone_numbers": [PHONE, second]}, {"id": "p2"}])
+    df = pd.DataFrame({"id": ["p1", "p2", "p3"], "name": ["Ann", "Bob", "Cat"]})
+
+    merged = merge_phones(df, reveals).fillna("")
+    assert merged["phone"].tolist() == ["+15550100", "", ""]
+    assert merged["phone_numbers"].tolist() == ["+15550100; 555 0101", "", ""]
+    assert merged["phone_status"].tolist() == ["received", "no_phone", ""]
+    assert "phone" not in df.columns
+    assert merge_phones(df.drop(columns="id"), reveals).columns.tolist() == ["name"]
@@ -0,0 +1,76 @@
+import pytest
+
+import lib.planner as planner
+from lib.planner import EMPLOYEE_RANGES, MIN_REVENUE_SPAN, format_coverage, plan_shards, result_cap, split_query
+
+EMPLOYEES = "organization_num_employees_ranges[]"
+LOCATIONS = "person_locations[]"
+
+
+def revenue_bounds(qs: dict) -> tuple:
+    return int(qs["revenue_range[min]"][0]), int(qs["revenue_range[max]"][0])
+
+
+def test_existing_employee_ranges_split_first():
+    qs = {EMPLOYEES: ["1,10", "11,20"], LOCATIONS: ["Austin", "Denver"]}
+    shards = split_query(qs)
+    assert [s[EMPLOYEES] for s in shards] == [["1,10"], ["11,20"]]
+    assert all(s[LOCATIONS] == ["Austin", "Denver"] for s in shards)
+
+
+def test_existing_locations_split_before_new_filters():
+    shards = split_query({LOCATIONS: ["Austin", "Denver", "Boston"]})
+    assert [s[LOCATIONS] for s in shards] == [["Austin"], ["Denver"], ["Boston"]]
+    assert all(EMPLOYEES not in s for s in shards)
+
+
+def test_unfiltered_query_adds_employee_ranges():
+    assert [s[EMPLOYEES] for s in split_query({})] == [[r] for r in EMPLOYEE_RANGES]
+
+
+def test_revenue_halves_are_disjoint_and_contiguous():
+    qs = {EMPLOYEES: ["1,10"], "revenue_range[min]": ["1000"], "revenue_range[max]": ["5000000"]}
+    low, high = split_query(qs)
+    assert revenue_bounds(low)[0] == 1000
+    assert revenue_bounds(low)[1] + 1 == revenue_bounds(high)[0]
+    assert revenue_bounds(high)[1] == 5000000
+
+
+def test_narrow_revenue_range_cannot_split():
+    assert split_query({EMPLOYEES: ["1,10"], "revenue_range[min]": ["0"],
+                        "revenue_range[max]": [str(MIN_REVENUE_SPAN)]}) == []
+
+
+def fake_total(qs: dict) -> int:
+    """120k people: 60k in the smallest companies, spread evenly over revenue, 6k in each other range."""
+    employees = qs.get(EMPLOYEES) or []
+    if not employees:
+        return 120_000
+    if employees != ["1,10"]:
+        return 6_000
+    if "revenue_range[min]" not in qs:
+        return 60_000
+    low, high = revenue_bounds(qs)
+    return 70_000 if high - low <= MIN_REVENUE_SPAN else 30_000
+
+
+@pytest.fixture
+def totals(monkeypatch):
+    monkeypatch.setattr(planner, "probe_total", lambda api_key, qs, use_cache=True: fake_total(qs))
+
+
+def test_plan_shards_covers_the_search(totals):
+    report = {}
+    shards = plan_shards("test-key", {}, 100, report=report)
+    assert all(total <= result_cap(100) for _, total in shards)
+    assert report == {"total": 120_000, "covered": 120_000, "over_cap": 0, "beyond_cap": 0}
+    assert "not reachable" not in format_coverage(report)
+
+
+def test_plan_shards_reports_leads_over_the_cap(totals):
+    report = {}
+    qs = {EMPLOYEES: ["1,10"], "revenue_range[min]": ["0"], "revenue_range[max]": ["1000"]}
+    shards = plan_shards("test-key", qs, 100, report=report)
+    assert shards == [(qs, 70_000)]
+    assert report == {"total": 70_000, "covered": 50_000, "over_cap": 1, "beyond_cap": 20_000}
+    assert format_coverage(report).endswith("(20,000 not reachable)")
@@ -0,0 +1,28 @@
+from lib.batch import run_segment
+from lib.checkpoint import get_checkpoints, pull_key
+from lib.apollo import parse_search_url
+
+SEARCH_URL = "https://app.apollo.io/#/people?personTitles[]=cto&page=1"
+
+
+def segment(pages: int = 2) -> dict:
+    return {"name": "ctos", "url": SEARCH_URL, "pages": pages, "intention": "test"}
+
+
+def test_completed_pull_is_not_reused(mock_server):
+    first = run_segment("test-key", segment(), 10, use_cache=False)
+    second = run_segment("test-key", segment(), 10, use_cache=False)
+    assert first["leads"] == second["leads"] == 20
+    assert first["pull_id"] != second["pull_id"]
+
+
+def test_unfinished_pull_is_resumed(mock_server):
+    checkpoints = get_checkpoints()
+    key = pull_key(parse_search_url(SEARCH_URL), 10)
+    first = run_segment("test-key", segment(), 10, use_cache=False)
+    checkpoints.finish(key, "failed")
+
+    resumed = run_segment("test-key", segment(), 10, use_cache=False)
+    assert resumed["pull_id"] == first["pull_id"]
+    assert resumed["leads"] == 20
+
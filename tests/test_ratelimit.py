@@ -0,0 +1,79 @@
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import requests
+
+from lib.ratelimit import RateLimiter, send
+
+
+class ScriptedHandler(BaseHTTPRequestHandler):
+    """Answers with the next (status, headers) of the server's script, then 200s."""
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        with self.server.lock:
+            status, headers = self.server.script.pop(0) if self.server.script else (200, {})
+            self.server.calls += 1
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+
+@pytest.fixture
+def scripted():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), ScriptedHandler)
+    server.lock, server.script, server.calls = threading.Lock(), [], 0
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield server
+    server.shutdown()
+
+
+def url(server) -> str:
+    return f"http://127.0.0.1:{server.server_address[1]}/"
+
+
+def test_retries_throttling_and_server_errors(scripted):
+    scripted.script = [(429, {"Retry-After": "0"}), (503, {}), (200, {"x-rate-limit-minute": "600"})]
+    limiter = RateLimiter(per_minute=600)
+    response = send("GET", url(scripted), limiter, base_delay=0.01)
+    assert response.status_code == 200
+    assert scripted.calls == 3
+    assert limiter.retries == 2
+    assert limiter.quota["minute_limit"] == 600
+
+
+def test_429_halves_the_rate_and_5xx_does_not(scripted):
+    limiter = RateLimiter(per_minute=600)
+    scripted.script = [(503, {})]
+    send("GET", url(scripted), limiter, base_delay=0.01)
+    assert limiter.rate == pytest.approx(10)
+
+    scripted.script = [(429, {"Retry-After": "0"})]
+    send("GET", url(scripted), limiter, base_delay=0.01)
+    assert limiter.rate == pytest.approx(5)
+
+
+def test_last_response_is_returned_when_retries_run_out(scripted):
+    scripted.script = [(503, {})] * 3
+    response = send("GET", url(scripted), RateLimiter(per_minute=600), max_retries=1, base_delay=0.01)
+    assert response.status_code == 503
+    assert scripted.calls == 2
+
+
+def test_connection_errors_are_retried_then_raised():
+    limiter = RateLimiter(per_minute=600)
+    with pytest.raises(requests.exceptions.ConnectionError):
+        send("GET", "http://127.0.0.1:1/", limiter, max_retries=2, base_delay=0.01)
+    assert limiter.retries == 2
+
+
+def test_backoff_pauses_the_bucket():
+    limiter = RateLimiter(per_minute=600, burst=5)
+    limiter.backoff(30)
+    assert limiter.tokens <= 0
+    assert limiter.snapshot()["retries"] == 1
@@ -0,0 +1,28 @@
+import json
+
+from bench.mock_server import fake_person
+
+from lib.store import EXTRA_COLUMN, PullStore, normalize_page
+from tests.conftest import MOCK_CONFIG
+
+
+def test_known_fields_leave_extra_empty():
+    table = normalize_page([fake_person(i, MOCK_CONFIG) for i in range(3)])
+    assert table.column(EXTRA_COLUMN).to_pylist() == [None] * 3
+
+
+def test_unmapped_fields_are_kept_in_extra():
+    person = fake_person(1, MOCK_CONFIG)
+    person["new_field"] = 1
+    person["organization"]["new_org_field"] = "x"
+    extra = normalize_page([person]).column(EXTRA_COLUMN).to_pylist()[0]
+    assert json.loads(extra) == {"new_field": 1, "organization": {"new_org_field": "x"}}
+
+
+def test_extra_column_round_trips_through_a_pull():
+    person = fake_person(2, MOCK_CONFIG)
+    person["new_field"] = [1, 2]
+    store = PullStore()
+    store.write_page(1, [person])
+    assert json.loads(store.to_table().column(EXTRA_COLUMN).to_pylist()[0]) == {"new_field": [1, 2]}
+    store.delete()
@@ -0,0 +1,83 @@
+import io
+
+import pandas as pd
+import pytest
+
+import lib.uploads as uploads
+from lib.uploads import check_encoding, forward_csv, validate_csv
+from lib.webhook import TEST_CSV_URL
+
+WEBHOOK_PATH = "/webhook-test/csv"
+
+
+def csv_file(lines: list) -> io.BytesIO:
+    return io.BytesIO(("\n".join(lines) + "\n").encode())
+
+
+@pytest.fixture
+def sent(monkeypatch):
+    chunks = []
+
+    def send(chunk, filename, *args, **kwargs):
+        chunks.append((filename, chunk["email"].tolist()))
+        return True, "ok"
+
+    monkeypatch.setattr(uploads, "send_file_to_webhook", send)
+    return chunks
+
+
+def test_split_multibyte_sequences_are_valid():
+    data = "naïve café\n".encode() * 3
+    assert check_encoding(io.BytesIO(data), block_size=3) is None
+    assert check_encoding(io.BytesIO(data[:4] + b"\xff" + data[4:]), block_size=3) == 4
+    assert check_encoding(io.BytesIO(data[:3]), block_size=2) == 2
+
+
+def test_warnings_are_counted_across_chunks():
+    upload = csv_file(["name,email,linkedin_url", "Ann,ann@example.com,", "Bob,,", "Cat,cat-at-example.com,",
+                       "Ann again,ANN@example.com,", "Dan,,linkedin.com/in/dan", "Dan,,https://www.linkedin.com/in/dan/"])
+    report = validate_csv(upload, chunk_rows=2)
+    assert report["errors"] == []
+    assert (report["rows"], report["chunks"], report["columns"]) == (6, 3, ["name", "email", "linkedin_url"])
+    assert (report["missing_identifier"], report["bad_email"], report["repeated"]) == (1, 1, 2)
+
+
+def test_blocking_errors_stop_validation():
+    assert validate_csv(csv_file(["name,company", "Ann,Acme"]))["errors"] == ["No email or linkedin_url column found."]
+    report = validate_csv(io.BytesIO(b"email\nann@example.com\n\xff\n"))
+    assert report["rows"] == 0
+    assert "byte 22" in report["errors"][0]
+
+
+def test_pushed_leads_are_flagged_when_suppressing():
+    uploads.get_index().record(pd.DataFrame({"email": ["pushed@example.com"]}), apollo=False)
+    upload = csv_file(["email", "pushed@example.com", "fresh-validate@example.com"])
+    assert validate_csv(upload)["already_pushed"] == 0
+    assert validate_csv(upload, suppress=True)["already_pushed"] == 1
+
+
+def test_forwarding_resumes_from_the_failed_chunk(mock_server, monkeypatch):
+    upload = csv_file(["email"] + [f"resume{i}@example.com" for i in range(5)])
+    before = mock_server.requests.get(WEBHOOK_PATH, 0)
+
+    def fail_after_first(done: int, rows: int):
+        monkeypatch.setattr(mock_server.config, "error_rate", 1.0)
+
+    success, next_chunk, message = forward_csv(upload, "leads.csv", TEST_CSV_URL, "test", chunk_rows=2,
+                                               on_chunk=fail_after_first)
+    assert (success, next_chunk) == (False, 1)
+    assert "503" in message
+
+    monkeypatch.setattr(mock_server.config, "error_rate", 0.0)
+    success, next_chunk, _ = forward_csv(upload, "leads.csv", TEST_CSV_URL, "test", chunk_rows=2, start_chunk=1)
+    assert (success, next_chunk) == (True, 3)
+    assert not upload.closed
+    assert mock_server.requests.get(WEBHOOK_PATH, 0) - before == 4
+
+
+def test_resumed_forwarding_still_drops_earlier_repeats(sent):
+    upload = csv_file(["email", "first@example.com", "second@example.com", "FIRST@example.com", "third@example.com"])
+    success, next_chunk, _ = forward_csv(upload, "leads.csv", "http://unused", "test", chunk_rows=2,
+                                         suppress=True, start_chunk=1)
+    assert (success, next_chunk) == (True, 2)
+    assert sent == [("leads.part0002.csv", ["third@example.com"])]
@@ -0,0 +1,83 @@
+import time
+from types import SimpleNamespace
+
+import pandas as pd
+import pytest
+
+import lib.webhook as webhook
+from lib.exports import cached_export, clear_exports
+from lib.webhook import TEST_CSV_URL, chunk_count, format_upload, send_file_to_webhook, send_in_chunks
+
+WEBHOOK_PATH = "/webhook-test/csv"
+
+
+@pytest.fixture
+def pushes(mock_server):
+    before = mock_server.requests.get(WEBHOOK_PATH, 0)
+    return lambda: mock_server.requests.get(WEBHOOK_PATH, 0) - before
+
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    slept = []
+    monkeypatch.setattr(webhook, "time", SimpleNamespace(sleep=slept.append, perf_counter=time.perf_counter))
+    return slept
+
+
+def leads(rows: int) -> pd.DataFrame:
+    return pd.DataFrame({"id": [f"p{i}" for i in range(rows)], "email": [f"lead{i}@example.com" for i in range(rows)]})
+
+
+def test_chunked_push_resumes_from_the_failed_chunk(mock_server, pushes, monkeypatch):
+    df = leads(25)
+    assert chunk_count(df, 10) == 3
+
+    def fail_after_first(done: int, total: int):
+        monkeypatch.setattr(mock_server.config, "error_rate", 1.0)
+
+    success, next_chunk, message = send_in_chunks(df, "leads.csv", TEST_CSV_URL, "test", 10, on_chunk=fail_after_first)
+    assert (success, next_chunk) == (False, 1)
+    assert "503" in message
+    assert pushes() == 2
+
+    monkeypatch.setattr(mock_server.config, "error_rate", 0.0)
+    done = []
+    success, next_chunk, _ = send_in_chunks(df, "leads.csv", TEST_CSV_URL, "test", 10, start_chunk=next_chunk,
+                                            on_chunk=lambda done_chunks, total: done.append(done_chunks))
+    assert (success, next_chunk) == (True, 3)
+    assert done == [2, 3]
+    assert pushes() == 4
+
+
+def test_server_errors_are_not_resent(mock_server, pushes, sleeps, monkeypatch):
+    monkeypatch.setattr(mock_server.config, "error_rate", 1.0)
+    success, message = send_file_to_webhook(leads(3), "leads.csv", TEST_CSV_URL, "test")
+    assert not success
+    assert pushes() == 1
+    assert sleeps == []
+
+
+def test_refused_connections_are_retried(sleeps):
+    success, _ = send_file_to_webhook(leads(3), "leads.csv", "http://127.0.0.1:1/webhook/csv", "test", retries=2)
+    assert not success
+    assert sleeps == [1, 2]
+
+
+def test_stats_count_the_uncompressed_csv(mock_server):
+    stats = {}
+    df = leads(500)
+    success, _ = send_file_to_webhook(df, "leads.csv", TEST_CSV_URL, "test", payload_format="CSV (gzip)", stats=stats)
+    assert success
+    assert stats["raw_bytes"] == len(df.to_csv(index=False).encode())
+    assert stats["bytes"] < stats["raw_bytes"]
+
+
+def test_parquet_pushes_bypass_the_export_cache(mock_server):
+    clear_exports()
+    stats = {}
+    df = leads(50)
+    success, _ = send_file_to_webhook(df, "leads.csv", TEST_CSV_URL, "test", payload_format="Parquet", stats=stats)
+    assert success
+    assert cached_export(df, "Parquet") is None
+    assert stats["raw_bytes"] is None
+    assert "smaller" not in format_upload(stats)